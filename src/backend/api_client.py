@@ -1,17 +1,142 @@
+import re
 import sys
 import json
+import threading
+import httpx
 from openai import OpenAI
+from configs.P10_config import P10Config
 
-# Set encoding to utf-8 for stdin/stdout
-sys.stdin.reconfigure(encoding='utf-8')
-sys.stdout.reconfigure(encoding='utf-8')
+# Clients are cached per (base_url, api_key) so that, in the long-lived --serve
+# backend, agent turns and tool calls reuse pooled keep-alive connections instead
+# of redoing the TCP/TLS handshake on every request.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401  (optional dependency of httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+def _create_http_client():
+    limits = httpx.Limits(
+        max_connections=P10Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=P10Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=P10Config.HTTP_KEEPALIVE_EXPIRY
+    )
+    http2 = P10Config.HTTP2 and _http2_available()
+    return httpx.Client(
+        limits=limits,
+        http2=http2,
+        timeout=httpx.Timeout(P10Config.HTTP_TIMEOUT, connect=P10Config.HTTP_CONNECT_TIMEOUT),
+        follow_redirects=True
+    )
+
+def _get_clients(api_key, base_url):
+    key = (base_url or None, api_key)
+    with _clients_lock:
+        clients = _clients.get(key)
+        if clients is None:
+            http_client = _create_http_client()
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url if base_url else None,
+                http_client=http_client
+            )
+            clients = _clients[key] = (client, http_client)
+        return clients
+
+def get_client(api_key, base_url):
+    """Returns the shared OpenAI client for (base_url, api_key), creating it on first use."""
+    return _get_clients(api_key, base_url)[0]
+
+def close_clients():
+    """Closes all cached clients and their connection pools."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client, _ in clients:
+        client.close()
+
+# (base_url, model) pairs whose provider rejected the `stop` parameter
+_stop_unsupported = set()
+
+def _stop_for(base_url, model, stop):
+    """Returns `stop`, or None when this provider/model is known to reject it."""
+    if stop and (base_url or None, model) in _stop_unsupported:
+        return None
+    return stop
+
+def _is_stop_rejected(status_code, message):
+    """True when a request failed because the provider does not accept `stop`."""
+    return status_code in (400, 422) and 'stop' in str(message).lower()
+
+def _mark_stop_unsupported(base_url, model):
+    sys.stderr.write(f"Warning: provider rejected stop sequences for model {model}; continuing without them\n")
+    _stop_unsupported.add((base_url or None, model))
+
+# (base_url, model) pairs whose provider rejected `stream_options` (the final usage chunk)
+_stream_usage_unsupported = set()
+
+def _stream_usage_for(base_url, model, include_usage):
+    """Returns include_usage, or False when this provider/model is known to reject stream_options."""
+    return include_usage and (base_url or None, model) not in _stream_usage_unsupported
+
+def _is_stream_usage_rejected(status_code, message):
+    """True when a request failed because the provider does not accept `stream_options`."""
+    message = str(message).lower()
+    return status_code in (400, 422) and ('stream_options' in message or 'include_usage' in message)
+
+def _mark_stream_usage_unsupported(base_url, model):
+    sys.stderr.write(f"Warning: provider rejected stream_options for model {model}; continuing without usage reports\n")
+    _stream_usage_unsupported.add((base_url or None, model))
+
+class ToolsUnsupportedError(Exception):
+    """
+    The provider rejected the `tools` parameter. The caller decides whether to fall back to the
+    text tool protocol (and mark_tools_unsupported) or to fail the request.
+    """
+
+# (base_url, model) pairs whose provider rejected the `tools` parameter
+_tools_unsupported = set()
+
+def tools_supported(base_url, model):
+    return (base_url or None, model) not in _tools_unsupported
+
+# How providers word "this model/endpoint has no function calling". Errors that merely mention
+# tools (e.g. "messages with role 'tool' must be a response to ... 'tool_calls'") do not match.
+_TOOLS = r"(?:tools|tool[ _]?(?:use|calls?|calling|choice)|function[ _]?(?:calls?|calling))"
+_TOOLS_UNSUPPORTED = re.compile(
+    r"(?:does ?n[o']t support|not support|no support for|unsupported)\W+(?:[\w-]+\W+){0,4}?" + _TOOLS + r"\b"
+    r"|\b" + _TOOLS + r"\W+(?:[\w-]+\W+){0,3}?(?:is|are) (?:not supported|unsupported|not (?:allowed|permitted|available))"
+    r"|(?:unrecognized|unknown|unexpected|extra|invalid) (?:request )?(?:arguments?|parameters?|fields?|keys?|inputs?)\W+(?:[\w-]+\W+){0,3}?'?tools\b"
+)
+
+def _is_tools_rejected(status_code, message):
+    """True when a request failed because the provider does not accept `tools` (function calling)."""
+    return status_code in (400, 404, 422) and _TOOLS_UNSUPPORTED.search(str(message).lower()) is not None
+
+def mark_tools_unsupported(base_url, model):
+    """Remembers that this provider/model has no function calling; later requests use the text protocol."""
+    sys.stderr.write(f"Warning: provider rejected native tool calls for model {model}; using the text tool protocol\n")
+    _tools_unsupported.add((base_url or None, model))
+
+def tool_call_deltas(delta_tool_calls):
+    """Normalizes streamed tool_calls deltas (SDK objects or dicts) to (index, id, name, arguments) tuples."""
+    deltas = []
+    for call in delta_tool_calls:
+        if isinstance(call, dict):
+            function = call.get('function') or {}
+            deltas.append((call.get('index', 0), call.get('id'), function.get('name'), function.get('arguments')))
+        else:
+            function = call.function
+            deltas.append((call.index, call.id, function.name if function else None, function.arguments if function else None))
+    return deltas
 
 def fetch_available_models(api_key, base_url):
     try:
-        client = OpenAI(
-            api_key=api_key,
-            base_url=base_url if base_url else None
-        )
+        client = get_client(api_key, base_url)
         
         # List models
         models_page = client.models.list()
@@ -28,10 +153,7 @@ def chat_completion(api_key, base_url, model, messages, temperature=0.7):
         sys.stderr.write(f"[DEBUG] chat_completion using model: {model}\n")
         sys.stderr.flush()
         
-        client = OpenAI(
-            api_key=api_key,
-            base_url=base_url if base_url else None
-        )
+        client = get_client(api_key, base_url)
         
         response = client.chat.completions.create(
             model=model,
@@ -44,25 +166,139 @@ def chat_completion(api_key, base_url, model, messages, temperature=0.7):
     except Exception as e:
         raise e
 
-def chat_completion_stream(api_key, base_url, model, messages, temperature=0.7):
+def chat_completion_stream(api_key, base_url, model, messages, temperature=0.7, include_usage=False, stop=None, tools=None):
     try:
         sys.stderr.write(f"[DEBUG] chat_completion_stream using model: {model}\n")
         sys.stderr.flush()
 
-        client = OpenAI(
-            api_key=api_key,
-            base_url=base_url if base_url else None
-        )
+        client = get_client(api_key, base_url)
         
-        return client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            stream=True
-        )
+        extra = {}
+        if _stream_usage_for(base_url, model, include_usage):
+            # Ask for a final usage chunk (it arrives with an empty `choices` list)
+            extra['stream_options'] = {"include_usage": True}
+        if tools:
+            extra['tools'] = tools
+        stop = _stop_for(base_url, model, stop)
+        if stop:
+            extra['stop'] = stop
+        
+        while True:
+            try:
+                return client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                    **extra
+                )
+            except Exception as e:
+                status_code = getattr(e, 'status_code', None)
+                if tools and _is_tools_rejected(status_code, e):
+                    raise ToolsUnsupportedError(str(e)) from e
+                # Optional parameters the provider rejects are dropped (and remembered) and the request sent again
+                if 'stream_options' in extra and _is_stream_usage_rejected(status_code, e):
+                    _mark_stream_usage_unsupported(base_url, model)
+                    del extra['stream_options']
+                elif 'stop' in extra and _is_stop_rejected(status_code, e):
+                    _mark_stop_unsupported(base_url, model)
+                    del extra['stop']
+                else:
+                    raise
     except Exception as e:
         raise e
 
+def chat_completion_stream_raw(api_key, base_url, model, messages, temperature=0.7, include_usage=False, stop=None, tools=None):
+    """
+    Streams a chat completion without the SDK's per-chunk pydantic models.
+    The SSE body is read directly from the pooled httpx client and each `data:`
+    line is parsed with jiter. Yields plain (content, finish_reason, usage, tool_calls)
+    tuples; `usage` is a dict and only set on the final chunk when include_usage is True,
+    `tool_calls` holds the tool_call_deltas of the chunk (or None).
+    The request is sent before the first chunk is read, as with the SDK.
+    Unlike the SDK path, failed requests are not retried.
+    """
+    sys.stderr.write(f"[DEBUG] chat_completion_stream_raw using model: {model}\n")
+    sys.stderr.flush()
+
+    client, http_client = _get_clients(api_key, base_url)
+    body = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True
+    }
+    if _stream_usage_for(base_url, model, include_usage):
+        body["stream_options"] = {"include_usage": True}
+    if tools:
+        body["tools"] = tools
+    stop = _stop_for(base_url, model, stop)
+    if stop:
+        body["stop"] = stop
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Accept": "text/event-stream"
+    }
+    url = str(client.base_url).rstrip('/') + '/chat/completions'
+
+    def send():
+        response = http_client.send(http_client.build_request('POST', url, json=body, headers=headers), stream=True)
+        if response.status_code >= 400:
+            response.read()
+            response.close()
+        return response
+
+    response = send()
+    while response.status_code >= 400:
+        if tools and _is_tools_rejected(response.status_code, response.text):
+            raise ToolsUnsupportedError(f"Error code: {response.status_code} - {response.text}")
+        if "stream_options" in body and _is_stream_usage_rejected(response.status_code, response.text):
+            _mark_stream_usage_unsupported(base_url, model)
+            del body["stream_options"]
+        elif "stop" in body and _is_stop_rejected(response.status_code, response.text):
+            _mark_stop_unsupported(base_url, model)
+            del body["stop"]
+        else:
+            break
+        response = send()
+    if response.status_code >= 400:
+        raise Exception(f"Error code: {response.status_code} - {response.text}")
+    return _iter_sse_chunks(response)
+
+def _iter_sse_chunks(response):
+    """Yields the chunk tuples of chat_completion_stream_raw from an open SSE response."""
+    import jiter
+
+    try:
+        buffer = b''
+        for data in response.iter_bytes():
+            buffer = buffer + data if buffer else data
+            lines = buffer.split(b'\n')
+            buffer = lines.pop()
+            for line in lines:
+                # Only `data:` lines carry chunks; skip blank lines, comments and `event:` fields
+                if not line.startswith(b'data:'):
+                    continue
+                payload = line[5:].strip()
+                if payload == b'[DONE]':
+                    return
+                if not payload:
+                    continue
+                chunk = jiter.from_json(payload)
+                if 'error' in chunk:
+                    raise Exception(f"Stream error: {chunk['error']}")
+                choices = chunk.get('choices')
+                if choices:
+                    choice = choices[0]
+                    delta = choice.get('delta') or {}
+                    calls = delta.get('tool_calls')
+                    yield delta.get('content'), choice.get('finish_reason'), chunk.get('usage'), tool_call_deltas(calls) if calls else None
+                elif chunk.get('usage'):
+                    yield None, None, chunk['usage'], None
+    finally:
+        # Also runs when the caller closes the generator early (e.g. at </tool>)
+        response.close()
+
 
 if __name__ == '__main__':
     # This block is for testing or standalone execution if needed
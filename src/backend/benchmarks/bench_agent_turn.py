@@ -0,0 +1,160 @@
+"""
+Per-turn overhead of LLMProcessor.process, measured in-process against the local mock LLM server.
+
+Each run is one query that calls a tool on the first turn and answers on the second.
+The LLM stream and execute_tool are wrapped with timers, and the rest of the time is
+split into:
+    prompt_build_ms    process() start -> first LLM request (tool definitions, system prompt)
+    tool_parse_ms      end of the tool-call stream -> execute_tool (parse, JSON args, history)
+                       negative when the tool starts while the response is still streaming
+    execute_tool_ms    time inside execute_tool
+    llm_ms             time waiting on / reading the LLM streams
+    overhead_per_turn_ms  (total - llm - execute_tool) / turns
+
+Usage:
+    python src/backend/benchmarks/bench_agent_turn.py [--repeat 20] [--tool list_files] [--tool-args JSON] [--raw-stream] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import bench_utils
+import llm_processor
+from mock_llm_server import MockOptions, start_in_thread
+
+class Timeline:
+    def __init__(self):
+        self.marks = []   # (name, time)
+        self.llm_s = 0.0
+        self.tool_s = 0.0
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def first(self, name):
+        return next((t for n, t in self.marks if n == name), None)
+
+class TimedStream:
+    """Wraps an LLM stream, accumulating the time spent waiting for chunks."""
+
+    def __init__(self, stream, timeline):
+        self._iter = iter(stream)
+        self._stream = stream
+        self._timeline = timeline
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iter)
+        except StopIteration:
+            self._timeline.mark('stream_end')
+            raise
+        finally:
+            self._timeline.llm_s += time.perf_counter() - start
+
+    def close(self):
+        # Reached without StopIteration when the processor stops reading early (at </tool>)
+        self._timeline.mark('stream_end')
+        self._stream.close()
+
+def instrument(timeline):
+    """Wraps llm_processor's stream functions and execute_tool with timers."""
+    original_stream = llm_processor.chat_completion_stream
+    original_raw = llm_processor.chat_completion_stream_raw
+    original_execute = llm_processor.execute_tool
+
+    def wrap_stream(func):
+        def wrapped(*args, **kwargs):
+            timeline.mark('llm_request')
+            start = time.perf_counter()
+            stream = func(*args, **kwargs)
+            timeline.llm_s += time.perf_counter() - start
+            return TimedStream(stream, timeline)
+        return wrapped
+
+    def timed_execute(*args, **kwargs):
+        timeline.mark('execute_tool')
+        start = time.perf_counter()
+        try:
+            return original_execute(*args, **kwargs)
+        finally:
+            timeline.tool_s += time.perf_counter() - start
+
+    llm_processor.chat_completion_stream = wrap_stream(original_stream)
+    llm_processor.chat_completion_stream_raw = wrap_stream(original_raw)
+    llm_processor.execute_tool = timed_execute
+
+    def restore():
+        llm_processor.chat_completion_stream = original_stream
+        llm_processor.chat_completion_stream_raw = original_raw
+        llm_processor.execute_tool = original_execute
+    return restore
+
+def run_query(config):
+    timeline = Timeline()
+    restore = instrument(timeline)
+    try:
+        start = time.perf_counter()
+        turns = 0
+        for event in llm_processor.LLMProcessor(config).process('Benchmark question', [], []):
+            if event.get('event') == 'turn_end':
+                turns += 1
+        total_s = time.perf_counter() - start
+    finally:
+        restore()
+
+    stream_ends = [t for n, t in timeline.marks if n == 'stream_end']
+    execute_at = timeline.first('execute_tool')
+    return {
+        'total_ms': total_s * 1000,
+        'turns': turns,
+        'prompt_build_ms': (timeline.first('llm_request') - start) * 1000,
+        'tool_parse_ms': (execute_at - stream_ends[0]) * 1000 if execute_at and stream_ends else 0.0,
+        'execute_tool_ms': timeline.tool_s * 1000,
+        'llm_ms': timeline.llm_s * 1000,
+        'overhead_per_turn_ms': (total_s - timeline.llm_s - timeline.tool_s) * 1000 / max(turns, 1),
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--tool', default='list_files', help='Tool the mock model calls on the first turn')
+    arg_parser.add_argument('--tool-args', default='{"directory_path": "."}')
+    arg_parser.add_argument('--raw-stream', action='store_true', help='Use the raw SSE streaming path')
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    mock, base_url = start_in_thread(MockOptions(tool_call={"name": args.tool, "args": json.loads(args.tool_args)}))
+    config = {'apiKey': 'bench', 'baseUrl': base_url, 'standardTextModel': 'mock-model',
+              'highSpeedTextModel': 'mock-model', 'rawStream': args.raw_stream}
+
+    # Run tools against a small synthetic workspace
+    workspace = tempfile.mkdtemp(prefix='wand_bench_')
+    for i in range(20):
+        with open(os.path.join(workspace, f"file_{i}.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"content {i}\n")
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        run_query(config) # warm up imports and the pooled connection
+        runs = [run_query(config) for _ in range(args.repeat)]
+    finally:
+        os.chdir(cwd)
+        mock.shutdown()
+
+    if any(run['turns'] != 2 for run in runs):
+        raise RuntimeError(f"Expected 2 turns per query (tool call + answer), got {[run['turns'] for run in runs]}")
+
+    result = {'case': 'raw_stream' if args.raw_stream else 'sdk_stream', 'tool': args.tool, 'runs': args.repeat}
+    for key in ('total_ms', 'prompt_build_ms', 'tool_parse_ms', 'execute_tool_ms', 'llm_ms', 'overhead_per_turn_ms'):
+        result[key.replace('_ms', '_median_ms')] = round(statistics.median(run[key] for run in runs), 3)
+    bench_utils.write_results('agent_turn', [result], args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+End-to-end cli.py benchmark against the local mock LLM server.
+
+Cases:
+    oneshot_get_tools   spawn `cli.py`, run get_tools, exit (cold start of a one-shot command)
+    serve_startup       spawn `cli.py --serve` until its first get_tools response
+    chat_cold           spawn `cli.py --serve` and run one chat: time to first chunk and to done
+    chat_warm           further chats on an already running backend
+
+Usage:
+    python src/backend/benchmarks/bench_cli.py [--repeat 5] [--ttft-ms 0] [--tokens-per-sec 0] [--output results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import bench_utils
+from mock_llm_server import MockOptions, start_in_thread
+
+CLI_PATH = os.path.join(bench_utils.BACKEND_DIR, 'cli.py')
+
+class ServeProcess:
+    """A `cli.py --serve` child process driven over NDJSON."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [sys.executable, CLI_PATH, '--serve'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', bufsize=1
+        )
+        self.next_id = 1
+
+    def request(self, payload):
+        """Sends one request; returns (ms to the first output line, ms to done, output lines)."""
+        request_id = self.next_id
+        self.next_id += 1
+        start = time.perf_counter()
+        self.proc.stdin.write(json.dumps(dict(payload, id=request_id)) + '\n')
+        self.proc.stdin.flush()
+
+        first_ms = None
+        lines = []
+        while True:
+            line = self.proc.stdout.readline()
+            if not line:
+                raise RuntimeError('cli.py --serve exited unexpectedly')
+            message = json.loads(line)
+            if message.get('id') != request_id:
+                continue
+            if message.get('done'):
+                return first_ms, (time.perf_counter() - start) * 1000, lines
+            if first_ms is None:
+                first_ms = (time.perf_counter() - start) * 1000
+            lines.append(message)
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+def oneshot_get_tools():
+    proc = subprocess.run(
+        [sys.executable, CLI_PATH],
+        input=json.dumps({'type': 'get_tools'}), capture_output=True, text=True, encoding='utf-8'
+    )
+    if 'tools' not in proc.stdout:
+        raise RuntimeError(f"get_tools failed: {proc.stdout[:200]} {proc.stderr[-500:]}")
+
+def serve_startup():
+    server = ServeProcess()
+    server.request({'type': 'get_tools'})
+    server.close()
+
+def chat_payload(base_url):
+    return {
+        'type': 'chat',
+        'message': 'Benchmark question',
+        'history': [],
+        'config': {'apiKey': 'bench', 'baseUrl': base_url, 'standardTextModel': 'mock-model', 'highSpeedTextModel': 'mock-model'}
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--ttft-ms', type=float, default=0, help='Mock server time to first token')
+    arg_parser.add_argument('--tokens-per-sec', type=float, default=0, help='Mock server streaming rate (0 = unthrottled)')
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    mock, base_url = start_in_thread(MockOptions(ttft_ms=args.ttft_ms, tokens_per_sec=args.tokens_per_sec))
+    payload = chat_payload(base_url)
+    results = []
+
+    for name, func in [('oneshot_get_tools', oneshot_get_tools), ('serve_startup', serve_startup)]:
+        timing = bench_utils.measure(func, repeat=args.repeat)
+        timing["case"] = name
+        results.append(timing)
+
+    # Cold chat: a fresh backend per run
+    first, total = [], []
+    for _ in range(args.repeat):
+        server = ServeProcess()
+        start = time.perf_counter()
+        first_ms, _, _ = server.request(payload)
+        first.append(first_ms)
+        total.append((time.perf_counter() - start) * 1000)
+        server.close()
+    results.append(dict(case='chat_cold', ttfc_median_ms=bench_utils.summarize(first)['median_ms'],
+                        total_median_ms=bench_utils.summarize(total)['median_ms'], runs=args.repeat))
+
+    # Warm chat: one backend, first request excluded
+    server = ServeProcess()
+    server.request(payload)
+    first, total = [], []
+    for _ in range(args.repeat):
+        first_ms, total_ms, lines = server.request(payload)
+        if not any('events' in line for line in lines):
+            raise RuntimeError(f"chat returned no events: {lines[:3]}")
+        first.append(first_ms)
+        total.append(total_ms)
+    server.close()
+    results.append(dict(case='chat_warm', ttfc_median_ms=bench_utils.summarize(first)['median_ms'],
+                        ttfc_min_ms=bench_utils.summarize(first)['min_ms'],
+                        total_median_ms=bench_utils.summarize(total)['median_ms'], runs=args.repeat))
+
+    mock.shutdown()
+    bench_utils.write_results('cli', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Workspace index build time on synthetic workspaces, with summaries from the local mock LLM server.
+
+For each size a temporary workspace of small text files in nested directories is created, then:
+    scan_workspace      the structure-only scan
+    index_cold          get_workspace_content_index with no .wand index (every file summarized)
+    index_warm          the same call again with nothing changed (hashing only)
+
+Usage:
+    python src/backend/benchmarks/bench_index.py [--sizes 1000,10000,100000] [--files-per-dir 100] [--keep] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import bench_utils
+import tools
+from mock_llm_server import MockOptions, start_in_thread
+
+def build_workspace(root, file_count, files_per_dir):
+    for i in range(file_count):
+        directory = os.path.join(root, f"pkg_{i // (files_per_dir * files_per_dir)}", f"mod_{(i // files_per_dir) % files_per_dir}")
+        if i % files_per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        ext = ('.py', '.ts', '.md', '.json')[i % 4]
+        with open(os.path.join(directory, f"file_{i}{ext}"), 'w', encoding='utf-8') as f:
+            f.write(f"# synthetic file {i}\n" + f"value_{i} = {i}\n" * (i % 20 + 1))
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', default='1000,10000,100000', help='Workspace sizes in files, comma separated')
+    arg_parser.add_argument('--files-per-dir', type=int, default=100)
+    arg_parser.add_argument('--keep', action='store_true', help='Keep the synthetic workspaces')
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    mock, base_url = start_in_thread(MockOptions())
+    tools.set_llm_config({'apiKey': 'bench', 'baseUrl': base_url, 'standardTextModel': 'mock-model', 'highSpeedTextModel': 'mock-model'})
+
+    results = []
+    cwd = os.getcwd()
+    try:
+        for size in [int(s) for s in args.sizes.split(',')]:
+            workspace = tempfile.mkdtemp(prefix=f'wand_index_{size}_')
+            build_ms, _ = timed(lambda: build_workspace(workspace, size, args.files_per_dir))
+            os.chdir(workspace)
+            try:
+                scan_ms, scanned = timed(lambda: tools.execute_tool('scan_workspace', workspace_path=workspace))
+                cold_ms, index_json = timed(lambda: tools.execute_tool('get_workspace_content_index'))
+                warm_ms, _ = timed(lambda: tools.execute_tool('get_workspace_content_index'))
+            finally:
+                os.chdir(cwd)
+                if not args.keep:
+                    shutil.rmtree(workspace, ignore_errors=True)
+
+            if not isinstance(scanned, list) or len(scanned) != size:
+                raise RuntimeError(f"scan_workspace failed: {str(scanned)[:300]}")
+            try:
+                indexed = len(json.loads(index_json))
+            except (TypeError, ValueError):
+                raise RuntimeError(f"Index build failed: {str(index_json)[:300]}")
+
+            results.append({
+                "case": "workspace_index",
+                "files": size,
+                "indexed_files": indexed,
+                "workspace_build_ms": round(build_ms, 3),
+                "scan_workspace_ms": round(scan_ms, 3),
+                "index_cold_ms": round(cold_ms, 3),
+                "index_warm_ms": round(warm_ms, 3),
+                "index_cold_files_per_sec": round(size / (cold_ms / 1000), 1)
+            })
+    finally:
+        mock.shutdown()
+
+    bench_utils.write_results('index', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+CPU cost of consuming a long streamed answer through the OpenAI SDK stream
+(one pydantic ChatCompletionChunk per token) versus api_client.chat_completion_stream_raw
+(SSE lines parsed with jiter into plain tuples).
+
+Uses the in-process local server from bench_ttft.py, so the numbers are dominated by
+client-side parsing rather than network latency (CPU time includes the server thread,
+which does the same work in both cases).
+
+Usage:
+    python src/backend/benchmarks/bench_raw_stream.py [--tokens 20000] [--repeat 5] [--output results.json]
+"""
+import argparse
+import time
+
+import bench_utils
+import api_client
+from bench_ttft import StreamHandler, start_local_server
+from llm_processor import sdk_tuples
+
+def consume(stream):
+    """Drains a (content, finish_reason, usage) stream; returns (characters, CPU ms)."""
+    start = time.process_time()
+    chars = 0
+    for content, finish_reason, usage, tool_calls in stream:
+        if content:
+            chars += len(content)
+    return chars, (time.process_time() - start) * 1000
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--tokens', type=int, default=20000, help='Chunks per streamed answer')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    StreamHandler.tokens = [f" token{i % 100}" for i in range(args.tokens)]
+    server, base_url = start_local_server()
+    messages = [{"role": "user", "content": "Write a long answer"}]
+
+    cases = [
+        ('sdk_stream', lambda: sdk_tuples(api_client.chat_completion_stream('bench', base_url, 'bench', messages))),
+        ('raw_stream', lambda: api_client.chat_completion_stream_raw('bench', base_url, 'bench', messages)),
+    ]
+
+    results = []
+    expected_chars = None
+    for name, create_stream in cases:
+        consume(create_stream()) # warm up imports and the pooled connection
+        cpu_samples = []
+        wall_samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            chars, cpu_ms = consume(create_stream())
+            wall_samples.append((time.perf_counter() - start) * 1000)
+            cpu_samples.append(cpu_ms)
+            if expected_chars is None:
+                expected_chars = chars
+            assert chars == expected_chars, f"{name} returned {chars} characters, expected {expected_chars}"
+
+        result = {"case": name, "chunks": args.tokens}
+        result.update({f"cpu_{k}": v for k, v in bench_utils.summarize(cpu_samples).items() if k != "runs"})
+        result["wall_median_ms"] = bench_utils.summarize(wall_samples)["median_ms"]
+        result["cpu_us_per_chunk"] = round(result["cpu_median_ms"] * 1000 / args.tokens, 3)
+        result["runs"] = args.repeat
+        results.append(result)
+
+    api_client.close_clients()
+    server.shutdown()
+    bench_utils.write_results('raw_stream', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Microbenchmark for stream_parser.TagStreamParser on multi-megabyte synthetic streams.
+
+Compares the tokenizer with the previous approach (the buffer state machine that
+lived in cli.main() plus `full_response +=` and `re.search` in LLMProcessor).
+
+Usage:
+    python src/backend/benchmarks/bench_stream_parser.py [--sizes 1,4,16] [--repeat 3] [--output results.json]
+"""
+import argparse
+import random
+import re
+
+import bench_utils
+from stream_parser import TagStreamParser, TEXT, CLOSE
+
+def build_stream(size_bytes, seed=0):
+    """Builds a list of deltas shaped like a long agent answer: token-sized text deltas and whole tool results."""
+    rng = random.Random(seed)
+    words = ["the", "file", "function", "returns", "a", "list", "of", "paths", "if", "x", "<", "y", "then", "call", "read_file", "and", "check", "index", "value"]
+    deltas = []
+    total = 0
+
+    def add_tokens(text):
+        nonlocal total
+        i = 0
+        while i < len(text):
+            n = rng.randint(1, 12)
+            deltas.append(text[i:i + n])
+            i += n
+        total += len(text)
+
+    while total < size_bytes:
+        thinking = " ".join(rng.choice(words) for _ in range(rng.randint(200, 2000)))
+        add_tokens(f"<thinking>\n{thinking}\n</thinking>\n<subtitle>Step summary</subtitle>\n")
+        add_tokens(" ".join(rng.choice(words) for _ in range(rng.randint(20, 200))) + "\n")
+        add_tokens('<tool>\n✿FUNCTION✿: read_file\n✿ARGS✿: {"file_path": "src/backend/tools.py"}\n</tool>')
+        # Tool results arrive as a single large delta, as LLMProcessor yields them
+        body = "\n".join(f"if a < b: value_{i} = a << {i}" for i in range(rng.randint(500, 5000)))
+        deltas.append(f"\n<tool_result>\n{body}\n</tool_result>\n")
+        total += len(body)
+    return deltas
+
+def legacy_cli(deltas):
+    """The previous cli.main() state machine (output is counted instead of printed)."""
+    buffer = ""
+    state = "NORMAL"
+    emitted = 0
+    for content in deltas:
+        buffer += content
+        while True:
+            if state == "NORMAL":
+                if "<thinking>" in buffer:
+                    pre, post = buffer.split("<thinking>", 1)
+                    emitted += 2 if pre else 1
+                    state = "THINKING"
+                    buffer = post
+                    continue
+                if "<tool>" in buffer:
+                    pre, post = buffer.split("<tool>", 1)
+                    emitted += 2 if pre else 1
+                    state = "TOOL"
+                    buffer = post
+                    continue
+                if len(buffer) > 20 and "<" not in buffer:
+                    emitted += 1
+                    buffer = ""
+                elif len(buffer) > 100:
+                    emitted += 1
+                    buffer = ""
+                break
+            else:
+                closing = "</thinking>" if state == "THINKING" else "</tool>"
+                if closing in buffer:
+                    pre, post = buffer.split(closing, 1)
+                    emitted += 2 if pre else 1
+                    state = "NORMAL"
+                    buffer = post
+                    continue
+                last_open = buffer.rfind("<")
+                if last_open != -1 and len(buffer) - last_open < 20:
+                    buffer = buffer[last_open:]
+                    emitted += 1
+                else:
+                    emitted += 1
+                    buffer = ""
+                break
+    return emitted
+
+def legacy_processor(deltas):
+    """The previous LLMProcessor tool detection: accumulate with += and regex the whole response."""
+    full_response = ""
+    for content in deltas:
+        full_response += content
+    match = re.search(r"<tool>(.*?)</tool>", full_response, re.DOTALL)
+    return match.group(1) if match else None
+
+def tokenizer_cli(deltas):
+    parser = TagStreamParser()
+    emitted = 0
+    for content in deltas:
+        emitted += len(parser.feed(content))
+    return emitted + len(parser.flush())
+
+def tokenizer_processor(deltas):
+    parser = TagStreamParser()
+    response_parts = []
+    tool_parts = []
+    tool_closed = False
+    for content in deltas:
+        response_parts.append(content)
+        if tool_closed:
+            continue
+        for kind, tag, text in parser.feed(content):
+            if tag != 'tool':
+                continue
+            if kind == TEXT:
+                tool_parts.append(text)
+            elif kind == CLOSE:
+                tool_closed = True
+                break
+    "".join(response_parts)
+    return "".join(tool_parts) if tool_closed else None
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', default='1,4,16', help='Stream sizes in MB, comma separated')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    results = []
+    for size_mb in [float(s) for s in args.sizes.split(',')]:
+        deltas = build_stream(int(size_mb * 1024 * 1024))
+        stream_bytes = sum(len(d) for d in deltas)
+        assert legacy_processor(deltas) == tokenizer_processor(deltas)
+
+        for name, func in [
+            ('legacy_cli', legacy_cli),
+            ('tokenizer_cli', tokenizer_cli),
+            ('legacy_processor', legacy_processor),
+            ('tokenizer_processor', tokenizer_processor),
+        ]:
+            timing = bench_utils.measure(lambda: func(deltas), repeat=args.repeat)
+            timing.update({
+                "case": name,
+                "size_mb": size_mb,
+                "deltas": len(deltas),
+                "throughput_mb_s": round(stream_bytes / 1024 / 1024 / (timing["median_ms"] / 1000), 2)
+            })
+            results.append(timing)
+
+    bench_utils.write_results('stream_parser', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Startup cost of loading tools.json: time, memory and the first call of a tool.
+
+A temporary tools.json holds the built-in tools plus N synthetic generated tools
+(see bench_tools_definitions.py). Every case loads it in a fresh interpreter:
+    eager_no_cache      every tool is compiled and executed (TOOL_BYTECODE_CACHE off)
+    eager_cold_cache    first start: compiles, executes and writes __pycache__/tools.<tag>.bin
+    eager_warm_cache    code objects come from the cache, every tool is still executed
+    lazy_warm_cache     tools are registered from their cached schema (TOOL_LAZY_LOADING);
+                        code is bound on the first call
+load_ms and load_kb (memory allocated by the load, via tracemalloc) are measured in
+separate runs; first_call_ms is one execute_tool call of a synthetic tool right after.
+
+Usage:
+    python src/backend/benchmarks/bench_tool_startup.py [--counts 100,500] [--repeat 5] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import bench_utils
+from bench_tools_definitions import synthetic_tool_record
+
+TOOLS_JSON = os.path.join(bench_utils.BACKEND_DIR, 'tools.json')
+
+# (TOOL_BYTECODE_CACHE, TOOL_LAZY_LOADING, clear the cache first)
+CASES = {
+    "eager_no_cache": (False, False, False),
+    "eager_cold_cache": (True, False, True),
+    "eager_warm_cache": (True, False, False),
+    "lazy_warm_cache": (True, True, False),
+}
+
+LOAD_SCRIPT = """
+import json, sys, time, tracemalloc
+sys.path.insert(0, {backend!r})
+import tools
+from configs.P10_config import P10Config
+P10Config.TOOL_BYTECODE_CACHE = {cache}
+P10Config.TOOL_LAZY_LOADING = {lazy}
+if {trace}:
+    tracemalloc.start()
+start = time.perf_counter()
+tools.load_tools_from_json({path!r})
+load_ms = (time.perf_counter() - start) * 1000
+load_kb = tracemalloc.get_traced_memory()[0] / 1024 if {trace} else None
+start = time.perf_counter()
+tools.execute_tool('bench_tool_0', file_path='a.txt', pattern='x')
+print(json.dumps({{"load_ms": load_ms, "load_kb": load_kb, "first_call_ms": (time.perf_counter() - start) * 1000}}))
+"""
+
+def write_tools_json(directory, count):
+    with open(TOOLS_JSON, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    for i in range(count):
+        record = synthetic_tool_record(i)
+        records[record['name']] = record
+    path = os.path.join(directory, 'tools.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    return path, len(records)
+
+def run_load(path, cache, lazy, clear, trace=False):
+    if clear:
+        shutil.rmtree(os.path.join(os.path.dirname(path), '__pycache__'), ignore_errors=True)
+    script = LOAD_SCRIPT.format(backend=bench_utils.BACKEND_DIR, cache=cache, lazy=lazy, trace=trace, path=path)
+    proc = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, encoding='utf-8', check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--counts', default='100,500', help='Synthetic tool counts, comma separated')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    results = []
+    for count in [int(c) for c in args.counts.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path, total = write_tools_json(tmp, count)
+            for case, (cache, lazy, clear) in CASES.items():
+                runs = [run_load(path, cache, lazy, clear) for _ in range(args.repeat)]
+                memory = run_load(path, cache, lazy, clear, trace=True)
+                load = bench_utils.summarize([r["load_ms"] for r in runs])
+                results.append({
+                    "case": case,
+                    "synthetic_tools": count,
+                    "tools": total,
+                    "load_median_ms": load["median_ms"],
+                    "load_min_ms": load["min_ms"],
+                    "load_kb": round(memory["load_kb"], 1),
+                    "first_call_median_ms": bench_utils.summarize([r["first_call_ms"] for r in runs])["median_ms"],
+                    "runs": args.repeat
+                })
+
+    bench_utils.write_results('tool_startup', results, args.output)
+
+if __name__ == '__main__':
+    main()
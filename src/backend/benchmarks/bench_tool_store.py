@@ -0,0 +1,64 @@
+"""
+Cost of saving a tool, changing its visibility and reading every tool as the number
+of stored tools grows: the tool store (tool_store.py) against rewriting tools.json
+the way save_tool used to (read the whole file, change one record, write it back).
+
+Usage:
+    python src/backend/benchmarks/bench_tool_store.py [--counts 100,1000] [--repeat 20] [--output results.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import bench_utils
+from bench_tools_definitions import synthetic_tool_record
+from tool_store import ToolStore
+
+def json_save(path, record):
+    with open(path, 'r', encoding='utf-8') as f:
+        tools_data = json.load(f)
+    tools_data[record['name']] = record
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(tools_data, f, indent=2, ensure_ascii=False)
+
+def json_load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--counts', default='100,1000', help='Stored tool counts, comma separated')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    results = []
+    for count in [int(c) for c in args.counts.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'tools.json')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({r['name']: r for r in map(synthetic_tool_record, range(count))}, f, indent=2, ensure_ascii=False)
+            store = ToolStore(os.path.join(tmp, 'tools.db'))
+            store.import_json(json_path)
+
+            record = synthetic_tool_record(count // 2)
+            visible = [True]
+            def toggle_visibility():
+                visible[0] = not visible[0]
+                store.set_visibility(record['name'], visible[0])
+
+            results.append({
+                "tools": count,
+                "json_save": bench_utils.measure(lambda: json_save(json_path, record), repeat=args.repeat),
+                "store_save": bench_utils.measure(lambda: store.save(record), repeat=args.repeat),
+                "store_set_visibility": bench_utils.measure(toggle_visibility, repeat=args.repeat),
+                "json_load": bench_utils.measure(lambda: json_load(json_path), repeat=args.repeat),
+                "store_load": bench_utils.measure(store.records, repeat=args.repeat),
+                "json_kb": round(os.path.getsize(json_path) / 1024, 1),
+            })
+
+    bench_utils.write_results('tool_store', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Cost and effect of running generated tools in worker processes (tool_workers.py).
+
+    call           a trivial generated tool: in this process vs in a warm worker
+    large_result   a tool returning N MB of text from a worker: through shared memory
+                   vs pickled through the pipe (TOOL_SHARED_MEMORY_MIN_CHARS = 0)
+    responsiveness the longest delay of a 10 ms ticker thread (standing in for the
+                   stream being forwarded) while a CPU-bound tool runs for 0.5 s
+    restart        a call right after a worker was killed by its timeout
+
+Usage:
+    python src/backend/benchmarks/bench_tool_workers.py [--sizes 1,10] [--repeat 10] [--output results.json]
+"""
+import argparse
+import threading
+import time
+
+import bench_utils
+import tools
+from configs.P10_config import P10Config
+from tool_workers import get_tool_pool
+
+TOOLS = {
+    'bench_worker_echo': 'def bench_worker_echo(x: int):\n    """Returns x."""\n    return str(x)\n',
+    'bench_worker_text': 'def bench_worker_text(mb: int):\n    """Returns mb megabytes of text."""\n    return ("0123456789abcde\\n" * 65536) * mb\n',
+    'bench_worker_spin': 'def bench_worker_spin(seconds: float):\n    """Busy loop."""\n    import time\n    end = time.perf_counter() + seconds\n    n = 0\n    while time.perf_counter() < end:\n        n += 1\n    return str(n)\n',
+    'bench_worker_sleep': 'def bench_worker_sleep():\n    """Never returns."""\n    import time\n    time.sleep(3600)\n',
+}
+
+def register_tools():
+    for name, code in TOOLS.items():
+        tools._register_tool_from_record({
+            "name": name, "description": code.split('"""')[1], "func": code, "permission_level": 5,
+            "is_visible": True, "is_gen": True, "tool_type": "general", "metadata": {}
+        })
+
+def max_tick_delay_ms(func):
+    """Runs func() while a thread sleeps in 10 ms steps; returns the longest oversleep."""
+    delays = []
+    stop = threading.Event()
+    def tick():
+        while not stop.is_set():
+            start = time.perf_counter()
+            time.sleep(0.01)
+            delays.append(time.perf_counter() - start - 0.01)
+    ticker = threading.Thread(target=tick)
+    ticker.start()
+    try:
+        func()
+    finally:
+        stop.set()
+        ticker.join()
+    return round(max(delays) * 1000, 3)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', default='1,10', help='Result sizes in MB, comma separated')
+    arg_parser.add_argument('--repeat', type=int, default=10)
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    register_tools()
+    pool = get_tool_pool()
+    pool.prestart()
+    results = []
+
+    P10Config.TOOL_PROCESS_POOL = False
+    inline = bench_utils.measure(lambda: tools.execute_tool('bench_worker_echo', x=1), repeat=args.repeat)
+    inline_tick = max_tick_delay_ms(lambda: tools.execute_tool('bench_worker_spin', seconds=0.5))
+    P10Config.TOOL_PROCESS_POOL = True
+    worker = bench_utils.measure(lambda: tools.execute_tool('bench_worker_echo', x=1), repeat=args.repeat)
+    worker_tick = max_tick_delay_ms(lambda: tools.execute_tool('bench_worker_spin', seconds=0.5))
+    results.append({"case": "call", "inline": inline, "worker": worker})
+    results.append({"case": "responsiveness", "inline_max_tick_delay_ms": inline_tick, "worker_max_tick_delay_ms": worker_tick})
+
+    shared_min_chars = P10Config.TOOL_SHARED_MEMORY_MIN_CHARS
+    for mb in [int(s) for s in args.sizes.split(',')]:
+        run = lambda: tools.execute_tool('bench_worker_text', mb=mb)
+        shared = bench_utils.measure(run, repeat=args.repeat)
+        P10Config.TOOL_SHARED_MEMORY_MIN_CHARS = 0
+        piped = bench_utils.measure(run, repeat=args.repeat)
+        P10Config.TOOL_SHARED_MEMORY_MIN_CHARS = shared_min_chars
+        results.append({"case": "large_result", "mb": mb, "shared_memory": shared, "pipe": piped})
+
+    timeout = P10Config.TOOL_TIMEOUT_SECONDS
+    P10Config.TOOL_TIMEOUT_SECONDS = 0.2
+    tools.execute_tool('bench_worker_sleep')
+    P10Config.TOOL_TIMEOUT_SECONDS = timeout
+    start = time.perf_counter()
+    tools.execute_tool('bench_worker_echo', x=1)
+    results.append({"case": "restart", "first_call_after_kill_ms": round((time.perf_counter() - start) * 1000, 3)})
+
+    pool.shutdown()
+    bench_utils.write_results('tool_workers', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Cost of tool registration, get_tools_definitions() and the system prompt as the
+registry grows. "cold" numbers rebuild after a registry change; the others hit the
+per-version caches every request after the first one uses. The retrieval columns
+are the cost of selecting the tools for a query and the size of the prompt listing
+only those (see tool_retrieval.py).
+
+Synthetic tools shaped like the generated tools in tools.json (typed parameters,
+Google-style docstring) are registered through the same path as tools.json records,
+on top of the built-in tools.
+
+Usage:
+    python src/backend/benchmarks/bench_tools_definitions.py [--counts 10,100,1000] [--repeat 5] [--output results.json]
+"""
+import argparse
+import json
+
+import bench_utils
+import llm_processor
+import tool_retrieval
+import tool_schema
+import tools
+from configs.P10_config import P10Config
+
+RETRIEVAL_QUERY = "Find every TODO comment in the files under src and list them"
+
+def synthetic_tool_record(i):
+    """A tools.json-style record for a generated tool named bench_tool_<i>."""
+    name = f"bench_tool_{i}"
+    code = f'''def {name}(file_path: str, pattern: str, max_results: int = 50, recursive: bool = True, options: dict = None):
+    """
+    Searches the file at file_path for lines matching pattern (synthetic tool {i}).
+
+    Args:
+        file_path (str): Path of the file to search. Example: "src/main.py"
+        pattern (str): Regular expression to match. Example: "def \\\\w+"
+        max_results (int): Maximum number of matches to return. Example: 50
+        recursive (bool): Whether to search directories recursively. Example: true
+        options (dict): Extra options. Example: {{"ignore_case": true}}
+
+    Returns:
+        str: Matching lines, one per line.
+    """
+    return f"{{file_path}}:{{pattern}}:{{max_results}}"
+'''
+    return {
+        "name": name,
+        "description": f"Searches a file for lines matching a pattern (synthetic tool {i}).",
+        "func": code,
+        "permission_level": 6,
+        "is_visible": True,
+        "is_gen": True,
+        "tool_type": "general",
+        "metadata": {}
+    }
+
+def register_synthetic_tools(count):
+    for i in range(count):
+        tools._register_tool_from_record(synthetic_tool_record(i))
+
+def unregister_synthetic_tools(count):
+    for i in range(count):
+        P10Config.TOOLS.unregister(f"bench_tool_{i}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--counts', default='10,100,1000', help='Synthetic tool counts, comma separated')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    builtin_count = len(P10Config.TOOLS.get_visible_tools())
+    results = []
+    for count in [int(c) for c in args.counts.split(',')]:
+        register = bench_utils.measure(lambda: register_synthetic_tools(count), repeat=1, warmup=0)
+        definitions_cold = bench_utils.measure(tools._build_tools_definitions, repeat=args.repeat)
+        definitions = bench_utils.measure(tools.get_tools_definitions, repeat=args.repeat)
+        prompt_cold = bench_utils.measure(
+            lambda: llm_processor.render_system_prompt(tools._build_tools_definitions(), False, True), repeat=args.repeat)
+        prompt = bench_utils.measure(lambda: llm_processor.system_prompt(False, True), repeat=args.repeat)
+        index_cold = bench_utils.measure(lambda: tool_retrieval.ToolIndex(tools.get_tools_definitions()), repeat=args.repeat)
+        select = bench_utils.measure(lambda: tool_retrieval.select_tools(RETRIEVAL_QUERY), repeat=args.repeat)
+        selected = tool_retrieval.select_tools(RETRIEVAL_QUERY)
+        prompt_chars_full = len(llm_processor.system_prompt(False, True))
+        retrieval_prompt_chars = len(llm_processor.system_prompt(False, True, selected))
+        indented_chars = len(json.dumps(tools.get_tools_definitions(), indent=2))
+        prompt_tokens = sum(d["tokens"] for d in tools.get_tools_definitions())
+        prompt_chars = len(tool_schema.compact_json(tools.get_tools_definitions()))
+        unregister_synthetic_tools(count)
+
+        results.append({
+            "case": "get_tools_definitions",
+            "synthetic_tools": count,
+            "registered_tools": count + builtin_count,
+            "register_ms": register["median_ms"],
+            "definitions_cold_median_ms": definitions_cold["median_ms"],
+            "definitions_median_ms": definitions["median_ms"],
+            "definitions_min_ms": definitions["min_ms"],
+            "system_prompt_cold_median_ms": prompt_cold["median_ms"],
+            "system_prompt_median_ms": prompt["median_ms"],
+            "indented_json_chars": indented_chars,
+            "prompt_json_chars": prompt_chars,
+            "prompt_json_tokens": prompt_tokens,
+            "system_prompt_chars": prompt_chars_full,
+            "retrieval_index_cold_median_ms": index_cold["median_ms"],
+            "retrieval_select_median_ms": select["median_ms"],
+            "retrieval_selected_tools": len(selected) if selected is not None else count + builtin_count,
+            "retrieval_system_prompt_chars": retrieval_prompt_chars,
+            "runs": args.repeat
+        })
+
+    bench_utils.write_results('tools_definitions', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Time-to-first-token of chat_completion_stream with a fresh OpenAI client per call
+(the previous behaviour) versus the shared, pooled client from api_client.get_client.
+
+By default a small streaming server is started in-process on localhost, so the
+numbers show client construction and connection setup rather than model latency.
+Pass --base-url to measure against another OpenAI-compatible endpoint instead
+(TLS endpoints show the largest difference, since a new client redoes the handshake).
+
+Usage:
+    python src/backend/benchmarks/bench_ttft.py [--requests 50] [--base-url URL --api-key KEY --model M] [--output results.json]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import bench_utils
+import api_client
+from openai import OpenAI
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions endpoint that streams a few chunks over a keep-alive connection."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True # as real servers do; otherwise small writes on a reused connection stall
+    tokens = ["Hello", " from", " the", " local", " server", "."]
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for token in self.tokens:
+            chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "bench",
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+def start_local_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def first_token_ms(create_stream):
+    """Returns (ms until the first content delta, total ms) for one streamed request."""
+    start = time.perf_counter()
+    stream = create_stream()
+    ttft = None
+    try:
+        for chunk in stream:
+            if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+                ttft = (time.perf_counter() - start) * 1000
+    finally:
+        stream.close()
+    return ttft, (time.perf_counter() - start) * 1000
+
+def run_case(name, create_stream, requests):
+    create_stream().close() # warm up imports and, for the pooled client, the connection
+    ttfts, totals = [], []
+    for _ in range(requests):
+        ttft, total = first_token_ms(create_stream)
+        ttfts.append(ttft)
+        totals.append(total)
+    result = {"case": name}
+    result.update({f"ttft_{k}": v for k, v in bench_utils.summarize(ttfts).items() if k != "runs"})
+    result["total_median_ms"] = bench_utils.summarize(totals)["median_ms"]
+    result["requests"] = requests
+    return result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--requests', type=int, default=50)
+    arg_parser.add_argument('--base-url', help='OpenAI-compatible endpoint (default: in-process local server)')
+    arg_parser.add_argument('--api-key', default='bench')
+    arg_parser.add_argument('--model', default='bench')
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = start_local_server()
+
+    messages = [{"role": "user", "content": "Say hello"}]
+
+    def per_call_client():
+        client = OpenAI(api_key=args.api_key, base_url=base_url)
+        return client.chat.completions.create(model=args.model, messages=messages, stream=True)
+
+    def pooled_client():
+        return api_client.chat_completion_stream(args.api_key, base_url, args.model, messages)
+
+    results = [
+        run_case('per_call_client', per_call_client, args.requests),
+        run_case('pooled_client', pooled_client, args.requests),
+    ]
+    api_client.close_clients()
+    if server:
+        server.shutdown()
+
+    bench_utils.write_results('ttft', results, args.output)
+
+if __name__ == '__main__':
+    main()
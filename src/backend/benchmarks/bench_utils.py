@@ -0,0 +1,52 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+Importing this module also puts src/backend on sys.path so benchmarks can import backend modules.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+def measure(func, repeat=5, warmup=1):
+    """Calls func() `repeat` times (after `warmup` untimed calls) and returns timings in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+def summarize(samples):
+    """Summarizes a list of millisecond samples."""
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "runs": len(samples)
+    }
+
+def write_results(name, results, output=None):
+    """Wraps results with environment info and writes them as JSON to `output` (or stdout)."""
+    payload = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return payload
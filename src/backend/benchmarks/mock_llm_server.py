@@ -0,0 +1,329 @@
+"""
+Local OpenAI-compatible mock LLM server for deterministic, offline benchmarks.
+
+Serves GET /v1/models and POST /v1/chat/completions (streaming and non-streaming)
+from scripted responses, with configurable time-to-first-token, tokens/sec,
+injected <tool> calls and 429/5xx faults. Point the app (or api_client) at it
+through baseUrl, e.g. http://127.0.0.1:8765/v1, with any API key.
+
+Script format (--script file.json): a list of rules; the first rule that matches
+a request is used.
+    {
+        "match": "regex",            optional, searched in the last user message
+        "turn": 0,                   optional, agent turn (see request_turn)
+        "content": "text",           response text (may contain <thinking> etc.)
+        "tool": {"name": "read_file", "args": {"file_path": "a.txt"}},
+                                     optional, appended as a <tool> block, or sent as a
+                                     native tool call when the request has `tools`
+        "tools": [{...}, ...],       optional, several tool calls
+        "fault": 503,                optional, answer with this HTTP error instead
+        "ttft_ms": 200, "tokens_per_sec": 50
+                                     optional per-rule timing overrides
+    }
+Without --script, built-in rules answer create_tool, the workspace index
+summaries and agent turns (optionally calling --tool-call on the first turn).
+
+Usage reports prompt_tokens_details.cached_tokens like OpenAI: the longest prefix
+of the prompt (tools, then messages, as sent) shared with one of the recent
+requests, so prompt prefix caching can be checked offline.
+
+Usage:
+    python src/backend/benchmarks/mock_llm_server.py [--port 8765] [--ttft-ms 0] [--tokens-per-sec 0]
+        [--script rules.json] [--tool-call NAME --tool-args JSON]
+        [--fault-rate 0.1 --fault-status 429,500,503 --seed 0] [--reject-tools]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+CREATE_TOOL_RESPONSE = '''Name: mock_word_count
+Description: Counts the words in a text.
+Code:
+```python
+def mock_word_count(text: str):
+    """
+    Counts the words in a text.
+
+    Args:
+        text (str): The text to count. Example: "hello world"
+
+    Returns:
+        int: Number of words.
+    """
+    return len(text.split())
+```'''
+
+AGENT_ANSWER = (
+    "<thinking>\nThe user asked a question. I have enough information to answer directly.\n</thinking>\n"
+    "<subtitle>Answering</subtitle>\n"
+    "Here is the answer from the mock server. It streams a few sentences so that "
+    "time-to-first-token and tokens/sec settings have a measurable effect on the client."
+)
+
+DEFAULT_RULES = [
+    {"match": r"Create a tool for this requirement", "content": CREATE_TOOL_RESPONSE},
+    {"match": r"Please describe the contents of this file", "content": "A mock description of the file: it contains source code or text used by the project."},
+    {"content": AGENT_ANSWER},
+]
+
+# User messages that carry tool output back to the model rather than a new query
+_TOOL_OUTPUT_RE = re.compile(r"^\s*(Tool '.*' Output:|Error)")
+_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+
+def request_turn(messages):
+    """
+    Agent turn of a request: the number of assistant messages since the last
+    user query. LLMProcessor sends tool output back as user messages, which
+    do not start a new query.
+    """
+    turn = 0
+    for msg in reversed(messages):
+        role = msg.get('role')
+        content = msg.get('content') or ''
+        if role == 'assistant':
+            turn += 1
+        elif role == 'user' and isinstance(content, str) and not _TOOL_OUTPUT_RE.match(content):
+            break
+    return turn
+
+
+def last_user_message(messages):
+    """The last user message, or the last tool message for native tool call results."""
+    for msg in reversed(messages):
+        if msg.get('role') in ('user', 'tool') and isinstance(msg.get('content'), str):
+            return msg['content']
+    return ''
+
+
+def tool_block(tool):
+    return f"\n<tool>\n✿FUNCTION✿: {tool['name']}\n✿ARGS✿: {json.dumps(tool.get('args', {}), ensure_ascii=False)}\n</tool>"
+
+
+def apply_stop(text, stop):
+    """Cuts `text` before the first stop sequence, like the OpenAI API does."""
+    if not stop:
+        return text
+    if isinstance(stop, str):
+        stop = [stop]
+    cut = min((i for i in (text.find(s) for s in stop if s) if i != -1), default=-1)
+    return text[:cut] if cut != -1 else text
+
+
+class MockOptions:
+    def __init__(self, models=None, rules=None, ttft_ms=0, tokens_per_sec=0, tool_call=None,
+                 fault_rate=0.0, fault_statuses=(429, 500, 503), seed=0, reject_tools=False):
+        self.models = models or ['mock-model']
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        if tool_call and rules is None:
+            # Call the tool on the first agent turn, then answer
+            self.rules.insert(2, {"turn": 0, "content": "<thinking>\nI need to call a tool first.\n</thinking>\n", "tool": tool_call})
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.fault_rate = fault_rate
+        self.fault_statuses = list(fault_statuses)
+        self.random = random.Random(seed)
+        self.reject_tools = reject_tools # answer requests with `tools` with a 400, like providers without function calling
+
+
+def create_app(options=None):
+    """Builds the Flask app. Request counters are available at GET /mock/stats."""
+    options = options or MockOptions()
+    app = Flask(__name__)
+    lock = threading.Lock()
+    stats = {'requests': 0, 'streamed': 0, 'faults': 0, 'cached_tokens': 0}
+    recent_prompts = [] # serialized prompts of the last requests, for cached_tokens
+
+    def pick_rule(messages):
+        turn = request_turn(messages)
+        query = last_user_message(messages)
+        for rule in options.rules:
+            if 'turn' in rule and rule['turn'] != turn:
+                continue
+            if 'match' in rule and not re.search(rule['match'], query):
+                continue
+            return rule
+        return {"content": AGENT_ANSWER}
+
+    def fault_response(status):
+        with lock:
+            stats['faults'] += 1
+        kind = 'rate_limit_exceeded' if status == 429 else 'server_error'
+        response = jsonify({"error": {"message": f"Mock fault {status}", "type": kind, "code": status}})
+        response.status_code = status
+        if status == 429:
+            response.headers['Retry-After'] = '1'
+        return response
+
+    def cached_prefix_tokens(body):
+        """Tokens of the longest prompt prefix shared with a recent request (about 4 chars per token)."""
+        prompt = json.dumps(body.get('tools'), ensure_ascii=False) + json.dumps(body.get('messages'), ensure_ascii=False)
+        with lock:
+            shared = max((len(os.path.commonprefix([prompt, earlier])) for earlier in recent_prompts), default=0)
+            recent_prompts.append(prompt)
+            del recent_prompts[:-16]
+            stats['cached_tokens'] += shared // 4
+        return shared // 4
+
+    def usage_for(messages, completion_tokens, cached_tokens=0):
+        prompt_chars = sum(len(m.get('content') or '') for m in messages if isinstance(m.get('content'), str))
+        prompt_tokens = prompt_chars // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": min(cached_tokens, prompt_tokens)}}
+
+    @app.route('/v1/models', methods=['GET'])
+    def list_models():
+        return jsonify({"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": "mock"} for m in options.models]})
+
+    @app.route('/mock/stats', methods=['GET'])
+    def get_stats():
+        with lock:
+            return jsonify(dict(stats))
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(force=True, silent=True) or {}
+        messages = body.get('messages') or []
+        model = body.get('model') or options.models[0]
+        with lock:
+            stats['requests'] += 1
+            injected_fault = options.fault_rate and options.random.random() < options.fault_rate
+            fault_status = options.random.choice(options.fault_statuses) if injected_fault else None
+
+        if options.reject_tools and body.get('tools'):
+            response = jsonify({"error": {"message": "tools is not supported for this model", "type": "invalid_request_error"}})
+            response.status_code = 400
+            return response
+
+        rule = pick_rule(messages)
+        if rule.get('fault'):
+            fault_status = rule['fault']
+        if fault_status:
+            return fault_response(int(fault_status))
+
+        cached_tokens = cached_prefix_tokens(body)
+        text = rule.get('content', '')
+        calls = rule.get('tools') or ([rule['tool']] if rule.get('tool') else [])
+        native_calls = []
+        if body.get('tools'):
+            # Native function calling: calls are sent as tool_calls deltas after the text
+            native_calls = [{"id": f"call_{uuid.uuid4().hex[:12]}", "name": call['name'],
+                             "arguments": json.dumps(call.get('args', {}), ensure_ascii=False)} for call in calls]
+        else:
+            text += ''.join(tool_block(call) for call in calls)
+        text = apply_stop(text, body.get('stop'))
+        finish_reason = 'tool_calls' if native_calls else 'stop'
+        tokens = _TOKEN_RE.findall(text)
+
+        ttft = rule.get('ttft_ms', options.ttft_ms) / 1000
+        tokens_per_sec = rule.get('tokens_per_sec', options.tokens_per_sec)
+        token_delay = 1 / tokens_per_sec if tokens_per_sec else 0
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get('stream'):
+            time.sleep(ttft + token_delay * len(tokens))
+            message = {"role": "assistant", "content": text}
+            if native_calls:
+                message["tool_calls"] = [{"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}} for c in native_calls]
+            return jsonify({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage_for(messages, len(tokens), cached_tokens)
+            })
+
+        include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+        with lock:
+            stats['streamed'] += 1
+
+        def chunk(delta, finish=None, usage=None, choices=True):
+            data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if choices else []}
+            if usage:
+                data["usage"] = usage
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        def generate():
+            time.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            next_time = time.perf_counter()
+            for token in tokens:
+                if token_delay:
+                    # Pace by schedule so per-token overhead does not lower the rate
+                    next_time += token_delay
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                yield chunk({"content": token})
+            for index, call in enumerate(native_calls):
+                yield chunk({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                             "function": {"name": call["name"], "arguments": ""}}]})
+                # Arguments arrive in pieces, as with real providers
+                for start in range(0, len(call["arguments"]), 16):
+                    yield chunk({"tool_calls": [{"index": index, "function": {"arguments": call["arguments"][start:start + 16]}}]})
+            yield chunk({}, finish=finish_reason)
+            if include_usage:
+                yield chunk(None, usage=usage_for(messages, len(tokens), cached_tokens), choices=False)
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    return app
+
+
+def start_in_thread(options=None, host='127.0.0.1', port=0):
+    """Runs the mock server on a background thread; returns (server, base_url). Call server.shutdown() to stop."""
+    import logging
+    from werkzeug.serving import make_server
+    # Per-request access logs would interleave with benchmark output
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server(host, port, create_app(options), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--models', default='mock-model', help='Comma separated model ids for /v1/models')
+    arg_parser.add_argument('--script', help='JSON file with response rules (see module docstring)')
+    arg_parser.add_argument('--ttft-ms', type=float, default=0, help='Delay before the first chunk')
+    arg_parser.add_argument('--tokens-per-sec', type=float, default=0, help='Streaming rate (0 = as fast as possible)')
+    arg_parser.add_argument('--tool-call', help='Tool to call on the first agent turn (built-in rules only)')
+    arg_parser.add_argument('--tool-args', default='{}', help='JSON arguments for --tool-call')
+    arg_parser.add_argument('--fault-rate', type=float, default=0.0, help='Fraction of requests answered with a fault')
+    arg_parser.add_argument('--fault-status', default='429,500,503', help='Comma separated fault status codes')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Seed for fault injection')
+    arg_parser.add_argument('--reject-tools', action='store_true', help='Reject requests that use native function calling')
+    args = arg_parser.parse_args()
+
+    rules = None
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+
+    options = MockOptions(
+        models=args.models.split(','),
+        rules=rules,
+        ttft_ms=args.ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        tool_call={"name": args.tool_call, "args": json.loads(args.tool_args)} if args.tool_call else None,
+        fault_rate=args.fault_rate,
+        fault_statuses=[int(s) for s in args.fault_status.split(',')],
+        seed=args.seed,
+        reject_tools=args.reject_tools
+    )
+    print(f"Mock LLM server on http://{args.host}:{args.port}/v1")
+    create_app(options).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Runs the benchmark suite and writes the combined results as one JSON document,
+so runs from different builds can be compared.
+
+Each benchmark runs in its own interpreter (they import and mutate backend state).
+The LLM-facing benchmarks use the local mock server (mock_llm_server.py), so the
+suite runs offline.
+
+Usage:
+    python src/backend/benchmarks/run_all.py [--quick] [--only cli,agent_turn] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (script, full arguments, --quick arguments)
+BENCHMARKS = {
+    'cli': ('bench_cli.py', [], ['--repeat', '3']),
+    'ttft': ('bench_ttft.py', [], ['--requests', '20']),
+    'agent_turn': ('bench_agent_turn.py', [], ['--repeat', '5']),
+    'stream_parser': ('bench_stream_parser.py', [], ['--sizes', '1', '--repeat', '1']),
+    'raw_stream': ('bench_raw_stream.py', [], ['--tokens', '5000', '--repeat', '2']),
+    'tools_definitions': ('bench_tools_definitions.py', [], ['--repeat', '3']),
+    'tool_startup': ('bench_tool_startup.py', [], ['--counts', '500', '--repeat', '3']),
+    'tool_store': ('bench_tool_store.py', [], ['--counts', '1000', '--repeat', '5']),
+    'tool_workers': ('bench_tool_workers.py', [], ['--sizes', '10', '--repeat', '3']),
+    'index': ('bench_index.py', [], ['--sizes', '1000']),
+}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--quick', action='store_true', help='Smaller sizes and fewer repetitions')
+    arg_parser.add_argument('--only', help=f"Comma separated subset of: {', '.join(BENCHMARKS)}")
+    arg_parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        arg_parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    suite = {
+        "suite": "wand-backend",
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "benchmarks": {}
+    }
+
+    failed = False
+    for name in names:
+        script, full_args, quick_args = BENCHMARKS[name]
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'result.json')
+            command = [sys.executable, os.path.join(BENCH_DIR, script)] + (quick_args if args.quick else full_args) + ['--output', output]
+            sys.stderr.write(f"Running {name}...\n")
+            start = time.perf_counter()
+            proc = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', errors='replace')
+            elapsed = round(time.perf_counter() - start, 2)
+
+            if proc.returncode != 0 or not os.path.exists(output):
+                failed = True
+                suite["benchmarks"][name] = {"error": proc.stderr[-2000:], "elapsed_s": elapsed}
+                sys.stderr.write(f"  failed after {elapsed}s\n")
+                continue
+            with open(output, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            suite["benchmarks"][name] = {"results": result["results"], "elapsed_s": elapsed}
+            sys.stderr.write(f"  done in {elapsed}s\n")
+
+    text = json.dumps(suite, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import sys
 import json
 import os
+import threading
 
 # Ensure the directory containing this script is in sys.path
 # This is crucial for embedded Python environments to find sibling modules
@@ -8,9 +9,10 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 if script_dir not in sys.path:
     sys.path.insert(0, script_dir)
 
-from api_client import fetch_available_models
-from llm_processor import LLMProcessor
+# Command-specific modules (api_client -> openai/httpx/pydantic, llm_processor)
+# are imported inside handle_request so registry commands start quickly.
 from tools import get_tools_definitions
+from tool_manifest import write_tool_manifest
 from configs.P10_config import P10Config
 
 # Try to load temporary tools so they are registered in P10Config.TOOLS
@@ -31,7 +33,130 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 if os.path.exists(project_root):
     os.chdir(project_root)
 
+def handle_request(request_data, emit, cancel_event=None):
+    """
+    Runs a single backend command.
+    Every output object is passed to `emit`; chat requests emit one object per chunk.
+    `cancel_event` (threading.Event) stops an ongoing chat stream when set.
+    """
+    command_type = request_data.get('type', 'chat') # Default to chat
+    config = request_data.get('config') or {}
+
+    # 1. Extract Configuration
+    api_key = config.get('apiKey')
+    base_url = config.get('baseUrl')
+
+    if command_type == 'clear_temp_tools':
+        from tools import clear_temporary_tools
+        result = clear_temporary_tools()
+        emit({'status': 'success', 'message': result})
+        return
+
+    if command_type == 'save_tool':
+        from tools import save_tool
+        tool_data = request_data.get('tool_data', {})
+        result = save_tool(
+            tool_data.get('name'),
+            tool_data.get('code'),
+            tool_data.get('description'),
+            tool_data.get('permission_level', 9),
+            tool_data.get('tool_type', 'general'),
+            tool_data.get('is_gen', True),
+            tool_data.get('metadata', {})
+        )
+        emit({'status': 'success', 'message': result})
+        return
+
+    if command_type == 'delete_tool':
+        from tools import delete_tool
+        name = request_data.get('name')
+        result = delete_tool(name)
+        emit({'status': 'success', 'message': result})
+        return
+
+    if command_type == 'update_tool_visibility':
+        from tools import update_tool_visibility_config
+        name = request_data.get('name')
+        visible = request_data.get('visible')
+        result = update_tool_visibility_config(name, visible)
+        emit({'status': 'success', 'message': result})
+        return
+
+    if command_type == 'get_tools':
+        tools = get_tools_definitions()
+        emit({'tools': tools})
+        return
+
+    if command_type == 'get_emitter_stats':
+        from frame_emitter import STATS
+        emit({'stats': STATS.snapshot()})
+        return
+
+    if command_type == 'get_all_tools':
+        from tools import P10Config
+        tools_dict = P10Config.TOOLS.get_all_tools()
+        tools_list = list(tools_dict.values())
+        emit({'tools': tools_list})
+        return
+
+    if not api_key:
+        emit({'error': 'Missing API Key. Please configure it in settings.'})
+        return
+
+    if command_type == 'fetch_models':
+        from api_client import fetch_available_models
+        result = fetch_available_models(api_key, base_url)
+        emit(result)
+        return
+
+    message = request_data.get('message')
+    history = request_data.get('history', [])
+
+    # Set Workspace Path if provided (only chats change the process's working directory; see serve())
+    workspace_path = config.get('workspacePath')
+    if workspace_path and os.path.exists(workspace_path):
+        os.chdir(workspace_path)
+
+    # 4. Process with LLM
+    from llm_processor import LLMProcessor
+    processor = LLMProcessor(config, cancel_event)
+
+    # Use user-attached files if any
+    selected_files = config.get('files', [])
+
+    stream = processor.process(message, history, selected_files)
+
+    # 5. Output the typed events (text_delta, thinking_delta, tool_call_start, ...) as JSON lines
+    for event in stream:
+        if cancel_event is not None and cancel_event.is_set():
+            # Closing the generator also releases the underlying HTTP stream
+            stream.close()
+            return
+        emit(event)
+
+# Commands that wait on the LLM provider; in --serve mode these run on worker threads
+THREADED_COMMANDS = {'chat', 'fetch_models'}
+
+def update_tool_manifest():
+    """Rewrites tools_manifest.json if the request changed the registry (read by the Electron main process)."""
+    try:
+        write_tool_manifest()
+    except Exception as e:
+        sys.stderr.write(f"Warning: Could not write tool manifest: {e}\n")
+
+def prestart_tool_workers():
+    try:
+        from tool_workers import get_tool_pool
+        get_tool_pool().prestart()
+    except Exception as e:
+        sys.stderr.write(f"Warning: Could not start tool worker: {e}\n")
+
+def print_json(payload):
+    print(json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
 def main():
+    """One-shot mode: reads a single request from stdin and exits."""
     try:
         # Read all input from stdin
         input_str = sys.stdin.read()
@@ -39,177 +164,191 @@ def main():
             return
 
         request_data = json.loads(input_str)
-        command_type = request_data.get('type', 'chat') # Default to chat
-        config = request_data.get('config', {})
-        
-        # 0. Set Workspace Path if provided
-        workspace_path = config.get('workspacePath')
-        if workspace_path and os.path.exists(workspace_path):
-            os.chdir(workspace_path)
-        
-        # 1. Extract Configuration
-        api_key = config.get('apiKey')
-        base_url = config.get('baseUrl')
-
-        if command_type == 'clear_temp_tools':
-            from tools import clear_temporary_tools
-            result = clear_temporary_tools()
-            print(json.dumps({'status': 'success', 'message': result}))
-            return
+        handle_request(request_data, print_json)
+        update_tool_manifest()
+
+    except Exception as e:
+        # Output error as JSON
+        print_json({'error': str(e)})
+
+def serve():
+    """
+    Long-lived mode (--serve): the tool registry is loaded once and requests are
+    read from stdin as newline-delimited JSON objects, each carrying an 'id'.
+    Every output line echoes the request id, and each request is terminated
+    by {'id': ..., 'done': true}. A {'type': 'cancel', 'target': id} request
+    stops an ongoing chat without restarting the process.
+    Chat events are coalesced into {'events': [...]} frames by FrameEmitter.
+
+    Chats run one at a time, as the UI sends them: each one sets the process's
+    working directory and tools.LLM_CONFIG for the built-in tools it calls. A chat
+    sent while another is running waits for it (or for its cancel); fetch_models
+    and registry commands do not wait.
+    """
+    write_lock = threading.Lock()
+    chat_lock = threading.Lock()
+    active_requests = {}
+    workers = []
+
+    # A manifest left by an earlier run (or version) may list tools that are gone;
+    # the registry is loaded by now, so replace it before the first request
+    update_tool_manifest()
 
-        if command_type == 'save_tool':
-            from tools import save_tool
-            tool_data = request_data.get('tool_data', {})
-            result = save_tool(
-                tool_data.get('name'), 
-                tool_data.get('code'), 
-                tool_data.get('description'),
-                tool_data.get('permission_level', 9),
-                tool_data.get('tool_type', 'general'),
-                tool_data.get('is_gen', True),
-                tool_data.get('metadata', {})
+    if P10Config.TOOL_PROCESS_POOL:
+        # The first generated tool call then finds a worker process ready
+        threading.Thread(target=prestart_tool_workers, daemon=True).start()
+
+    def make_emit(request_id):
+        def emit(payload):
+            line = json.dumps(dict(payload, id=request_id), ensure_ascii=False) + '\n'
+            with write_lock:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            return len(line)
+        return emit
+
+    def run(request_data, emit, cancel_event):
+        emitter = None
+        if request_data.get('type', 'chat') == 'chat':
+            from frame_emitter import FrameEmitter
+            config = request_data.get('config') or {}
+            emitter = FrameEmitter(
+                emit,
+                latency_ms=config.get('frameLatencyMs', P10Config.FRAME_LATENCY_MS),
+                max_frame_bytes=config.get('frameMaxBytes', P10Config.FRAME_MAX_BYTES),
+                max_pending_bytes=P10Config.FRAME_MAX_PENDING_BYTES
             )
-            print(json.dumps({'status': 'success', 'message': result}))
-            return
+        locked = False
+        try:
+            if emitter:
+                # Waits for the running chat; a cancel ends the wait
+                while not chat_lock.acquire(timeout=0.05):
+                    if cancel_event.is_set():
+                        return
+                locked = True
+            handle_request(request_data, emitter.emit if emitter else emit, cancel_event)
+        except Exception as e:
+            (emitter.emit if emitter else emit)({'error': str(e)})
+        finally:
+            if locked:
+                chat_lock.release()
+            if emitter:
+                emitter.close()
+            active_requests.pop(request_data.get('id'), None)
+            # Before 'done', so a tools listing that follows a change reads the new manifest
+            update_tool_manifest()
+            emit({'done': True})
 
-        if command_type == 'delete_tool':
-            from tools import delete_tool
-            name = request_data.get('name')
-            result = delete_tool(name)
-            print(json.dumps({'status': 'success', 'message': result}))
-            return
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request_data = json.loads(line)
+        except json.JSONDecodeError as e:
+            make_emit(None)({'error': f"Invalid request: {str(e)}", 'done': True})
+            continue
 
-        if command_type == 'update_tool_visibility':
-            from tools import update_tool_visibility_config
-            name = request_data.get('name')
-            visible = request_data.get('visible')
-            result = update_tool_visibility_config(name, visible)
-            print(json.dumps({'status': 'success', 'message': result}))
-            return
+        request_id = request_data.get('id')
 
-        if command_type == 'get_tools':
-            tools = get_tools_definitions()
-            print(json.dumps({'tools': tools}))
-            return
+        if request_data.get('type') == 'cancel':
+            cancel_event = active_requests.get(request_data.get('target'))
+            if cancel_event:
+                cancel_event.set()
+            make_emit(request_id)({'done': True})
+            continue
 
-        if command_type == 'get_all_tools':
-            from tools import P10Config
-            tools_dict = P10Config.TOOLS.get_all_tools()
-            tools_list = list(tools_dict.values())
-            print(json.dumps({'tools': tools_list}))
-            return
+        cancel_event = threading.Event()
+        active_requests[request_id] = cancel_event
 
-        if not api_key:
-            print(json.dumps({'error': 'Missing API Key. Please configure it in settings.'}))
-            return
+        # Registry commands are quick and applied in order on this thread;
+        # network-bound commands run in the background so cancels stay responsive
+        if request_data.get('type', 'chat') not in THREADED_COMMANDS:
+            run(request_data, make_emit(request_id), cancel_event)
+            continue
 
-        if command_type == 'fetch_models':
-            result = fetch_available_models(api_key, base_url)
-            print(json.dumps(result))
-            return
+        worker = threading.Thread(
+            target=run,
+            args=(request_data, make_emit(request_id), cancel_event),
+            daemon=True
+        )
+        worker.start()
+        workers = [w for w in workers if w.is_alive()] + [worker]
 
-        message = request_data.get('message')
-        history = request_data.get('history', [])
-
-        # 4. Process with LLM
-        processor = LLMProcessor(config)
-        
-        # Use user-attached files if any
-        selected_files = config.get('files', [])
-        
-        stream = processor.process(message, history, selected_files)
-
-        # 5. Output the result as JSON chunks with parsing
-        buffer = ""
-        state = "NORMAL" # NORMAL, THINKING, TOOL
-        
-        def print_chunk(text):
-            print(json.dumps({'chunk': text}, ensure_ascii=False))
-            sys.stdout.flush()
-
-        for chunk in stream:
-            content = chunk.choices[0].delta.content
-            if not content: continue
-            
-            buffer += content
-            
-            while True:
-                if state == "NORMAL":
-                    # Check for <thinking>
-                    if "<thinking>" in buffer:
-                        pre, post = buffer.split("<thinking>", 1)
-                        if pre: print_chunk(pre)
-                        print_chunk("<thinking>")
-                        state = "THINKING"
-                        buffer = post
-                        continue
-                    
-                    # Check for <tool>
-                    if "<tool>" in buffer:
-                        pre, post = buffer.split("<tool>", 1)
-                        if pre: print_chunk(pre)
-                        print_chunk("<tool>")
-                        state = "TOOL"
-                        buffer = post
-                        continue
-                    
-                    # Flush buffer if safe
-                    if len(buffer) > 20 and "<" not in buffer:
-                        print_chunk(buffer)
-                        buffer = ""
-                    elif len(buffer) > 100: # Force flush if too long
-                        print_chunk(buffer)
-                        buffer = ""
-                    break
-
-                elif state == "THINKING":
-                    if "</thinking>" in buffer:
-                        pre, post = buffer.split("</thinking>", 1)
-                        if pre: print_chunk(pre)
-                        print_chunk("</thinking>")
-                        state = "NORMAL"
-                        buffer = post
-                        continue
-                    
-                    # Safe flush: Don't flush if buffer ends with partial tag
-                    last_open = buffer.rfind("<")
-                    if last_open != -1 and len(buffer) - last_open < 20:
-                        to_print = buffer[:last_open]
-                        buffer = buffer[last_open:]
-                        if to_print: print_chunk(to_print)
-                    else:
-                        print_chunk(buffer)
-                        buffer = ""
-                    break
-
-                elif state == "TOOL":
-                    if "</tool>" in buffer:
-                        pre, post = buffer.split("</tool>", 1)
-                        if pre: print_chunk(pre)
-                        print_chunk("</tool>")
-                        state = "NORMAL"
-                        buffer = post
-                        continue
-                    
-                    # Safe flush: Don't flush if buffer ends with partial tag
-                    last_open = buffer.rfind("<")
-                    if last_open != -1 and len(buffer) - last_open < 20:
-                        to_print = buffer[:last_open]
-                        buffer = buffer[last_open:]
-                        if to_print: print_chunk(to_print)
-                    else:
-                        print_chunk(buffer)
-                        buffer = ""
-                    break
-        
-        # Flush remaining buffer
-        if buffer:
-            print_chunk(buffer)
+    # stdin closed: let in-flight requests finish before exiting
+    for worker in workers:
+        worker.join()
 
-    except Exception as e:
-        # Output error as JSON
-        print(json.dumps({'error': str(e)}, ensure_ascii=False))
-        sys.stdout.flush()
+    if 'api_client' in sys.modules:
+        sys.modules['api_client'].close_clients()
+
+def _parse_importtime(stderr_text):
+    """Parses `-X importtime` output into (module, depth, self_us, cumulative_us) rows."""
+    rows = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(parts[0]), int(parts[1])))
+    return rows
+
+def startup_report(argv):
+    """
+    --startup-report: runs the request read from stdin (default: get_tools) in a fresh
+    interpreter under `-X importtime` and prints a per-module import breakdown.
+    Exits with status 1 when the cold start exceeds the budget (--budget-ms N).
+    """
+    import subprocess
+    import time
+
+    budget_ms = P10Config.STARTUP_BUDGET_MS
+    if '--budget-ms' in argv:
+        budget_ms = float(argv[argv.index('--budget-ms') + 1])
+
+    input_str = '' if sys.stdin.isatty() else sys.stdin.read()
+    if not input_str.strip():
+        input_str = json.dumps({'type': 'get_tools'})
+    command_type = json.loads(input_str).get('type', 'chat')
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__)],
+        input=input_str, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    rows = _parse_importtime(proc.stderr)
+    top_level = sorted((r for r in rows if r[1] == 0), key=lambda r: r[3], reverse=True)
+    by_self = sorted(rows, key=lambda r: r[2], reverse=True)
+    import_ms = sum(r[3] for r in top_level) / 1000
+    over_budget = wall_ms > budget_ms
+
+    print(f"Startup report for command '{command_type}'")
+    print(f"  wall time:   {wall_ms:8.1f} ms (budget {budget_ms:.0f} ms){'  OVER BUDGET' if over_budget else ''}")
+    print(f"  import time: {import_ms:8.1f} ms across {len(rows)} modules")
+    print()
+    print("  Top-level imports (cumulative):")
+    print(f"  {'cumulative ms':>14} {'self ms':>9}  module")
+    for name, _, self_us, cumulative_us in top_level[:20]:
+        print(f"  {cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+    print()
+    print("  Slowest modules (self):")
+    print(f"  {'self ms':>14} {'cumulative ms':>14}  module")
+    for name, _, self_us, cumulative_us in by_self[:15]:
+        print(f"  {self_us / 1000:14.1f} {cumulative_us / 1000:14.1f}  {name}")
+    sys.stdout.flush()
+
+    if proc.returncode != 0:
+        sys.stderr.write(f"Warning: command exited with code {proc.returncode}\n")
+    sys.exit(1 if over_budget else 0)
 
 if __name__ == '__main__':
-    main()
+    if '--startup-report' in sys.argv[1:]:
+        startup_report(sys.argv[1:])
+    elif '--serve' in sys.argv[1:]:
+        serve()
+    else:
+        main()
@@ -12,6 +12,133 @@ class P10Config:
     # Default Model Configuration Keys
     # These keys are expected to be present in the config dictionary passed from the frontend
     KEY_LLM_PROCESSER_MODEL = 'standardTextModel'
+
+    # Cold-start budget for a single cli.py command, checked by `cli.py --startup-report`
+    STARTUP_BUDGET_MS = 300
+
+    # Chat output coalescing in `cli.py --serve` (see frame_emitter.py)
+    # Overridable per request with config keys frameLatencyMs / frameMaxBytes
+    FRAME_LATENCY_MS = 16
+    FRAME_MAX_BYTES = 64 * 1024
+    FRAME_MAX_PENDING_BYTES = 1024 * 1024
+
+    # Connection pool of the shared LLM clients (see api_client.get_client)
+    HTTP_MAX_CONNECTIONS = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+    HTTP_KEEPALIVE_EXPIRY = 120 # seconds an idle connection is kept open
+    # HTTP/2 needs the optional `h2` package (pip install "httpx[http2]"), which is not
+    # part of the bundled python_env; with HTTP2 on and h2 missing, HTTP/1.1 is used
+    HTTP2 = False
+    HTTP_TIMEOUT = 600
+    HTTP_CONNECT_TIMEOUT = 10
+
+    # Stream chat completions through api_client.chat_completion_stream_raw
+    # (plain SSE + jiter) instead of the SDK; overridable with config key rawStream
+    RAW_STREAM = False
+
+    # Ask for a final usage chunk (stream_options.include_usage) to report tokens and cache hits
+    # (dropped automatically for providers that reject `stream_options`); config key streamUsage
+    STREAM_USAGE = True
+
+    # Send '</tool>' as a stop sequence so the model stops right after a tool call, or with
+    # parallel tool calls '<tool_result>' so it stops before making up a result
+    # (dropped automatically for providers that reject `stop`); config key toolStopSequence
+    TOOL_STOP_SEQUENCE = True
+
+    # Several <tool> blocks per response, run concurrently by tool_scheduler.ToolScheduler
+    # (P5-P7 in parallel, P8+ calls on the same path in order); config key parallelToolCalls
+    PARALLEL_TOOL_CALLS = True
+    TOOL_WORKERS = 8
+
+    # Generated and temporary tools run in worker processes (tool_workers.py).
+    # Per call: wall-clock timeout, CPU time and address space limits (the last two where resource exists).
+    TOOL_PROCESS_POOL = True
+    TOOL_PROCESS_WORKERS = 4
+    TOOL_TIMEOUT_SECONDS = 300
+    TOOL_CPU_SECONDS = 120
+    TOOL_MEMORY_MB = 2048
+    TOOL_SHARED_MEMORY_MIN_CHARS = 256 * 1024 # larger results come back through shared memory
+
+    # Session cache of P5-P7 tool results (tool_cache.py); config keys toolResultCache, sessionId
+    TOOL_RESULT_CACHE = True
+    TOOL_CACHE_MAX_BYTES = 8 * 1024 * 1024
+    TOOL_CACHE_MAX_SESSIONS = 8
+    TOOL_CACHE_DIR_MAX_ENTRIES = 5000 # larger directories are not fingerprinted (never cached)
+
+    # Larger tool results are stored per session (result_store.py) and replaced by a preview
+    # the model pages through with read_tool_result; config key toolResultSpillChars (0 disables)
+    TOOL_RESULT_SPILL_CHARS = 8000
+    TOOL_RESULT_PREVIEW_CHARS = 1500
+    TOOL_RESULT_PAGE_CHARS = 6000
+    # Never spilled: pages of stored results, and create_tool output (its JSON carries the tool code for the Save UI)
+    TOOL_RESULT_SPILL_EXEMPT = ('read_tool_result', 'create_tool')
+    RESULT_STORE_MAX_BYTES = 256 * 1024 * 1024
+    RESULT_STORE_MAX_SESSIONS = 8
+
+    # Prompt token budget per model (context_manager.py); config keys contextManagement, contextBudget.
+    # First matching substring of the model name wins.
+    CONTEXT_WINDOWS = (
+        ('gpt-4.1', 1047576), ('gpt-4o', 128000), ('o1', 200000), ('o3', 200000), ('o4', 200000),
+        ('claude', 200000), ('gemini', 1048576), ('deepseek', 65536), ('qwen-long', 1000000),
+        ('qwen', 131072), ('glm', 128000), ('kimi', 131072), ('moonshot', 131072), ('llama', 131072),
+        ('mistral', 32768),
+    )
+    CONTEXT_DEFAULT_WINDOW = 32768
+    CONTEXT_OUTPUT_RESERVE = 8192 # left for the response
+    CONTEXT_MAX_TOKENS = 64000 # upper bound even for larger windows, so long sessions stay fast
+    CONTEXT_KEEP_RECENT_MESSAGES = 6 # always sent as-is, with the system prompt and the current query
+    CONTEXT_STUB_MIN_TOKENS = 100 # smaller tool results are kept
+    CONTEXT_SUMMARY_INPUT_CHARS = 60000
+    CONTEXT_SUMMARY_MAX_CHARS = 4000
+    CONTEXT_SUMMARY_CACHE_MAX_ENTRIES = 64 # summaries reused by later requests of a session
+    CONTEXT_SUMMARY_PROMPT = """Summarize the conversation below between a user and an AI assistant that uses tools on the user's workspace.
+Keep what is needed to continue the task: the user's goals and constraints, decisions made, files read or changed (with paths), important findings and tool results, and open questions.
+Be concise and factual. Reply with the summary only."""
+
+    # Chat sessions stored in .wand/ of the working directory (session_db.py); config keys sessionId, persistSessions
+    PERSIST_SESSIONS = True
+    SESSION_DB_NAME = 'sessions.db'
+    SESSION_CACHE_MAX_SESSIONS = 8 # sessions kept loaded in memory
+
+    # Native function calling: tools go in the `tools` request parameter and calls arrive as
+    # streamed tool_calls (LLM_PROCESSOR_NATIVE_SYSTEM_PROMPT); config key nativeToolCalls.
+    # Providers that reject `tools` fall back to the <tool> text protocol.
+    NATIVE_TOOL_CALLS = False
+
+    # Saved tools and their visibility live in this SQLite file next to tools.py (tool_store.py);
+    # tools.json and tools_config.json are imported into it
+    TOOL_STORE_NAME = 'tools.db'
+    # Registry snapshot the Electron main process lists the tools from (tool_manifest.py)
+    TOOL_MANIFEST_NAME = 'tools_manifest.json'
+
+    # Compiled code of the stored tools is cached in __pycache__/tools.<python tag>.bin (tool_bytecode.py)
+    TOOL_BYTECODE_CACHE = True
+    # With the cache, tools are registered from their cached schema and compiled on their first call
+    TOOL_LAZY_LOADING = True
+
+    # Tool schemas sent to the LLM (tool_schema.py): description caps in characters, 0 for no cap.
+    # The tool description is the docstring text before its Args/Returns sections (plus the Returns text).
+    TOOL_DESCRIPTION_MAX_CHARS = 800
+    TOOL_PARAM_DESCRIPTION_MAX_CHARS = 300
+
+    # Query-aware tool selection (tool_retrieval.py): with more than TOOL_RETRIEVAL_MIN_TOOLS visible tools,
+    # only the pinned tools and the TOOL_RETRIEVAL_TOP_K best BM25 matches for the query are listed; the
+    # model finds the others with search_tools. Config keys toolRetrieval, toolRetrievalTopK.
+    TOOL_RETRIEVAL = True
+    TOOL_RETRIEVAL_MIN_TOOLS = 30
+    TOOL_RETRIEVAL_TOP_K = 12
+    TOOL_RETRIEVAL_PINNED = ('read_file', 'write_file', 'edit_file', 'list_files', 'create_tool', 'search_tools', 'read_tool_result')
+    # Appended to {tool_usage_rules} when tools were left out
+    TOOL_RETRIEVAL_NOTE = """- Only {shown} of the {total} available tools are provided to you, those most relevant to this request. If none of them fits the task, call `search_tools` with a short description of what you need before using `create_tool`."""
+
+    # Inserted into LLM_PROCESSOR_SYSTEM_PROMPT as {tool_call_rules}
+    TOOL_CALL_RULES_SINGLE = """- You can only call one tool at a time.
+- STOP generating immediately after the closing </tool> tag.
+- Wait for the tool result before proceeding."""
+    TOOL_CALL_RULES_PARALLEL = """- You can call several tools at once by writing several <tool> blocks in one response (for example, to read multiple files). They run concurrently; calls that write to the same path run in the order you wrote them.
+- Only combine calls that do not depend on each other's results.
+- STOP generating immediately after the last closing </tool> tag.
+- Wait for the tool results before proceeding. Never write <tool_result> yourself."""
     
     # System Prompt Template for LLM Processor
     # Requires {tools_json} to be formatted into it
@@ -35,11 +162,22 @@ To call a tool, use the following format inside a <tool> tag:
 IMPORTANT:
 - The content inside <tool> must strictly follow the `✿FUNCTION✿: name` and `✿ARGS✿: json_object` format.
 - `✿ARGS✿` must be a valid JSON object.
-- You can only call one tool at a time.
-- STOP generating immediately after the closing </tool> tag.
-- Wait for the tool result before proceeding.
-- **PRIORITY 1: USE EXISTING TOOLS.** Before creating a new tool, you MUST check if the task can be accomplished by:
-  1. Using an existing tool from the list above.
+{tool_call_rules}
+{tool_usage_rules}
+
+Format your response:
+
+<thinking>
+[Your thought process]
+</thinking>
+<subtitle>[Short summary of the thought process]</subtitle>
+
+[Tool Call or Final Response]
+"""
+
+    # Inserted into both system prompts as {tool_usage_rules}
+    TOOL_USAGE_RULES = """- **PRIORITY 1: USE EXISTING TOOLS.** Before creating a new tool, you MUST check if the task can be accomplished by:
+  1. Using an existing tool from the available tools.
   2. Combining your own capabilities (e.g., generating text, code, or logic) with an existing tool (e.g., `write_file`).
 - **DO NOT create tools for simple content generation.**
   - BAD: Create a tool to generate a joke. (You can generate the joke yourself!)
@@ -54,7 +192,20 @@ IMPORTANT:
 - **CRITICAL: When requesting new tools, describe them as GENERIC and REUSABLE functions.**
   - BAD Requirement: "Create a tool that writes a joke about cats to cat.txt"
   - GOOD Requirement: "Create a tool that writes text content to a file at a given path."
-  - Always design tools to accept arguments for dynamic data.
+  - Always design tools to accept arguments for dynamic data."""
+
+    LLM_PROCESSOR_NATIVE_SYSTEM_PROMPT = """You are an advanced AI assistant capable of analyzing code and performing tasks.
+You can call the tools provided to you through function calling.
+
+Process:
+1. THINK: Analyze the user's request. Plan your steps.
+2. ACTION: If you need more information or need to perform an action, call a tool.
+3. RESPONSE: When you have the answer, provide the final response.
+
+IMPORTANT:
+- Call tools only through function calling. Earlier calls may appear as <tool> blocks in the conversation; do not write such blocks yourself.
+- You can call several tools at once when they do not depend on each other's results; they run concurrently.
+{tool_usage_rules}
 
 Format your response:
 
@@ -63,5 +214,5 @@ Format your response:
 </thinking>
 <subtitle>[Short summary of the thought process]</subtitle>
 
-[Tool Call or Final Response]
+[Final Response, or nothing when calling tools]
 """
@@ -0,0 +1,260 @@
+"""
+Token budget for the messages sent on each agent turn.
+
+Before every LLM request the estimated prompt size is checked against the
+budget of the model. When it is exceeded, the messages outside the protected
+set (system prompt, current query, latest turns) are compacted, the history
+before the query and the turns after it each in place:
+    1. stale tool results are collapsed into short stubs
+    2. if still too large, the older messages are summarized with the
+       high speed model into a single message
+    3. if that fails, the oldest of them are dropped
+Summaries are kept per compacted run of messages, so the following requests of
+a long session, whose history starts with the same messages, reuse them instead
+of asking the model to summarize again.
+"""
+import hashlib
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from configs.P10_config import P10Config
+
+# Tokens added per message by the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TOOL_RESULT_BLOCK_RE = re.compile(r'<tool_result>(.*?)</tool_result>', re.DOTALL)
+RESULT_HANDLE_RE = re.compile(r'\bres_[0-9a-f]{10}\b')
+
+def estimate_tokens(text):
+    """Offline estimate: about 4 ASCII characters per token and one token per other character (CJK, symbols)."""
+    if not text:
+        return 0
+    non_ascii = len(text) - len(text.encode('ascii', 'ignore'))
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+def message_tokens(message):
+    content = message.get('content')
+    tokens = MESSAGE_OVERHEAD_TOKENS + (estimate_tokens(content) if isinstance(content, str) else 0)
+    # Native tool calls carry their arguments outside `content`
+    for call in message.get('tool_calls') or ():
+        function = call.get('function') or {}
+        tokens += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(function.get('name')) + estimate_tokens(function.get('arguments'))
+    return tokens
+
+def context_budget(model, config=None):
+    """Prompt token budget for `model`: its context window minus room for the answer, capped by CONTEXT_MAX_TOKENS."""
+    if config and config.get('contextBudget'):
+        return int(config['contextBudget'])
+    window = P10Config.CONTEXT_DEFAULT_WINDOW
+    name = (model or '').lower()
+    for pattern, size in P10Config.CONTEXT_WINDOWS:
+        if pattern in name:
+            window = size
+            break
+    return min(window - P10Config.CONTEXT_OUTPUT_RESERVE, P10Config.CONTEXT_MAX_TOKENS)
+
+def _stub(text, turn=None):
+    """Short replacement for a tool output; handles of stored results stay readable."""
+    where = f" from turn {turn}" if turn else ""
+    stub = f"[Earlier tool output{where} (~{estimate_tokens(text)} tokens) removed to save context. Call the tool again if you need it.]"
+    handles = sorted(set(RESULT_HANDLE_RE.findall(text)))
+    if handles:
+        stub += f" Stored results still available: {', '.join(handles)}."
+    return stub
+
+# Hash of compacted messages -> their summary, most recently used last
+_summaries = OrderedDict()
+_summaries_lock = threading.Lock()
+
+def _prefix_keys(messages):
+    """Hashes of messages[:1], messages[:2], ... messages[:n]."""
+    digest = hashlib.sha256()
+    keys = []
+    for message in messages:
+        digest.update(json.dumps([message.get('role'), message.get('content'), message.get('tool_calls')],
+                                 ensure_ascii=False, default=str).encode('utf-8', 'surrogatepass'))
+        keys.append(digest.hexdigest())
+    return keys
+
+def _cached_summary(keys):
+    """(number of messages, summary) of the longest prefix with a stored summary, or None."""
+    with _summaries_lock:
+        for count in range(len(keys), 0, -1):
+            summary = _summaries.get(keys[count - 1])
+            if summary is not None:
+                _summaries.move_to_end(keys[count - 1])
+                return count, summary
+    return None
+
+def _store_summary(key, summary):
+    with _summaries_lock:
+        _summaries[key] = summary
+        while len(_summaries) > P10Config.CONTEXT_SUMMARY_CACHE_MAX_ENTRIES:
+            _summaries.popitem(last=False)
+
+def _summary_message(count, summary):
+    return {"role": "user", "content": f"[Summary of {count} earlier messages, compacted to save context]\n{summary}"}
+
+class ContextManager:
+    """
+    Keeps `messages` within the token budget of one LLMProcessor.process run.
+    `summarize(text)` returns a summary of the rendered messages, or None when unavailable.
+    """
+
+    def __init__(self, budget, summarize=None, keep_recent=None):
+        self.budget = budget
+        self.summarize = summarize
+        self.keep_recent = keep_recent if keep_recent is not None else P10Config.CONTEXT_KEEP_RECENT_MESSAGES
+        # The messages are held, not only their ids: the id of a deleted message can be reused
+        self._pinned = {} # id -> message never compacted
+        self._tool_outputs = {} # id -> (message, turn), for tool output messages added by the processor
+
+    def pin(self, message):
+        self._pinned[id(message)] = message
+
+    def add_tool_output(self, message, turn):
+        self._tool_outputs[id(message)] = (message, turn)
+
+    def _is_pinned(self, message):
+        return self._pinned.get(id(message)) is message
+
+    def _tool_output_turn(self, message):
+        entry = self._tool_outputs.get(id(message))
+        return entry[1] if entry is not None and entry[0] is message else None
+
+    def _forget(self, message):
+        if self._pinned.get(id(message)) is message:
+            del self._pinned[id(message)]
+        entry = self._tool_outputs.get(id(message))
+        if entry is not None and entry[0] is message:
+            del self._tool_outputs[id(message)]
+
+    def _runs(self, messages):
+        """
+        Runs of consecutive messages that may be compacted, oldest first: everything except the
+        pinned messages and the latest turns. The pinned query splits the earlier history from
+        the turns of this request, and each run is replaced on its own so the order is kept.
+        """
+        recent_start = max(len(messages) - self.keep_recent, 0)
+        # Native tool messages stay with the assistant message that made the calls
+        while recent_start > 0 and messages[recent_start].get('role') == 'tool':
+            recent_start -= 1
+        runs = [[]]
+        for i in range(recent_start):
+            if self._is_pinned(messages[i]):
+                if runs[-1]:
+                    runs.append([])
+            else:
+                runs[-1].append(i)
+        return [run for run in runs if run]
+
+    def _replace(self, messages, indexes, replacement):
+        """Replaces the consecutive messages at `indexes` with one message."""
+        for i in indexes:
+            self._forget(messages[i])
+        messages[indexes[0]:indexes[-1] + 1] = [replacement]
+
+    def _reuse_summaries(self, messages, report):
+        """Replaces the longest run prefix that an earlier request summarized; returns whether one was found."""
+        for run in self._runs(messages):
+            cached = _cached_summary(_prefix_keys([messages[i] for i in run]))
+            if cached is not None:
+                count, summary = cached
+                self._replace(messages, run[:count], _summary_message(count, summary))
+                report["reused"] = report.get("reused", 0) + count
+                return True
+        return False
+
+    def fit(self, messages, turn):
+        """
+        Compacts `messages` in place when they exceed the budget.
+        Returns the 'context' event reported for this turn (tokens_saved is 0 when nothing changed).
+        """
+        before = sum(message_tokens(m) for m in messages)
+        report = {"event": "context", "turn": turn, "budget": self.budget, "tokens": before, "tokens_saved": 0}
+        if before <= self.budget:
+            return report
+
+        # 0. Reuse the summaries made by earlier requests of the session for the same messages
+        total = before
+        while total > self.budget and self._reuse_summaries(messages, report):
+            total = sum(message_tokens(m) for m in messages)
+        runs = self._runs(messages)
+        if total <= self.budget or not runs:
+            return self._finish(report, before, total, turn)
+        # Summaries are stored under the messages they replace, as they were before any stubbing
+        keys = [_prefix_keys([messages[i] for i in run])[-1] for run in runs]
+
+        # 1. Collapse stale tool results into stubs
+        for run in runs:
+            for i in run:
+                stubbed = self._stub_tool_output(messages[i])
+                if stubbed is not None:
+                    messages[i] = stubbed
+                    report["stubbed"] = report.get("stubbed", 0) + 1
+        total = sum(message_tokens(m) for m in messages)
+
+        # 2. Summarize the runs, oldest first, or 3. drop them
+        removed = 0 # messages removed by earlier replacements, shifting the later runs
+        for run, key in zip(runs, keys):
+            if total <= self.budget:
+                break
+            run = [i - removed for i in run]
+            older = [messages[i] for i in run]
+            summary = self._summarize(older)
+            if summary:
+                _store_summary(key, summary)
+                replacement = _summary_message(len(older), summary)
+                report["summarized"] = report.get("summarized", 0) + len(older)
+            else:
+                replacement = {"role": "user", "content": f"[{len(older)} earlier messages were removed to save context.]"}
+                report["dropped"] = report.get("dropped", 0) + len(older)
+            self._replace(messages, run, replacement)
+            removed += len(run) - 1
+            total = sum(message_tokens(m) for m in messages)
+        return self._finish(report, before, total, turn)
+
+    def _finish(self, report, before, total, turn):
+        report["tokens"] = total
+        report["tokens_saved"] = before - total
+        sys.stderr.write(f"[DEBUG] Context compacted on turn {turn}: {before} -> {total} tokens (budget {self.budget})\n")
+        sys.stderr.flush()
+        return report
+
+    def _stub_tool_output(self, message):
+        content = message.get('content')
+        if not isinstance(content, str) or estimate_tokens(content) < P10Config.CONTEXT_STUB_MIN_TOKENS:
+            return None
+        # Tool output messages appended by the processor
+        turn = self._tool_output_turn(message)
+        if turn is not None:
+            stubbed = dict(message, content=_stub(content, turn))
+            self._forget(message)
+            self.add_tool_output(stubbed, turn)
+            return stubbed
+        # <tool_result> blocks inside assistant messages replayed from the frontend history
+        if message.get('role') == 'assistant' and '<tool_result>' in content:
+            def replace(match):
+                if estimate_tokens(match.group(1)) < P10Config.CONTEXT_STUB_MIN_TOKENS:
+                    return match.group(0)
+                return f"<tool_result>\n{_stub(match.group(1))}\n</tool_result>"
+            compacted = TOOL_RESULT_BLOCK_RE.sub(replace, content)
+            if compacted != content:
+                return {"role": "assistant", "content": compacted}
+        return None
+
+    def _summarize(self, older):
+        if self.summarize is None:
+            return None
+        # Oldest text is cut first when the messages exceed what the summarizer is given
+        rendered = "\n\n".join(f"[{m.get('role')}]\n{m.get('content')}" for m in older if isinstance(m.get('content'), str))
+        rendered = rendered[-P10Config.CONTEXT_SUMMARY_INPUT_CHARS:]
+        try:
+            summary = self.summarize(rendered)
+        except Exception as e:
+            sys.stderr.write(f"Warning: Context summary failed: {e}\n")
+            return None
+        return summary.strip()[:P10Config.CONTEXT_SUMMARY_MAX_CHARS] if summary else None
@@ -0,0 +1,228 @@
+"""
+Coalescing output stage for streamed chat events.
+
+Writing (and flushing) one JSON line per token delta costs a syscall in the
+backend and an IPC message in Electron for every few characters. FrameEmitter
+collects events for up to a latency window and writes them as a single
+{'events': [...]} frame instead:
+
+- consecutive deltas of the same kind are merged into one event
+- a frame is written when the window expires or it reaches max_frame_bytes
+- oversized payloads (e.g. a large tool_result) are split into bounded events;
+  all pieces of a split tool_result except the last carry 'partial': True
+- emit() blocks while more than max_pending_bytes are queued, so a slow reader
+  on the other end of the pipe throttles the producer instead of growing memory
+
+Payloads that are not chat events (errors, ...) are written as-is, after the
+events emitted before them.
+"""
+import sys
+import threading
+import time
+
+# Delta events whose text can be merged with the previous event or split freely
+DELTA_FIELDS = {
+    'text_delta': 'text',
+    'thinking_delta': 'text',
+    'tool_call_args_delta': 'text',
+}
+# Events whose payload is split into several events when it exceeds a frame
+SPLIT_FIELDS = dict(DELTA_FIELDS, tool_result='content')
+
+# Rough size of an event's JSON envelope ({"event": "...", "text": ""})
+EVENT_OVERHEAD_BYTES = 48
+
+
+def _size(text):
+    """UTF-8 size of `text` without encoding the common ASCII case."""
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+class FrameStats:
+    """Process-wide counters for frames written by all emitters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.frames = 0
+            self.events = 0
+            self.bytes = 0
+            self.max_frame_bytes = 0
+            self.split_events = 0
+            self.backpressure_waits = 0
+
+    def add_frame(self, event_count, frame_bytes):
+        with self._lock:
+            self.frames += 1
+            self.events += event_count
+            self.bytes += frame_bytes
+            self.max_frame_bytes = max(self.max_frame_bytes, frame_bytes)
+
+    def count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'events': self.events,
+                'bytes': self.bytes,
+                'avg_frame_bytes': round(self.bytes / self.frames, 1) if self.frames else 0,
+                'max_frame_bytes': self.max_frame_bytes,
+                'split_events': self.split_events,
+                'backpressure_waits': self.backpressure_waits,
+            }
+
+
+STATS = FrameStats()
+
+
+class FrameEmitter:
+    """
+    Wraps an `emit(payload)` function (one JSON line per call) with frame coalescing.
+    A background thread writes frames; call close() to flush and stop it.
+    """
+
+    def __init__(self, write, latency_ms=16, max_frame_bytes=64 * 1024, max_pending_bytes=1024 * 1024, stats=STATS):
+        self._write = write
+        self.latency = latency_ms / 1000
+        self.max_frame_bytes = max_frame_bytes
+        self.max_pending_bytes = max(max_pending_bytes, max_frame_bytes)
+        self.stats = stats
+
+        self._cond = threading.Condition()
+        self._events = []        # events of the frame being filled
+        self._frame_bytes = 0
+        self._deadline = None    # when the frame being filled must be written
+        self._ready = []         # (payload, size) items waiting for the writer
+        self._queued_bytes = 0   # size of _events + _ready
+        self._closed = False
+        self._failed = False
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def emit(self, payload):
+        """Queues one payload; blocks while the writer is more than max_pending_bytes behind."""
+        with self._cond:
+            if self._failed:
+                return
+            if 'event' not in payload:
+                self._cut_frame()
+                self._enqueue(payload, EVENT_OVERHEAD_BYTES)
+            else:
+                for event, size in self._split(payload):
+                    self._add_event(event, size)
+
+            while self._queued_bytes > self.max_pending_bytes and not self._failed:
+                self.stats.count('backpressure_waits')
+                self._cond.wait()
+
+    def close(self):
+        """Writes everything still queued and stops the writer thread."""
+        with self._cond:
+            self._cut_frame()
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _split(self, event):
+        field = SPLIT_FIELDS.get(event.get('event'))
+        text = event.get(field) if field else None
+        if not isinstance(text, str):
+            return [(event, EVENT_OVERHEAD_BYTES)]
+
+        size = _size(text)
+        limit = self.max_frame_bytes - EVENT_OVERHEAD_BYTES
+        if size <= limit:
+            return [(event, size + EVENT_OVERHEAD_BYTES)]
+
+        # Cut by characters, scaled so each piece stays within the byte limit
+        step = max(1, limit * len(text) // size)
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        self.stats.count('split_events')
+        events = []
+        for index, piece in enumerate(pieces):
+            part = dict(event)
+            part[field] = piece
+            if event['event'] not in DELTA_FIELDS:
+                part['partial'] = index < len(pieces) - 1
+            events.append((part, _size(piece) + EVENT_OVERHEAD_BYTES))
+        return events
+
+    def _add_event(self, event, size):
+        if self._frame_bytes + size > self.max_frame_bytes:
+            self._cut_frame()
+
+        field = DELTA_FIELDS.get(event['event'])
+        last = self._events[-1] if self._events else None
+        if field and last is not None and last['event'] == event['event'] and len(last) == len(event) == 2:
+            # Merge consecutive plain deltas of the same kind into one event
+            last[field] += event[field]
+            size -= EVENT_OVERHEAD_BYTES
+        else:
+            self._events.append(dict(event))
+
+        self._frame_bytes += size
+        self._queued_bytes += size
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.latency
+            self._cond.notify_all()
+
+    def _cut_frame(self):
+        """Moves the frame being filled to the writer queue (lock held)."""
+        if not self._events:
+            return
+        self._ready.append(({'events': self._events}, self._frame_bytes))
+        self._events = []
+        self._frame_bytes = 0
+        self._deadline = None
+        self._cond.notify_all()
+
+    def _enqueue(self, payload, size):
+        self._ready.append((payload, size))
+        self._queued_bytes += size
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready:
+                    if self._closed:
+                        return
+                    if self._deadline is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._cut_frame()
+                    else:
+                        self._cond.wait(remaining)
+                ready, self._ready = self._ready, []
+
+            # Writes happen outside the lock so producers can keep filling the next frame
+            written = 0
+            try:
+                for payload, size in ready:
+                    frame_bytes = self._write(payload)
+                    if 'events' in payload:
+                        self.stats.add_frame(len(payload['events']), frame_bytes or size)
+                    written += size
+            except (OSError, ValueError) as e:
+                # The reader is gone (broken pipe); drop further output
+                sys.stderr.write(f"Warning: frame write failed: {e}\n")
+                with self._cond:
+                    self._failed = True
+                    self._ready = []
+                    self._events = []
+                    self._queued_bytes = 0
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self._queued_bytes -= written
+                self._cond.notify_all()
@@ -1,9 +1,19 @@
+import functools
 import json
 import os
 import sys
-import re
-from api_client import chat_completion_stream
+import threading
+import uuid
+from api_client import chat_completion, chat_completion_stream, chat_completion_stream_raw, tool_call_deltas, tools_supported, mark_tools_unsupported, ToolsUnsupportedError
+from stream_parser import TagStreamParser, ToolCallStream, TEXT, OPEN, CLOSE, CLOSE_TAGS
 from tools import get_tools_definitions, execute_tool, set_llm_config
+from tool_scheduler import ToolScheduler
+from tool_cache import get_session_cache
+from tool_retrieval import select_tools, tools_in_search_result
+from tool_schema import compact_json
+from result_store import get_session_store
+from context_manager import ContextManager, context_budget
+from session_db import open_session_db
 from configs.P10_config import P10Config
 
 # Ensure stdout/stderr use UTF-8 to prevent encoding errors on Windows
@@ -15,38 +25,349 @@ if sys.platform == 'win32':
         # In case sys.stdout/stderr are not standard streams (e.g. in some environments)
         pass
 
-class MockDelta:
-    def __init__(self, content):
-        self.content = content
+def sdk_tuples(stream):
+    """Adapts an SDK chat completion stream to (content, finish_reason, usage, tool_calls) tuples."""
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None)
+            # The usage-only chunk at the end of a stream has no choices
+            if not chunk.choices:
+                if usage:
+                    yield None, None, usage, None
+                continue
+            choice = chunk.choices[0]
+            calls = getattr(choice.delta, 'tool_calls', None)
+            yield choice.delta.content, choice.finish_reason, usage, tool_call_deltas(calls) if calls else None
+    finally:
+        # Release the HTTP connection if the caller stops early (e.g. chat cancelled)
+        stream.close()
+
+def cached_prompt_tokens(usage):
+    """Prompt tokens the provider served from its prefix cache, or None when it does not report them."""
+    details = usage.get('prompt_tokens_details') or {}
+    for value in (details.get('cached_tokens'), # OpenAI
+                  usage.get('prompt_cache_hit_tokens'), # DeepSeek
+                  usage.get('cache_read_input_tokens')): # Anthropic-compatible gateways
+        if value is not None:
+            return value
+    return None
+
+def usage_event(usage):
+    """Builds a 'usage' event from a provider usage object (or the dict of the raw stream)."""
+    if not isinstance(usage, dict):
+        # SDK models keep provider-specific fields (prompt_cache_hit_tokens...) as extras
+        usage = usage.model_dump() if hasattr(usage, 'model_dump') else {
+            key: getattr(usage, key, None) for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+        }
+    return {
+        "event": "usage",
+        "prompt_tokens": usage.get('prompt_tokens'),
+        "completion_tokens": usage.get('completion_tokens'),
+        "total_tokens": usage.get('total_tokens'),
+        "cached_tokens": cached_prompt_tokens(usage)
+    }
+
+class TurnEventBuilder:
+    """
+    Converts one streamed LLM response into typed frontend events:
+    text_delta, thinking_delta, subtitle, tool_call_start, tool_call_args_delta, tool_result.
+    Also keeps the full response text and the complete <tool> blocks.
+
+    With stop_at_tool=True everything after the first </tool> is ignored, so the
+    caller can dispatch the tool and drop the rest of the stream. In either mode
+    the response also ends where the model starts writing its own <tool_result>
+    after a tool call, since that result would be made up.
+    """
+    def __init__(self, stop_at_tool=False):
+        self.parser = TagStreamParser()
+        self.stop_at_tool = stop_at_tool
+        self.response_parts = [] # rebuilt from parser events, so it ends at the stop point
+        self.tool_calls = [] # ToolCallStream of each complete <tool> block, in order
+        self._tool_stream = None
+        self._block_parts = [] # text of the current <subtitle> / <tool_result> block
+        self._halted = False
+
+    @property
+    def response(self):
+        return "".join(self.response_parts)
+
+    @property
+    def tool_call(self):
+        """The first complete <tool> block, or None."""
+        return self.tool_calls[0] if self.tool_calls else None
+
+    @property
+    def stopped(self):
+        return self._halted or (self.stop_at_tool and bool(self.tool_calls))
+
+    def feed(self, content):
+        return self._convert(self.parser.feed(content))
+
+    def finish(self, close_open_tool=False):
+        """
+        Ends the response. With close_open_tool, a <tool> block left open is treated
+        as complete (the provider stopped on the '</tool>' stop sequence).
+        """
+        events = self._convert(self.parser.flush())
+        if close_open_tool and self.parser.block == 'tool':
+            self.parser.block = None
+            events += self._convert([(CLOSE, 'tool', '')])
+        return events
+
+    def _convert(self, parser_events):
+        events = []
+        for kind, tag, text in parser_events:
+            if self.stopped:
+                break
+            if kind == OPEN and tag == 'tool_result' and self.tool_calls:
+                self._halted = True
+                break
+            self.response_parts.append(text if kind == TEXT else (f"<{tag}>" if kind == OPEN else CLOSE_TAGS[tag]))
+
+            if tag is None:
+                events.append({"event": "text_delta", "text": text})
+
+            elif tag == 'thinking':
+                if kind == TEXT:
+                    events.append({"event": "thinking_delta", "text": text})
+
+            elif tag == 'tool':
+                if kind == OPEN:
+                    self._tool_stream = ToolCallStream()
+                    continue
+                if kind == TEXT:
+                    pieces = self._tool_stream.feed(text)
+                else:
+                    pieces = self._tool_stream.close()
+                    self.tool_calls.append(self._tool_stream)
+                for piece_kind, value in pieces:
+                    if piece_kind == 'start':
+                        events.append({"event": "tool_call_start", "name": value})
+                    else:
+                        events.append({"event": "tool_call_args_delta", "text": value})
+
+            else:
+                # <subtitle> and model-written <tool_result> are short; send them whole
+                if kind == OPEN:
+                    self._block_parts = []
+                elif kind == TEXT:
+                    self._block_parts.append(text)
+                elif tag == 'subtitle':
+                    events.append({"event": "subtitle", "text": "".join(self._block_parts).strip()})
+                else:
+                    events.append({"event": "tool_result", "content": "".join(self._block_parts).strip()})
+        return events
+
+def tool_call_text(name, args_text):
+    """A tool call as a <tool> block of the text protocol."""
+    return f"\n<tool>\n✿FUNCTION✿: {name}\n✿ARGS✿: {args_text}\n</tool>"
+
+class NativeToolCall:
+    """A tool call streamed through the provider's function-calling API (native tool call mode)."""
+    def __init__(self, index, call_id=None):
+        self.index = index
+        self.id = call_id
+        self.name = None
+        self.args_parts = []
+
+    @property
+    def args_text(self):
+        return "".join(self.args_parts)
+
+    def to_message(self):
+        """The entry of the assistant message's tool_calls list."""
+        return {"id": self.id, "type": "function", "function": {"name": self.name, "arguments": self.args_text}}
+
+    def to_text(self):
+        """The same call in the text protocol, as stored in the session history."""
+        return tool_call_text(self.name, self.args_text)
+
+class NativeToolCallBuilder:
+    """
+    Accumulates streamed tool_calls deltas into NativeToolCalls and converts them to
+    tool_call_start / tool_call_args_delta events, as TurnEventBuilder does for <tool> blocks.
+    """
+    def __init__(self):
+        self.calls = [] # in index order
+        self._by_index = {}
+
+    def feed(self, deltas):
+        events = []
+        for index, call_id, name, arguments in deltas:
+            call = self._by_index.get(index)
+            if call is None:
+                call = self._by_index[index] = NativeToolCall(index, call_id)
+                self.calls.append(call)
+            if call_id and not call.id:
+                call.id = call_id
+            if name and not call.name:
+                call.name = name
+                events.append({"event": "tool_call_start", "name": name})
+            if arguments:
+                call.args_parts.append(arguments)
+                events.append({"event": "tool_call_args_delta", "text": arguments})
+        return events
+
+    def completed(self, final=False):
+        """Calls with complete arguments: all of them once the stream ended, otherwise those followed by another call."""
+        return self.calls if final else self.calls[:-1]
+
+def text_protocol_messages(messages):
+    """
+    The messages with native tool history rewritten in the text protocol: an assistant message's
+    tool_calls become <tool> blocks after its content and the tool messages answering them one user
+    message of "Tool '...' Output:" entries. Other messages are returned as they are (same objects).
+    """
+    names = {}
+    rewritten = []
+    outputs = []
+    for msg in messages:
+        if msg.get("role") == "tool":
+            name = names.get(msg.get("tool_call_id"), "unknown")
+            outputs.append(f"\nTool '{name}' Output:\n{msg.get('content') or ''}\n")
+            continue
+        if outputs:
+            rewritten.append({"role": "user", "content": "\n".join(outputs)})
+            outputs = []
+        if msg.get("tool_calls"):
+            blocks = []
+            for call in msg["tool_calls"]:
+                function = call.get("function") or {}
+                names[call.get("id")] = function.get("name")
+                blocks.append(tool_call_text(function.get("name"), function.get("arguments") or ""))
+            msg = {"role": msg["role"], "content": (msg.get("content") or "") + "".join(blocks)}
+        rewritten.append(msg)
+    if outputs:
+        rewritten.append({"role": "user", "content": "\n".join(outputs)})
+    return rewritten
+
+def parse_tool_call(tool_call):
+    """Returns (name, args, error) for a complete <tool> block or NativeToolCall; error is the message sent back to the model."""
+    if isinstance(tool_call, NativeToolCall):
+        if not tool_call.name:
+            return None, {}, "Error executing tool: Missing function name in tool call"
+        try:
+            args = json.loads(tool_call.args_text) if tool_call.args_text.strip() else {}
+        except json.JSONDecodeError:
+            return tool_call.name, {}, f"Error: Invalid JSON arguments for tool {tool_call.name}."
+        if not isinstance(args, dict):
+            return tool_call.name, {}, "Error: Tool arguments must be a JSON object."
+        return tool_call.name, args, None
+
+    # Function name comes from the ✿FUNCTION✿: line
+    if not tool_call.name:
+        return None, {}, "Error executing tool: Missing '✿FUNCTION✿:' identifier in tool call"
+    # Arguments come from the ✿ARGS✿: json_string
+    try:
+        args = json.loads(tool_call.args_text) if tool_call.args_text else {}
+    except json.JSONDecodeError:
+        return tool_call.name, {}, "Error: Invalid JSON in ✿ARGS✿."
+    if not isinstance(args, dict):
+        return tool_call.name, {}, "Error: ✿ARGS✿ must be a JSON object."
+    return tool_call.name, args, None
+
+def native_tools(tools_definitions):
+    """get_tools_definitions() in the `tools` format of the chat completions API."""
+    return [{"type": "function", "function": d} for d in json.loads(compact_json(tools_definitions))]
+
+def render_system_prompt(tools_definitions, native, parallel, total=None):
+    """`total` is the number of visible tools when `tools_definitions` is a selection of them."""
+    tool_usage_rules = P10Config.TOOL_USAGE_RULES
+    if total and total > len(tools_definitions):
+        tool_usage_rules += "\n" + P10Config.TOOL_RETRIEVAL_NOTE.format(shown=len(tools_definitions), total=total)
+    if native:
+        return P10Config.LLM_PROCESSOR_NATIVE_SYSTEM_PROMPT.format(tool_usage_rules=tool_usage_rules)
+    tool_call_rules = P10Config.TOOL_CALL_RULES_PARALLEL if parallel else P10Config.TOOL_CALL_RULES_SINGLE
+    return P10Config.LLM_PROCESSOR_SYSTEM_PROMPT.format(
+        tools_json=compact_json(tools_definitions), tool_call_rules=tool_call_rules, tool_usage_rules=tool_usage_rules
+    )
 
-class MockChoice:
-    def __init__(self, content):
-        self.delta = MockDelta(content)
+def _selected_definitions(selected):
+    definitions = get_tools_definitions()
+    if selected is None:
+        return definitions
+    return [d for d in definitions if d["name"] in selected]
 
-class MockChunk:
-    def __init__(self, content):
-        self.choices = [MockChoice(content)]
+# System prompts and native tool lists rendered for the current tool registry version,
+# per tool selection; cleared when it grows past PROMPT_CACHE_MAX_ENTRIES
+PROMPT_CACHE_MAX_ENTRIES = 64
+_prompt_cache = {}
+_prompt_cache_version = None
+_prompt_cache_lock = threading.Lock()
+
+def _for_registry_version(key, build):
+    """build() once per tool registry version; every entry is dropped when a tool is added, removed or hidden."""
+    global _prompt_cache_version
+    version = P10Config.TOOLS.version
+    with _prompt_cache_lock:
+        if version != _prompt_cache_version:
+            _prompt_cache.clear()
+            _prompt_cache_version = version
+        if key in _prompt_cache:
+            return _prompt_cache[key]
+    value = build()
+    with _prompt_cache_lock:
+        if version == _prompt_cache_version:
+            if len(_prompt_cache) >= PROMPT_CACHE_MAX_ENTRIES:
+                _prompt_cache.clear()
+            _prompt_cache[key] = value
+    return value
+
+def system_prompt(native, parallel, selected=None):
+    """
+    The system prompt listing the tools named in `selected` (all visible tools when None).
+    Byte-identical across requests for the same selection until the registry changes.
+    """
+    def build():
+        definitions = _selected_definitions(selected)
+        # What each tool adds to the prompt (tokens of its compact schema), largest first
+        costs = sorted(((d["tokens"], d["name"]) for d in definitions), reverse=True)
+        largest = ", ".join(f"{name} {tokens}" for tokens, name in costs[:5])
+        sys.stderr.write(f"[DEBUG] Tool definitions: {len(definitions)} tools, ~{sum(t for t, _ in costs)} tokens (largest: {largest})\n")
+        return render_system_prompt(definitions, native, parallel, total=len(get_tools_definitions()))
+    return _for_registry_version(('prompt', native, parallel, selected), build)
+
+def request_tools(selected=None):
+    """The `tools` parameter of native mode for the current registry version (shared, do not modify)."""
+    return _for_registry_version(('native', selected), lambda: native_tools(_selected_definitions(selected)))
 
 class LLMProcessor:
     """
     LLM处理系统
     """
-    def __init__(self, config):
-        self.config = config
+    def __init__(self, config, cancel_event=None):
+        # read_tool_result finds the results stored for this chat through resultSessionId in LLM_CONFIG
+        self.config = dict(config, resultSessionId=config.get('sessionId') or f"anonymous-{uuid.uuid4().hex}")
+        # Set when the chat is stopped; tools running in worker processes are then killed
+        self.cancel_event = cancel_event
         self.api_key = config.get('apiKey')
         self.base_url = config.get('baseUrl')
-        set_llm_config(config)
+        # Tools in worker processes run in this chat's workspace and config, whatever the globals are by then
+        workspace_path = config.get('workspacePath')
+        self.cwd = os.path.abspath(workspace_path) if workspace_path and os.path.isdir(workspace_path) else os.getcwd()
+        set_llm_config(self.config)
 
     def process(self, query, history, context_files):
         # Ensure tools have the latest config (including model)
         set_llm_config(self.config)
         model_id = self.config.get(P10Config.KEY_LLM_PROCESSER_MODEL)
 
-        # 1. Construct System Prompt with Tools
-        tools_definitions = get_tools_definitions()
-        tools_json = json.dumps(tools_definitions, indent=2)
-        
-        system_prompt = P10Config.LLM_PROCESSOR_SYSTEM_PROMPT.format(tools_json=tools_json)
+        # 1. Construct System Prompt with Tools (rendered once per tool registry version)
+        # Several <tool> blocks per response run concurrently; otherwise one call per turn
+        parallel = self.config.get('parallelToolCalls', P10Config.PARALLEL_TOOL_CALLS)
+
+        # Native mode passes the tools through the provider's function-calling API instead of the
+        # system prompt; providers that reject it are remembered and use the text protocol
+        native = self.config.get('nativeToolCalls', P10Config.NATIVE_TOOL_CALLS) and tools_supported(self.base_url, model_id)
+
+        # With many tools only those relevant to the query are listed (see tool_retrieval.py)
+        selected = None
+        if self.config.get('toolRetrieval', P10Config.TOOL_RETRIEVAL):
+            selected = select_tools(query, top_k=self.config.get('toolRetrievalTopK'))
+            if selected is not None:
+                sys.stderr.write(f"[DEBUG] Tool retrieval: {len(selected)} tools selected for the prompt\n")
+
+        prompt = system_prompt(native, parallel, selected)
 
         # Initial User Prompt
         # We don't pre-read files anymore, the LLM must decide to read them.
@@ -62,8 +383,21 @@ class LLMProcessor:
 User Query: {query}
 """
 
+        # Earlier messages of a stored session replace the history sent by the frontend
+        session = None
+        if self.config.get('sessionId') and self.config.get('persistSessions', P10Config.PERSIST_SESSIONS):
+            db = open_session_db()
+            session = db.get(self.config['sessionId']) if db else None
+        if session is not None:
+            if not session.messages:
+                # A new session continues the history of clients that still send it
+                for msg in history:
+                    if msg.get('content'):
+                        session.append(msg['role'], msg['content'])
+            history = list(session.messages)
+
         messages = [
-            {"role": "system", "content": system_prompt}
+            {"role": "system", "content": prompt}
         ]
         
         # Add history
@@ -72,6 +406,37 @@ User Query: {query}
                 messages.append({"role": msg['role'], "content": msg['content']})
 
         messages.append({"role": "user", "content": user_prompt})
+        if session is not None:
+            session.append("user", user_prompt)
+
+        # The system prompt and the query are always sent; older messages are compacted to fit the model's budget
+        context = None
+        if self.config.get('contextManagement', True):
+            context = ContextManager(context_budget(model_id, self.config), summarize=self._summarize)
+            context.pin(messages[0])
+            context.pin(messages[-1])
+
+        stream_function = chat_completion_stream
+        if self.config.get('rawStream', P10Config.RAW_STREAM):
+            stream_function = chat_completion_stream_raw
+
+        # Ask the provider to stop right after the tool call; the stream is also cut
+        # locally as soon as </tool> arrives, in case the stop sequence is ignored.
+        # With parallel calls more <tool> blocks may follow, so both happen where the
+        # model starts writing a <tool_result> of its own instead.
+        stop = None if native else self._tool_stop_sequence(parallel)
+
+        # Read-only tool results are memoized for the session (validated against file state)
+        cache = None
+        if self.config.get('toolResultCache', P10Config.TOOL_RESULT_CACHE):
+            cache = get_session_cache(self.config.get('sessionId'))
+            cache.new_context()
+        # A partial rather than a lambda, so a tool argument called `name` is passed through
+        execute = functools.partial(execute_tool, _cache=cache, _cwd=self.cwd, _llm_config=self.config)
+
+        # Large results are kept out of the history; the model pages through them with read_tool_result
+        spill_chars = self.config.get('toolResultSpillChars', P10Config.TOOL_RESULT_SPILL_CHARS)
+        store = get_session_store(self.config['resultSessionId']) if spill_chars else None
 
         # Loop for tool calls
         max_turns = 50
@@ -79,90 +444,164 @@ User Query: {query}
         
         while current_turn < max_turns:
             current_turn += 1
+            if cache is not None:
+                cache.turn = current_turn
             
-            # Call LLM
-            stream = chat_completion_stream(
-                self.api_key,
-                self.base_url,
-                model_id,
-                messages
-            )
-            
-            full_response = ""
-            
-            # Yield chunks to the caller (cli.py)
-            for chunk in stream:
-                content = chunk.choices[0].delta.content
-                if content:
-                    full_response += content
-                    yield chunk
+            if context is not None:
+                report = context.fit(messages, current_turn)
+                if report["tokens_saved"] and cache is not None:
+                    # "Unchanged since turn N" markers may point at compacted results
+                    cache.new_context()
+                yield report
             
-            # Add assistant response to history
-            messages.append({"role": "assistant", "content": full_response})
+            # Call LLM (the raw SSE path skips building SDK objects for every chunk)
+            try:
+                stream = self._open_stream(stream_function, model_id, messages, stop,
+                                           request_tools(selected) if native else None)
+            except ToolsUnsupportedError:
+                # Only the first request of a run tells that the provider has no function calling;
+                # a rejection after native tool calls went through is an error of that request
+                if current_turn > 1:
+                    raise
+                mark_tools_unsupported(self.base_url, model_id)
+                # Continue with the text protocol: tools go back into the system prompt
+                native = False
+                messages[:] = text_protocol_messages(messages)
+                messages[0] = {"role": "system", "content": system_prompt(native, parallel, selected)}
+                if context is not None:
+                    context.pin(messages[0])
+                stop = self._tool_stop_sequence(parallel)
+                stream = self._open_stream(stream_function, model_id, messages, stop, None)
             
-            # Check for tool call
-            # Matches <tool> ... </tool>
-            tool_call_pattern = r"<tool>(.*?)</tool>"
-            match = re.search(tool_call_pattern, full_response, re.DOTALL)
+            builder = TurnEventBuilder(stop_at_tool=not parallel and not native)
+            native_calls = NativeToolCallBuilder()
+            scheduler = ToolScheduler(execute, cancel_event=self.cancel_event)
+            last_finish_reason = None
             
-            if match:
+            try:
+                # Yield typed events to the caller (cli.py); each tool call starts as soon as its block closes
                 try:
-                    tool_content = match.group(1)
-                    
-                    # Extract function name
-                    # Matches ✿FUNCTION✿: name
-                    func_match = re.search(r"✿FUNCTION✿:\s*(.+)", tool_content)
-                    if not func_match:
-                        raise ValueError("Missing '✿FUNCTION✿:' identifier in tool call")
-                    tool_name = func_match.group(1).strip()
-                    
-                    # Extract arguments
-                    # Matches ✿ARGS✿: json_string
-                    args_match = re.search(r"✿ARGS✿:\s*(.+)", tool_content, re.DOTALL)
-                    tool_args = {}
-                    if args_match:
-                        args_json = args_match.group(1).strip()
-                        tool_args = json.loads(args_json)
-                    
-                    # DEBUG: Print tool call details to stderr
-                    sys.stderr.write(f"\n[DEBUG] Tool Call: {tool_name}\nArguments: {json.dumps(tool_args, indent=2, ensure_ascii=False)}\n")
-                    sys.stderr.flush()
-
-                    # Notify user of execution (optional, via a special chunk if cli.py supports it)
-                    # For now, we just execute.
-                    
-                    result = execute_tool(tool_name, **tool_args)
-                    
+                    for content, finish_reason, usage, tool_call_deltas in stream:
+                        if usage:
+                            yield usage_event(usage)
+                        if finish_reason:
+                            last_finish_reason = finish_reason
+                        if content:
+                            yield from builder.feed(content)
+                            if not native:
+                                self._dispatch_tool_calls(builder.tool_calls, scheduler)
+                            if builder.stopped:
+                                # No more tool calls can follow: stop reading and finish the turn now
+                                break
+                        if tool_call_deltas and native:
+                            yield from native_calls.feed(tool_call_deltas)
+                            self._dispatch_tool_calls(native_calls.completed(), scheduler)
+                    yield from builder.finish(close_open_tool=stop == [CLOSE_TAGS['tool']] and last_finish_reason == 'stop')
+                    self._dispatch_tool_calls(native_calls.completed(final=True) if native else builder.tool_calls, scheduler)
+                finally:
+                    # Release the HTTP connection if the caller stops early (e.g. chat cancelled)
+                    stream.close()
+                
+                # Add assistant response to history
+                assistant_message = {"role": "assistant", "content": builder.response}
+                if native_calls.calls:
+                    for call in native_calls.calls:
+                        call.id = call.id or f"call_{current_turn}_{call.index}"
+                    assistant_message["tool_calls"] = [call.to_message() for call in native_calls.calls]
+                messages.append(assistant_message)
+                if session is not None:
+                    # Stored in the text protocol, which every mode and provider accepts as history
+                    session.append("assistant", builder.response + "".join(call.to_text() for call in native_calls.calls))
+                
+                # Collect the results in the order the calls were written; all of them go back in one message
+                tool_outputs = []
+                for call, result in scheduler.results():
                     # DEBUG: Print tool result to stderr
-                    sys.stderr.write(f"\n[DEBUG] Tool Result: {result}\n")
+                    sys.stderr.write(f"\n[DEBUG] Tool Result ({call.name}): {result}\n")
                     sys.stderr.flush()
                     
-                    # Add result to history
-                    tool_output = f"\nTool '{tool_name}' Output:\n{result}\n"
-                    messages.append({"role": "user", "content": tool_output})
+                    result = str(result)
+                    if native and selected is not None and call.name == 'search_tools' and not call.error:
+                        # Found tools are offered to the model from the next request on
+                        selected = selected | tools_in_search_result(result)
+                    # Only the history copy is spilled; the frontend always gets the full result
+                    history_result = result
+                    if store is not None and not call.error and call.name not in P10Config.TOOL_RESULT_SPILL_EXEMPT:
+                        history_result = store.compact(result, spill_chars)
                     
-                    # Yield the tool result to the frontend so it can be rendered
-                    # We wrap it in a special tag <tool_result>
-                    result_chunk = f"\n<tool_result>\n{result}\n</tool_result>\n"
-                    yield MockChunk(result_chunk)
+                    if call.error:
+                        tool_outputs.append(call.error)
+                    else:
+                        tool_outputs.append(f"\nTool '{call.name}' Output:\n{history_result}\n")
                     
-                    # Yield a separator or status update
-                    # yield ... 
+                    if native:
+                        # Each native call is answered by a tool message with its id
+                        messages.append({"role": "tool", "tool_call_id": native_calls.calls[call.index].id, "content": call.error or history_result})
+                        if context is not None:
+                            context.add_tool_output(messages[-1], current_turn)
                     
-                except json.JSONDecodeError:
-                    error_msg = "Error: Invalid JSON in ✿ARGS✿."
-                    sys.stderr.write(f"\n[DEBUG] {error_msg}\n")
-                    messages.append({"role": "user", "content": error_msg})
-                except Exception as e:
-                    error_msg = f"Error executing tool: {str(e)}"
-                    sys.stderr.write(f"\n[DEBUG] {error_msg}\n")
-                    messages.append({"role": "user", "content": error_msg})
-            else:
+                    # Send the tool result to the frontend so it can be rendered
+                    yield {"event": "tool_result", "content": result}
+                
+                if tool_outputs:
+                    content = "\n".join(tool_outputs)
+                    if not native:
+                        messages.append({"role": "user", "content": content})
+                        if context is not None:
+                            context.add_tool_output(messages[-1], current_turn)
+                    if session is not None:
+                        session.append("user", content, parts=tool_outputs)
+            finally:
+                scheduler.shutdown()
+            
+            yield {"event": "turn_end", "turn": current_turn}
+            
+            if not tool_outputs:
                 # No tool call, assume completion
                 break
         
         if current_turn >= max_turns:
             limit_msg = f"\n[System] Maximum conversation turns ({max_turns}) reached. Stopping execution."
             sys.stderr.write(limit_msg + "\n")
-            yield MockChunk(limit_msg)
+            yield {"event": "text_delta", "text": limit_msg}
 
+    def _tool_stop_sequence(self, parallel):
+        """The stop sequence of the text tool protocol: after one call, or before a made-up result."""
+        if not self.config.get('toolStopSequence', P10Config.TOOL_STOP_SEQUENCE):
+            return None
+        return ['<tool_result>'] if parallel else [CLOSE_TAGS['tool']]
+
+    def _open_stream(self, stream_function, model_id, messages, stop, tools):
+        """Starts the LLM request; returns (content, finish_reason, usage, tool_calls) tuples."""
+        stream = stream_function(
+            self.api_key,
+            self.base_url,
+            model_id,
+            messages,
+            include_usage=self.config.get('streamUsage', P10Config.STREAM_USAGE),
+            stop=stop,
+            tools=tools
+        )
+        if stream_function is chat_completion_stream:
+            stream = sdk_tuples(stream)
+        return stream
+
+    def _summarize(self, text):
+        """Summarizes compacted history with the high speed model."""
+        model = self.config.get('highSpeedTextModel') or self.config.get(P10Config.KEY_LLM_PROCESSER_MODEL)
+        return chat_completion(self.api_key, self.base_url, model, [
+            {"role": "system", "content": P10Config.CONTEXT_SUMMARY_PROMPT},
+            {"role": "user", "content": text}
+        ], temperature=0.2)
+
+    def _dispatch_tool_calls(self, tool_calls, scheduler):
+        """Submits the tool calls completed since the last call (<tool> blocks or NativeToolCalls)."""
+        for tool_call in tool_calls[len(scheduler.calls):]:
+            name, args, error = parse_tool_call(tool_call)
+            if error:
+                sys.stderr.write(f"\n[DEBUG] {error}\n")
+            else:
+                # DEBUG: Print tool call details to stderr
+                sys.stderr.write(f"\n[DEBUG] Tool Call: {name}\nArguments: {json.dumps(args, indent=2, ensure_ascii=False)}\n")
+            sys.stderr.flush()
+            scheduler.submit(name, args, error)
@@ -0,0 +1,144 @@
+"""
+Per-session store for large tool results.
+
+Results longer than TOOL_RESULT_SPILL_CHARS are written to a temporary
+directory instead of going into the message history. The model receives a
+preview plus a handle and reads the rest with the read_tool_result tool,
+so every following request stays small whatever the tools return. A handle
+is only readable from the session that stored it and only while the backend
+runs; handles in a history reloaded from session_db have expired.
+"""
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+from configs.P10_config import P10Config
+
+class ResultStore:
+    """Content-addressed blobs on disk for one chat session, evicted oldest first beyond max_bytes."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or P10Config.RESULT_STORE_MAX_BYTES
+        self._dir = None # created on first spill
+        self._blobs = OrderedDict() # handle -> size in bytes, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, text):
+        """Stores `text` and returns its handle (identical results share one)."""
+        data = text.encode('utf-8', 'surrogatepass')
+        handle = 'res_' + hashlib.blake2b(data, digest_size=5).hexdigest()
+        with self._lock:
+            if handle in self._blobs:
+                self._blobs.move_to_end(handle)
+                return handle
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix='wand_results_')
+            with open(os.path.join(self._dir, handle), 'wb') as f:
+                f.write(data)
+            self._blobs[handle] = len(data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._blobs) > 1:
+                old, size = self._blobs.popitem(last=False)
+                self._bytes -= size
+                try:
+                    os.remove(os.path.join(self._dir, old))
+                except OSError:
+                    pass
+        return handle
+
+    def get(self, handle):
+        with self._lock:
+            if handle not in self._blobs:
+                return None
+            path = os.path.join(self._dir, handle)
+        try:
+            with open(path, 'rb') as f:
+                return f.read().decode('utf-8', 'surrogatepass')
+        except OSError:
+            return None
+
+    def compact(self, text, spill_chars=None):
+        """Returns `text` unchanged when small, otherwise a preview with the handle of the stored result."""
+        spill_chars = spill_chars or P10Config.TOOL_RESULT_SPILL_CHARS
+        if len(text) <= spill_chars:
+            return text
+        handle = self.put(text)
+
+        # Cut the preview at a line break when there is one reasonably close
+        preview = text[:P10Config.TOOL_RESULT_PREVIEW_CHARS]
+        cut = preview.rfind('\n')
+        if cut > len(preview) // 2:
+            preview = preview[:cut]
+        pages = -(-len(text) // P10Config.TOOL_RESULT_PAGE_CHARS)
+        return (f"{preview}\n...\n"
+                f"[Result too large to show: {len(text)} chars, {len(text.splitlines())} lines. "
+                f"Only the first {len(preview)} chars are shown above. The full result is stored as \"{handle}\" "
+                f"({pages} pages of {P10Config.TOOL_RESULT_PAGE_CHARS} chars). "
+                f"Call read_tool_result with handle=\"{handle}\" and page=N (or start/end offsets) to read more.]")
+
+    def close(self):
+        with self._lock:
+            if self._dir:
+                shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+            self._blobs.clear()
+            self._bytes = 0
+
+# One store per session id, most recently used last
+_session_stores = OrderedDict()
+_session_lock = threading.Lock()
+
+def get_session_store(session_id=None):
+    """The store for a chat session; requests without a session id get a store of their own."""
+    session_id = session_id or f"anonymous-{uuid.uuid4().hex}"
+    with _session_lock:
+        store = _session_stores.pop(session_id, None) or ResultStore()
+        _session_stores[session_id] = store
+        while len(_session_stores) > P10Config.RESULT_STORE_MAX_SESSIONS:
+            _, evicted = _session_stores.popitem(last=False)
+            evicted.close()
+        return store
+
+def read_result(handle, page=1, start=None, end=None, session_id=None):
+    """
+    A page (or a character range) of a result stored for the session `session_id`, as returned
+    to the model by read_tool_result. Handles of other sessions are not found.
+    """
+    with _session_lock:
+        store = _session_stores.get(session_id) if session_id else None
+    text = store.get(handle) if store is not None else None
+    if text is None:
+        # Stored results live in a temporary directory: a history reloaded after a restart keeps handles that are gone
+        return (f"Error: Stored result {handle} has expired (results are kept only while the app runs, "
+                f"for the chat that produced them). Call the original tool again if you need it.")
+
+    page_chars = P10Config.TOOL_RESULT_PAGE_CHARS
+    pages = -(-len(text) // page_chars)
+    if start is None and end is None:
+        if page < 1 or page > pages:
+            return f"Error: Page {page} out of range; {handle} has {pages} pages."
+        start = (page - 1) * page_chars
+        end = start + page_chars
+        position = f"page {page} of {pages}"
+    else:
+        start = max(start or 0, 0)
+        # Ranges are capped so a read never has to be stored again
+        end = min(end if end is not None else start + page_chars, start + P10Config.TOOL_RESULT_SPILL_CHARS)
+        if start >= len(text) or end <= start:
+            return f"Error: Range {start}-{end} out of bounds; {handle} has {len(text)} chars."
+        position = f"chars {start}-{min(end, len(text))}"
+    return f"[{handle}, {position}, {len(text)} chars total]\n{text[start:end]}"
+
+def _close_all():
+    with _session_lock:
+        for store in _session_stores.values():
+            store.close()
+        _session_stores.clear()
+
+atexit.register(_close_all)
@@ -0,0 +1,131 @@
+"""
+Persistent chat sessions in .wand/sessions.db (SQLite).
+
+The frontend sends only the session id and the new message; the messages of
+earlier requests (assistant responses and tool outputs included, as the model
+saw them) are read from here. Storage is append-only. Message contents are
+split into parts (one per tool output) and every part is stored once under
+its content hash, so tool outputs repeated across turns cost one row.
+Loaded sessions are kept in memory, so in --serve mode a request only appends.
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from configs.P10_config import P10Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    parts TEXT NOT NULL, -- space separated blob hashes, joined with newlines on load
+    created REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+"""
+
+def _hash(text):
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+class Session:
+    """The stored messages of one conversation, appended to as the agent runs."""
+
+    def __init__(self, db, session_id, messages):
+        self.db = db
+        self.id = session_id
+        self.messages = messages # [{"role", "content"}] in order
+
+    def append(self, role, content, parts=None):
+        """
+        Appends a message. `parts` (joined with newlines they give `content`) are
+        deduplicated separately, e.g. the individual outputs of a tool turn.
+        """
+        self.db._append(self, role, content, parts or [content])
+
+class SessionDB:
+    def __init__(self, path):
+        self.path = path
+        self._sessions = OrderedDict() # session id -> Session, most recently used last
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Shared by the worker threads of --serve mode; every use holds self._lock
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, session_id):
+        """Returns the Session, loading it on first use (an unknown id starts an empty session)."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                session = Session(self, session_id, self._load(session_id))
+            self._sessions[session_id] = session
+            while len(self._sessions) > P10Config.SESSION_CACHE_MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+            return session
+
+    def _load(self, session_id):
+        rows = self._conn.execute(
+            "SELECT role, parts FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        hashes = {h for _, parts in rows for h in parts.split()}
+        contents = {}
+        if hashes:
+            # One query per chunk (SQLite limits bound variables)
+            hash_list = list(hashes)
+            for i in range(0, len(hash_list), 500):
+                chunk = hash_list[i:i + 500]
+                contents.update(self._conn.execute(
+                    f"SELECT hash, content FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+        return [{"role": role, "content": "\n".join(contents.get(h, '') for h in parts.split())} for role, parts in rows]
+
+    def _append(self, session, role, content, parts):
+        hashes = [_hash(part) for part in parts]
+        now = time.time()
+        with self._lock:
+            # A cancelled chat may still be finishing while the next one starts
+            seq = len(session.messages)
+            session.messages.append({"role": role, "content": content})
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.execute("INSERT OR IGNORE INTO sessions (id, created) VALUES (?, ?)", (session.id, now))
+                    self._conn.executemany("INSERT OR IGNORE INTO blobs (hash, content) VALUES (?, ?)", zip(hashes, parts))
+                    self._conn.execute(
+                        "INSERT INTO messages (session_id, seq, role, parts, created) VALUES (?, ?, ?, ?, ?)",
+                        (session.id, seq, role, ' '.join(hashes), now)
+                    )
+            except sqlite3.Error as e:
+                # The conversation goes on from memory
+                sys.stderr.write(f"Warning: Could not save message of session {session.id}: {e}\n")
+
+# One database per path (the working directory may differ between requests)
+_databases = {}
+_databases_lock = threading.Lock()
+
+def open_session_db(path=None):
+    """The SessionDB at `path` (default .wand/sessions.db in the working directory), or None if it cannot be opened."""
+    path = os.path.abspath(path or os.path.join(os.getcwd(), '.wand', P10Config.SESSION_DB_NAME))
+    with _databases_lock:
+        if path not in _databases:
+            try:
+                _databases[path] = SessionDB(path)
+            except (OSError, sqlite3.Error) as e:
+                sys.stderr.write(f"Warning: Could not open session database {path}: {e}\n")
+                return None
+        return _databases[path]
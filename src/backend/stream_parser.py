@@ -0,0 +1,172 @@
+"""
+Incremental tokenizer for the tagged LLM output protocol.
+
+The model (and LLMProcessor) interleave plain text with <thinking>, <subtitle>,
+<tool> and <tool_result> blocks. TagStreamParser consumes the stream delta by
+delta in a single pass: each delta is scanned once for the next relevant tag, and
+only a possible partial tag at the end of a delta (at most MAX_TAG_LENGTH - 1
+characters) is held back until the next delta arrives.
+"""
+import re
+
+TAGS = ('thinking', 'subtitle', 'tool', 'tool_result')
+
+# Event kinds
+TEXT = 'text'
+OPEN = 'open'
+CLOSE = 'close'
+
+OPEN_TAGS = {f"<{tag}>": tag for tag in TAGS}
+CLOSE_TAGS = {tag: f"</{tag}>" for tag in TAGS}
+MAX_TAG_LENGTH = max(len(t) for t in list(OPEN_TAGS) + list(CLOSE_TAGS.values()))
+
+_OPEN_TAG_RE = re.compile('<(' + '|'.join(TAGS) + ')>')
+
+
+def _partial_tag_start(data, pos, candidates):
+    """Returns the index of a trailing proper prefix of one of `candidates`, or -1."""
+    idx = data.find('<', max(pos, len(data) - MAX_TAG_LENGTH + 1))
+    while idx != -1:
+        tail = data[idx:]
+        for tag_text in candidates:
+            if len(tail) < len(tag_text) and tag_text.startswith(tail):
+                return idx
+        idx = data.find('<', idx + 1)
+    return -1
+
+
+class TagStreamParser:
+    """
+    Splits a streamed response into events.
+
+    feed() and flush() return lists of (kind, tag, text) tuples:
+        (OPEN, tag, '')      a block starts
+        (TEXT, tag, text)    text inside `tag` (None for top-level text)
+        (CLOSE, tag, '')     a block ends
+    Inside a block only its own closing tag is recognised, so tool results or
+    thinking that quote the protocol are passed through as text.
+    """
+
+    def __init__(self):
+        self.block = None   # name of the currently open block, or None
+        self._pending = ''  # possible partial tag carried over from the previous delta
+
+    def feed(self, chunk):
+        """Consumes one delta and returns the events it completes."""
+        if not self._pending and '<' not in chunk:
+            # Fast path: most token deltas cannot contain or start a tag
+            return [(TEXT, self.block, chunk)] if chunk else []
+
+        events = []
+        data = self._pending + chunk if self._pending else chunk
+        self._pending = ''
+        pos = 0 # start of text not yet emitted
+
+        while True:
+            if self.block is None:
+                match = _OPEN_TAG_RE.search(data, pos)
+                if not match:
+                    candidates = OPEN_TAGS
+                    break
+                start, end = match.span()
+                if start > pos:
+                    events.append((TEXT, None, data[pos:start]))
+                self.block = match.group(1)
+                events.append((OPEN, self.block, ''))
+            else:
+                close_tag = CLOSE_TAGS[self.block]
+                start = data.find(close_tag, pos)
+                if start == -1:
+                    candidates = (close_tag,)
+                    break
+                end = start + len(close_tag)
+                if start > pos:
+                    events.append((TEXT, self.block, data[pos:start]))
+                events.append((CLOSE, self.block, ''))
+                self.block = None
+            pos = end
+
+        # Hold back a possible partial tag at the end of the delta
+        hold = _partial_tag_start(data, pos, candidates)
+        if hold != -1:
+            self._pending = data[hold:]
+            data = data[:hold]
+
+        if pos < len(data):
+            events.append((TEXT, self.block, data[pos:]))
+        return events
+
+    def flush(self):
+        """Ends the stream, returning any held-back text. An unclosed block stays in self.block."""
+        events = []
+        if self._pending:
+            events.append((TEXT, self.block, self._pending))
+            self._pending = ''
+        return events
+
+
+FUNCTION_MARKER = '✿FUNCTION✿:'
+ARGS_MARKER = '✿ARGS✿:'
+
+_FUNCTION_RE = re.compile(re.escape(FUNCTION_MARKER) + r"\s*(.+)")
+
+
+class ToolCallStream:
+    """
+    Incrementally splits the text of a <tool> block into the function name and
+    the raw ✿ARGS✿ JSON, so the call can be announced before the block closes.
+
+    feed() and close() return lists of events:
+        ('start', name)    the function name is known
+        ('args', text)     a piece of the raw arguments JSON
+    """
+
+    def __init__(self):
+        self.name = None
+        self._head = ''         # text before the ARGS marker
+        self._args_parts = []
+        self._in_args = False
+
+    def feed(self, text):
+        if self._in_args:
+            return self._add_args(text)
+
+        # Only the new text (plus a possible split marker) needs to be searched
+        search_from = max(0, len(self._head) - len(ARGS_MARKER) + 1)
+        self._head += text
+        marker = self._head.find(ARGS_MARKER, search_from)
+        if marker == -1:
+            return []
+
+        head, rest = self._head[:marker], self._head[marker + len(ARGS_MARKER):]
+        self._head = head
+        self._in_args = True
+        return self._start(head) + self._add_args(rest)
+
+    def _add_args(self, text):
+        if not self._args_parts:
+            # The JSON follows the marker after optional whitespace
+            text = text.lstrip()
+            if not text:
+                return []
+        self._args_parts.append(text)
+        return [('args', text)]
+
+    def close(self):
+        """Ends the block; announces the call if the ARGS marker never appeared."""
+        if self._in_args:
+            return []
+        return self._start(self._head)
+
+    def _start(self, head):
+        match = _FUNCTION_RE.search(head)
+        if match:
+            self.name = match.group(1).strip()
+        return [('start', self.name)]
+
+    @property
+    def args_text(self):
+        """The raw arguments JSON, or None when the block had no ARGS marker."""
+        if not self._in_args:
+            return None
+        return ''.join(self._args_parts).strip()
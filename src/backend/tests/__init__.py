@@ -0,0 +1,5 @@
+"""
+Unit tests of the backend modules. Run from src/backend:
+    python -m unittest discover tests
+(tests that import llm_processor need the openai and httpx packages of python_env).
+"""
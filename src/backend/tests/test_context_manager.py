@@ -0,0 +1,92 @@
+import unittest
+
+import context_manager
+from context_manager import ContextManager
+
+def history(count):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"h{i} " + "x" * 400} for i in range(count)]
+
+class ContextManagerTest(unittest.TestCase):
+    def setUp(self):
+        context_manager._summaries.clear()
+        self.summaries = []
+
+    def summarize(self, text):
+        self.summaries.append(text)
+        return f"summary {len(self.summaries)}"
+
+    def manager(self, messages):
+        """A ContextManager with the system prompt and the query (last message) pinned, as LLMProcessor does."""
+        manager = ContextManager(300, summarize=self.summarize, keep_recent=2)
+        manager.pin(messages[0])
+        manager.pin(messages[-1])
+        return manager
+
+    def test_history_and_turns_are_compacted_in_place(self):
+        query = {"role": "user", "content": "QUERY"}
+        messages = [{"role": "system", "content": "system"}] + history(10) + [query]
+        manager = self.manager(messages)
+        for turn in range(1, 4):
+            messages.append({"role": "assistant", "content": f"turn {turn} " + "y" * 400})
+            messages.append({"role": "user", "content": f"output {turn} " + "z" * 400})
+
+        report = manager.fit(messages, 4)
+
+        self.assertLessEqual(report["tokens"], 300)
+        contents = [m["content"] for m in messages]
+        self.assertEqual(contents[0], "system")
+        self.assertTrue(contents[1].startswith("[Summary of 10 earlier messages"))
+        self.assertIs(messages[2], query)
+        self.assertTrue(contents[3].startswith("[Summary of 4 earlier messages"))
+        self.assertEqual([c.split()[0] for c in contents[4:]], ["turn", "output"])
+        self.assertIn("h0", self.summaries[0])
+        self.assertNotIn("QUERY", self.summaries[0])
+
+    def test_summary_is_reused_by_the_next_request(self):
+        turns = [{"role": "assistant", "content": "turn " + "y" * 400}, {"role": "user", "content": "output " + "z" * 400}]
+        first = [{"role": "system", "content": "system"}] + history(10) + [{"role": "user", "content": "QUERY"}]
+        manager = self.manager(first)
+        first += [dict(m) for m in turns] * 2
+        self.assertEqual(manager.fit(first, 3).get("summarized"), 10 + 2)
+        self.assertEqual(len(self.summaries), 2)
+
+        # The next request sends the same history, followed by the earlier query, its turns and a new query
+        second = ([{"role": "system", "content": "system"}] + history(10) + [{"role": "user", "content": "QUERY"}]
+                  + [dict(m) for m in turns] * 2 + [{"role": "user", "content": "NEXT"}])
+        report = self.manager(second).fit(second, 1)
+
+        self.assertEqual(report.get("reused"), 10)
+        # Only what follows the reused summary is sent to the summarizer
+        self.assertEqual(len(self.summaries), 3)
+        self.assertIn("summary 1", self.summaries[2])
+        self.assertNotIn("h0", self.summaries[2])
+        self.assertEqual(second[-1]["content"], "NEXT")
+
+    def test_stale_tool_outputs_are_stubbed_first(self):
+        messages = [{"role": "system", "content": "system"}, {"role": "user", "content": "QUERY"}]
+        manager = self.manager(messages)
+        output = {"role": "user", "content": "\nTool 'read_file' Output:\n" + "w" * 4000 + " res_0123456789"}
+        messages.append(output)
+        manager.add_tool_output(output, 1)
+        messages += [{"role": "assistant", "content": "a"}, {"role": "user", "content": "b"}]
+
+        report = manager.fit(messages, 2)
+
+        self.assertEqual(report.get("stubbed"), 1)
+        self.assertNotIn("summarized", report)
+        self.assertIn("res_0123456789", messages[2]["content"])
+        self.assertEqual(self.summaries, [])
+
+    def test_messages_are_dropped_without_a_summary(self):
+        messages = [{"role": "system", "content": "system"}] + history(6) + [{"role": "user", "content": "QUERY"}]
+        manager = ContextManager(100, summarize=None, keep_recent=1)
+        manager.pin(messages[0])
+        manager.pin(messages[-1])
+
+        report = manager.fit(messages, 1)
+
+        self.assertEqual(report.get("dropped"), 6)
+        self.assertEqual(messages[1]["content"], "[6 earlier messages were removed to save context.]")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from stream_parser import TagStreamParser, TEXT, OPEN, CLOSE
+
+RESPONSE = "Let me look.<thinking>a < b</thinking><tool>\n✿FUNCTION✿: read_file\n✿ARGS✿: {\"file_path\": \"a.txt\"}\n</tool>done"
+
+def parse(chunks):
+    """Events of the whole stream, adjacent text of the same block merged."""
+    parser = TagStreamParser()
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    events += parser.flush()
+    merged = []
+    for kind, tag, text in events:
+        if kind == TEXT and merged and merged[-1][0] == TEXT and merged[-1][1] == tag:
+            merged[-1] = (TEXT, tag, merged[-1][2] + text)
+        elif kind != TEXT or text:
+            merged.append((kind, tag, text))
+    return merged
+
+class TagStreamParserTest(unittest.TestCase):
+    def test_whole_response(self):
+        self.assertEqual(parse([RESPONSE]), [
+            (TEXT, None, "Let me look."),
+            (OPEN, 'thinking', ''), (TEXT, 'thinking', "a < b"), (CLOSE, 'thinking', ''),
+            (OPEN, 'tool', ''), (TEXT, 'tool', "\n✿FUNCTION✿: read_file\n✿ARGS✿: {\"file_path\": \"a.txt\"}\n"), (CLOSE, 'tool', ''),
+            (TEXT, None, "done"),
+        ])
+
+    def test_tags_split_across_chunks(self):
+        expected = parse([RESPONSE])
+        for cut in range(1, len(RESPONSE)):
+            with self.subTest(cut=cut):
+                self.assertEqual(parse([RESPONSE[:cut], RESPONSE[cut:]]), expected)
+
+    def test_one_character_chunks(self):
+        self.assertEqual(parse(list(RESPONSE)), parse([RESPONSE]))
+
+    def test_partial_tag_at_end_is_text(self):
+        parser = TagStreamParser()
+        self.assertEqual(parser.feed("x <too"), [(TEXT, None, "x ")])
+        self.assertEqual(parser.flush(), [(TEXT, None, "<too")])
+
+    def test_other_tags_inside_a_block_are_text(self):
+        self.assertEqual(parse(["<tool_result><tool>x</tool></tool_result>"]), [
+            (OPEN, 'tool_result', ''), (TEXT, 'tool_result', "<tool>x</tool>"), (CLOSE, 'tool_result', ''),
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
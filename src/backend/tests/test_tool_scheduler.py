@@ -0,0 +1,119 @@
+import functools
+import importlib.util
+import threading
+import time
+import unittest
+
+import tools
+from configs.P10_config import P10Config
+from tool_scheduler import ToolScheduler
+from tools import PermissionLevel, Tool
+
+def greet(name: str, times: int = 1):
+    """
+    Greets someone.
+
+    Args:
+        name (str): Who to greet. Example: "bob"
+        times (int): How often. Example: 2
+    """
+    return " ".join([f"hi {name}"] * times)
+
+class ToolSchedulerTest(unittest.TestCase):
+    TOOLS = {'test_read': PermissionLevel.P5, 'test_write': PermissionLevel.P8, 'test_greet': PermissionLevel.P5}
+
+    def setUp(self):
+        for name, level in self.TOOLS.items():
+            P10Config.TOOLS.register(Tool(name, greet.__doc__, greet, permission_level=level))
+        self.log = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        for name in self.TOOLS:
+            P10Config.TOOLS.unregister(name)
+
+    def execute(self, name, _cancelled=None, delay=0.0, label=None, **args):
+        with self.lock:
+            self.log.append(('start', label))
+        time.sleep(delay)
+        with self.lock:
+            self.log.append(('end', label))
+        return label
+
+    def run_calls(self, calls):
+        scheduler = ToolScheduler(self.execute)
+        try:
+            for name, args in calls:
+                scheduler.submit(name, args)
+            return [result for _, result in scheduler.results()]
+        finally:
+            scheduler.shutdown()
+
+    def test_writes_to_the_same_path_keep_their_order(self):
+        results = self.run_calls([
+            ('test_write', {'file_path': 'a.txt', 'delay': 0.2, 'label': 'first'}),
+            ('test_write', {'file_path': 'a.txt', 'label': 'second'}),
+        ])
+        self.assertEqual(results, ['first', 'second'])
+        self.assertLess(self.log.index(('end', 'first')), self.log.index(('start', 'second')))
+
+    def test_read_after_write_waits(self):
+        self.run_calls([
+            ('test_write', {'file_path': 'a.txt', 'delay': 0.2, 'label': 'write'}),
+            ('test_read', {'file_path': 'a.txt', 'label': 'read'}),
+        ])
+        self.assertLess(self.log.index(('end', 'write')), self.log.index(('start', 'read')))
+
+    def test_independent_calls_run_concurrently(self):
+        start = time.perf_counter()
+        results = self.run_calls([
+            ('test_read', {'file_path': 'a.txt', 'delay': 0.3, 'label': 'a'}),
+            ('test_read', {'file_path': 'a.txt', 'delay': 0.3, 'label': 'b'}),
+            ('test_write', {'file_path': 'c.txt', 'delay': 0.3, 'label': 'c'}),
+        ])
+        self.assertEqual(results, ['a', 'b', 'c'])
+        self.assertLess(time.perf_counter() - start, 0.6)
+
+    def test_writes_without_paths_are_serialized(self):
+        self.run_calls([
+            ('test_write', {'delay': 0.2, 'label': 'first'}),
+            ('test_write', {'label': 'second'}),
+        ])
+        self.assertLess(self.log.index(('end', 'first')), self.log.index(('start', 'second')))
+
+    def test_tool_with_a_name_argument(self):
+        scheduler = ToolScheduler(functools.partial(tools.execute_tool, _cache=None))
+        try:
+            scheduler.submit('test_greet', {'name': 'bob', 'times': '2'})
+            self.assertEqual([result for _, result in scheduler.results()], ['hi bob hi bob'])
+        finally:
+            scheduler.shutdown()
+
+def stream(*chunks):
+    for content in chunks:
+        yield content, None, None, None
+    yield None, 'stop', None, None
+
+@unittest.skipUnless(importlib.util.find_spec('openai') and importlib.util.find_spec('httpx'), "llm_processor needs openai and httpx")
+class ProcessorToolArgumentsTest(unittest.TestCase):
+    def setUp(self):
+        P10Config.TOOLS.register(Tool('test_greet', greet.__doc__, greet, permission_level=PermissionLevel.P5))
+
+    def tearDown(self):
+        P10Config.TOOLS.unregister('test_greet')
+
+    def test_name_argument_reaches_the_tool(self):
+        from llm_processor import LLMProcessor
+        config = {'apiKey': 'test', 'standardTextModel': 'test-model', 'toolRetrieval': False, 'nativeToolCalls': False,
+                  'contextManagement': False, 'toolResultCache': False, 'toolResultSpillChars': 0}
+        processor = LLMProcessor(config)
+        responses = iter([
+            stream('<tool>\n✿FUNCTION✿: test_greet\n', '✿ARGS✿: {"name": "bob"}\n</tool>'),
+            stream('Done.'),
+        ])
+        processor._open_stream = lambda *args: next(responses)
+        results = [event['content'] for event in processor.process('Greet bob', [], []) if event.get('event') == 'tool_result']
+        self.assertEqual(results, ['hi bob'])
+
+if __name__ == '__main__':
+    unittest.main()
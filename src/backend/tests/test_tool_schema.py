@@ -0,0 +1,81 @@
+import contextlib
+import io
+import unittest
+from typing import Optional
+
+from tool_schema import ToolArgumentError, ToolPlan
+
+def search(query: str, limit: int = 10, ids: list[int] = None, exact: bool = False, lang: Optional[str] = None):
+    """
+    Searches the index.
+
+    Args:
+        query (str): What to search for. Example: "cache"
+        limit (int): Maximum number of hits. Example: 5
+        ids (list[int]): Only these documents. Example: [1, 2]
+        exact (bool): Match the whole query. Example: true
+        lang (str): Language filter. Example: "en"
+    """
+    return query
+
+def legacy(path, count, options):
+    """
+    Old style tool without annotations.
+
+    Args:
+        path: The file.
+        count: How many.
+        options: Extra settings.
+    """
+    return path
+
+def flexible(query: str, **kwargs):
+    """
+    Passes extra arguments on.
+
+    Args:
+        query (str): What to search for.
+    """
+    return kwargs
+
+class ToolPlanTest(unittest.TestCase):
+    def test_strings_are_coerced_to_the_annotated_types(self):
+        plan = ToolPlan("search", search.__doc__, search)
+        kwargs = plan.coerce({"query": "cache", "limit": "5", "ids": "[1, 2]", "exact": "true", "lang": None})
+        self.assertEqual(kwargs, {"query": "cache", "limit": 5, "ids": [1, 2], "exact": True, "lang": None})
+
+    def test_numbers_are_accepted_for_str_parameters(self):
+        plan = ToolPlan("search", search.__doc__, search)
+        self.assertEqual(plan.coerce({"query": 42}), {"query": "42"})
+
+    def test_unannotated_parameters_are_guessed(self):
+        plan = ToolPlan("legacy", legacy.__doc__, legacy)
+        kwargs = plan.coerce({"path": "a.txt", "count": "3", "options": '{"deep": true}'})
+        self.assertEqual(kwargs, {"path": "a.txt", "count": 3, "options": {"deep": True}})
+
+    def test_unknown_arguments_are_dropped(self):
+        plan = ToolPlan("search", search.__doc__, search)
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            kwargs = plan.coerce({"query": "cache", "verbose": True})
+        self.assertEqual(kwargs, {"query": "cache"})
+        self.assertIn("Ignoring unknown argument 'verbose'", stderr.getvalue())
+
+    def test_unknown_arguments_are_kept_for_kwargs(self):
+        plan = ToolPlan("flexible", flexible.__doc__, flexible)
+        self.assertEqual(plan.coerce({"query": "q", "depth": 2}), {"query": "q", "depth": 2})
+
+    def test_all_problems_are_reported_together(self):
+        plan = ToolPlan("search", search.__doc__, search)
+        with self.assertRaises(ToolArgumentError) as caught:
+            plan.coerce({"limit": "many", "ids": "[1, \"x\"]"})
+        errors = {error["argument"]: error for error in caught.exception.errors}
+        self.assertEqual(set(errors), {"query", "limit", "ids"})
+        self.assertEqual(errors["query"]["problem"], "missing required argument")
+        self.assertEqual(errors["limit"]["expected"], {"type": "integer", "default": 10})
+        self.assertEqual(errors["limit"]["received"], '"many"')
+        result = caught.exception.to_result()
+        self.assertTrue(result.startswith("Error: Invalid arguments for tool 'search' (3 problem(s))."))
+        self.assertIn('"required":["query"]', result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Compiled-code and schema cache for the stored tools (tool_store.py).
+
+Every process start used to parse, compile and execute the source of every
+tool. The compiled code objects are kept, marshalled, in one file under
+__pycache__ next to the tool store, keyed by a hash of each tool's name and
+source. The schema compiled from each tool is stored alongside, so later
+starts can register a tool from its record and cached schema alone and
+bind its cached code only when it is first called (see tools._register_tool_from_record).
+The file is named after the interpreter's cache tag and starts with its
+bytecode magic number, so another Python version ignores it and writes its own.
+"""
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import sys
+import tempfile
+
+def _key(*parts):
+    return hashlib.sha256('\0'.join(parts).encode('utf-8', 'surrogatepass')).hexdigest()
+
+def load_code(name, source, data=None):
+    """The code object of a tool: unmarshalled from `data` (see BytecodeCache.code_data) or compiled."""
+    if data is not None:
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            pass
+    return compile(source, f"<tools.json:{name}>", 'exec')
+
+class BytecodeCache:
+    """Code objects and schemas of the tools loaded from one JSON file."""
+
+    def __init__(self, json_path):
+        tag = sys.implementation.cache_tag
+        name = os.path.splitext(os.path.basename(json_path))[0]
+        self.path = os.path.join(os.path.dirname(json_path), '__pycache__', f"{name}.{tag}.bin") if tag else None
+        self._code = None # key -> marshalled code object
+        self._schemas = None # key -> schema as JSON text
+        self._used = set()
+        self._dirty = False
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _load(self):
+        self._code, self._schemas = {}, {}
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return
+        magic = importlib.util.MAGIC_NUMBER
+        if data[:len(magic)] != magic:
+            return
+        try:
+            entries = marshal.loads(data[len(magic):])
+        except (EOFError, ValueError, TypeError):
+            sys.stderr.write(f"Warning: Ignoring corrupt tool bytecode cache {self.path}\n")
+            return
+        if isinstance(entries, dict) and isinstance(entries.get('code'), dict) and isinstance(entries.get('schemas'), dict):
+            self._code, self._schemas = entries['code'], entries['schemas']
+
+    def compile(self, name, source):
+        """The code object of a tool's source, compiled only when it is not cached."""
+        if self._code is None:
+            self._load()
+        key = _key(name, source)
+        self._used.add(key)
+        data = self._code.get(key)
+        if data is not None:
+            try:
+                code = marshal.loads(data)
+                self.stats['hits'] += 1
+                return code
+            except (EOFError, ValueError, TypeError):
+                pass
+        self.stats['misses'] += 1
+        code = load_code(name, source)
+        self._code[key] = marshal.dumps(code)
+        self._dirty = True
+        return code
+
+    def code_data(self, name, source):
+        """
+        The marshalled code object of a tool's source, or None when it is not cached (the entry
+        is kept on the next save). load_code() turns it into code without this cache.
+        """
+        if self._code is None:
+            self._load()
+        key = _key(name, source)
+        self._used.add(key)
+        return self._code.get(key)
+
+    def get_schema(self, *parts):
+        """The schema stored for `parts` (everything it was compiled from) as JSON text, or None."""
+        if self._schemas is None:
+            self._load()
+        key = _key(*parts)
+        self._used.add(key)
+        return self._schemas.get(key)
+
+    def put_schema(self, schema, *parts):
+        if self._schemas is None:
+            self._load()
+        key = _key(*parts)
+        self._used.add(key)
+        self._schemas[key] = json.dumps(schema, ensure_ascii=False, separators=(',', ':'))
+        self._dirty = True
+
+    def save(self):
+        """Writes the cache when something was compiled or a tool was removed; entries of removed tools are dropped."""
+        if not self.path or self._code is None:
+            return
+        if not self._dirty and len(self._code) + len(self._schemas) == len(self._used):
+            return
+        code = {key: data for key, data in self._code.items() if key in self._used}
+        schemas = {key: data for key, data in self._schemas.items() if key in self._used}
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Written to a temporary file and renamed, so a concurrent start never reads half a cache
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tools-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(importlib.util.MAGIC_NUMBER)
+                    f.write(marshal.dumps({'code': code, 'schemas': schemas}))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            # A read-only install just compiles on every start
+            sys.stderr.write(f"[DEBUG] Tool bytecode cache not written: {e}\n")
+            return
+        self._code, self._schemas = code, schemas
+        self._dirty = False
@@ -0,0 +1,175 @@
+"""
+Session-scoped memoization of read-only tool results.
+
+Results of P5-P7 tools that take path arguments are cached under the tool name
+plus canonical arguments. An entry is only reused while the (mtime, size) of
+every path it read is unchanged; directories are fingerprinted by the entries
+below them. Entries are evicted least recently used once the cached results
+exceed TOOL_CACHE_MAX_BYTES.
+
+When a call returns exactly what the same call already put in the current
+context, a short "unchanged since turn N" marker is returned instead, so the
+model is not sent the same text twice.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from configs.P10_config import P10Config
+
+# Argument names containing one of these are treated as file system paths
+PATH_ARG_HINTS = ('path', 'file', 'dir', 'folder')
+
+def call_paths(args):
+    """Normalized absolute paths among a tool call's arguments."""
+    paths = set()
+    for key, value in args.items():
+        if isinstance(value, str) and value and any(hint in key.lower() for hint in PATH_ARG_HINTS):
+            paths.add(os.path.normcase(os.path.abspath(value)))
+    return paths
+
+def _path_state(path, max_entries):
+    """
+    (mtime, size) of a file, or a digest of those of every entry below a directory.
+    Returns None when the directory is too large to fingerprint cheaply.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 'missing'
+    if not os.path.isdir(path):
+        return (st.st_mtime_ns, st.st_size)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{st.st_mtime_ns}".encode())
+    count = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    count += 1
+                    if count > max_entries:
+                        return None
+                    try:
+                        entry_st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    digest.update(f"{entry.path}\0{entry_st.st_mtime_ns}\0{entry_st.st_size}\n".encode('utf-8', 'surrogatepass'))
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return digest.hexdigest()
+
+class CacheEntry:
+    __slots__ = ('result', 'states', 'size', 'digest')
+
+    def __init__(self, result, states, size, digest):
+        self.result = result
+        self.states = states
+        self.size = size
+        self.digest = digest
+
+class ToolResultCache:
+    """
+    Result cache for one chat session; safe to use from the tool scheduler's threads.
+    `turn` is set by LLMProcessor so markers can name the turn a result was sent in.
+    """
+
+    def __init__(self, max_bytes=None, dir_max_entries=None):
+        self.max_bytes = max_bytes or P10Config.TOOL_CACHE_MAX_BYTES
+        self.dir_max_entries = dir_max_entries or P10Config.TOOL_CACHE_DIR_MAX_ENTRIES
+        self.turn = 0
+        self.stats = {'hits': 0, 'misses': 0, 'unchanged': 0, 'evictions': 0, 'chars_saved': 0}
+        self._entries = OrderedDict() # key -> CacheEntry, least recently used first
+        self._bytes = 0
+        self._sent = {} # key -> (digest, turn) of results already in the context
+        self._lock = threading.Lock()
+
+    def new_context(self):
+        """Called when the message history is rebuilt or compacted; earlier results are no longer in the context."""
+        with self._lock:
+            self._sent.clear()
+
+    def run(self, name, args, execute):
+        """Returns the result of execute() for a read-only call, from the cache when still valid."""
+        paths = call_paths(args)
+        if not paths:
+            # Nothing to validate against (time, registry state, network...)
+            return execute()
+        key = name + '\0' + json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+        # Taken before running the tool: a change made while it runs invalidates the entry
+        states = {path: _path_state(path, self.dir_max_entries) for path in paths}
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.states == states:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+            else:
+                entry = None
+                self.stats['misses'] += 1
+
+        if entry is None:
+            result = execute()
+            text = str(result)
+            entry = CacheEntry(result, states, len(text), hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest())
+            if None not in states.values() and not text.startswith('Error'):
+                self._store(key, entry)
+
+        with self._lock:
+            sent = self._sent.get(key)
+            if sent is not None and sent[0] == entry.digest:
+                self.stats['unchanged'] += 1
+                self.stats['chars_saved'] += entry.size
+                return f"[Unchanged since turn {sent[1]}: same result as the earlier {name} call with these arguments.]"
+            self._sent[key] = (entry.digest, self.turn)
+        return entry.result
+
+    def _store(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats['evictions'] += 1
+
+    def invalidate(self, paths=None):
+        """
+        Drops entries that read any of `paths` or a path below them (all entries when None).
+        Called after write tools, whose changes may fall inside one mtime tick.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if paths is None or any(_overlaps(cached, path) for cached in entry.states for path in paths):
+                    del self._entries[key]
+                    self._bytes -= entry.size
+                    self._sent.pop(key, None)
+
+def _overlaps(a, b):
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+# One cache per session id, most recently used last
+_session_caches = OrderedDict()
+_session_lock = threading.Lock()
+
+def get_session_cache(session_id=None):
+    """The cache for a chat session; a new one for every call without a session id."""
+    if not session_id:
+        return ToolResultCache()
+    with _session_lock:
+        cache = _session_caches.pop(session_id, None) or ToolResultCache()
+        _session_caches[session_id] = cache
+        while len(_session_caches) > P10Config.TOOL_CACHE_MAX_SESSIONS:
+            _session_caches.popitem(last=False)
+        return cache
@@ -0,0 +1,73 @@
+"""
+Snapshot of the tool registry in tools_manifest.json next to tools.py.
+
+The Electron main process serves ai:get-tools and ai:get-all-tools from this
+file (re-read when it changes) instead of asking the backend, so listing the
+tools never waits for a Python process. The backend rewrites it after every
+command that changed the registry (save_tool, delete_tool, visibility,
+create_tool during a chat, ...). It is written to a temporary file and
+renamed, so readers see either the old or the new manifest. `revision` is a
+hash of the contents and changes only when they do.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+from configs.P10_config import P10Config
+from tools import get_tools_definitions
+
+MANIFEST_FORMAT = 1
+
+_lock = threading.Lock()
+_written = (None, None) # (path, registry version) of the last manifest written by this process
+_revisions = {} # path -> revision of the last manifest written by this process
+
+def manifest_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), P10Config.TOOL_MANIFEST_NAME)
+
+def build_manifest():
+    """The manifest of the current registry: get_tools payloads plus code hashes, and its revision."""
+    tools = []
+    for tool in P10Config.TOOLS.get_all_tools().values():
+        tool["code_hash"] = hashlib.sha256(tool["code"].encode('utf-8', 'surrogatepass')).hexdigest() if tool["code"] else None
+        tools.append(tool)
+    contents = {"definitions": get_tools_definitions(), "tools": tools}
+    revision = hashlib.sha256(json.dumps(contents, sort_keys=True, ensure_ascii=False).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return dict(format=MANIFEST_FORMAT, revision=revision, generated=datetime.now().isoformat(), **contents)
+
+def write_tool_manifest(path=None, force=False):
+    """
+    Writes the manifest unless the registry has not changed since this process last wrote it.
+    Returns True when the file was written.
+    """
+    global _written
+    path = path or manifest_path()
+    with _lock:
+        version = P10Config.TOOLS.version
+        if not force and _written == (path, version):
+            return False
+        manifest = build_manifest()
+        _written = (path, version)
+        # A change that was undone (hide, then show) leaves the file as it is
+        if not force and _revisions.get(path) == manifest["revision"]:
+            return False
+        directory = os.path.dirname(path)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tools_manifest-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            # Electron then asks the backend for the tools
+            sys.stderr.write(f"[DEBUG] Tool manifest not written: {e}\n")
+            return False
+        _revisions[path] = manifest["revision"]
+        return True
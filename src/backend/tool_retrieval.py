@@ -0,0 +1,127 @@
+"""
+Query-aware selection of the tools sent to the LLM.
+
+Generated tools accumulate in the tool store, and listing every one of them in
+every prompt makes the tool definitions dominate the input tokens. Once more
+than TOOL_RETRIEVAL_MIN_TOOLS tools are visible, only the pinned core tools
+and the TOOL_RETRIEVAL_TOP_K tools ranked highest against the query are sent.
+Ranking is BM25 over tool names, descriptions and parameter names, with the
+index built once per tool registry version. The other tools stay callable;
+the model finds them with the search_tools tool.
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter
+
+from configs.P10_config import P10Config
+from tools import get_tools_definitions
+
+# Words of a snake_case / camelCase identifier or of free text; CJK characters count as one word each
+WORD_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|[\u3400-\u9fff]')
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'given', 'if', 'in', 'into', 'is', 'it',
+    'of', 'on', 'or', 'the', 'this', 'to', 'with', 'args', 'returns', 'example', 'str', 'int', 'bool', 'list', 'dict'
+))
+
+# Field weights: a query word matching the tool name counts more than one in its description
+NAME_WEIGHT = 3
+PARAMETER_WEIGHT = 2
+
+def tokenize(text):
+    words = []
+    for word in WORD_RE.findall(text or ''):
+        word = word.lower()
+        if word in STOP_WORDS:
+            continue
+        # Crude plural folding so "files" finds read_file
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+class ToolIndex:
+    """BM25 index over tool definitions (as returned by get_tools_definitions)."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, definitions):
+        self.definitions = {d['name']: d for d in definitions}
+        self._names = []
+        self._lengths = []
+        self._postings = {} # word -> [(document number, term frequency)]
+        for definition in definitions:
+            terms = Counter(tokenize(definition['description']))
+            for word in tokenize(definition['name']):
+                terms[word] += NAME_WEIGHT
+            for parameter in definition['parameters']['properties']:
+                for word in tokenize(parameter):
+                    terms[word] += PARAMETER_WEIGHT
+            doc = len(self._names)
+            self._names.append(definition['name'])
+            self._lengths.append(sum(terms.values()))
+            for word, count in terms.items():
+                self._postings.setdefault(word, []).append((doc, count))
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+
+    def search(self, query, limit=None):
+        """Tool names ranked by relevance to `query`, best first; tools matching no query word are left out."""
+        scores = Counter()
+        documents = len(self._names)
+        for word in set(tokenize(query)):
+            postings = self._postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, count in postings:
+                norm = self.K1 * (1 - self.B + self.B * self._lengths[doc] / self._average_length)
+                scores[doc] += idf * count * (self.K1 + 1) / (count + norm)
+        # Ties keep the (name sorted) registry order, so the same query always selects the same tools
+        ranked = sorted(scores, key=lambda doc: (-scores[doc], doc))
+        return [self._names[doc] for doc in ranked[:limit]]
+
+# (registry version, ToolIndex) of the visible tools
+_index = (None, None)
+_index_lock = threading.Lock()
+
+def get_tool_index():
+    global _index
+    version = P10Config.TOOLS.version
+    with _index_lock:
+        if _index[0] != version:
+            _index = (version, ToolIndex(get_tools_definitions()))
+        return _index[1]
+
+def select_tools(query, top_k=None, min_tools=None):
+    """
+    Names of the tools to list in the prompt for `query`: the visible pinned tools plus the
+    top_k best matches. Returns None when there are few enough tools to send all of them.
+    """
+    index = get_tool_index()
+    min_tools = P10Config.TOOL_RETRIEVAL_MIN_TOOLS if min_tools is None else min_tools
+    if len(index.definitions) <= min_tools:
+        return None
+    top_k = P10Config.TOOL_RETRIEVAL_TOP_K if top_k is None else top_k
+    pinned = [name for name in P10Config.TOOL_RETRIEVAL_PINNED if name in index.definitions]
+    return frozenset(pinned + index.search(query, top_k))
+
+def search_tool_definitions(query, limit=5):
+    """Result of the search_tools tool: definitions of the best matching visible tools, as JSON."""
+    index = get_tool_index()
+    names = index.search(query, max(1, min(int(limit), 20)))
+    if not names:
+        return f"No tools match '{query}'. Try other words, or create the tool with create_tool."
+    return json.dumps(
+        [{key: index.definitions[name][key] for key in ('name', 'description', 'parameters')} for name in names],
+        ensure_ascii=False
+    )
+
+def tools_in_search_result(result):
+    """Names of the tools listed in a search_tools result (empty when it found none)."""
+    try:
+        found = json.loads(result)
+    except (TypeError, ValueError):
+        return set()
+    return {d['name'] for d in found if isinstance(d, dict) and isinstance(d.get('name'), str)} if isinstance(found, list) else set()
@@ -0,0 +1,83 @@
+"""
+Concurrent execution of the tool calls of one LLM turn.
+
+Calls are submitted in the order the model wrote them and start as soon as they
+are submitted (LLMProcessor submits each <tool> block when it closes). Read-only
+tools (P5-P7) run in parallel. A call waits for earlier calls it conflicts with:
+    - a P8+ tool and another call touching the same path (writes to a path,
+      and reads after a write, keep the emitted order)
+    - two P8+ tools where either has no path argument (unknown side effects)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from configs.P10_config import P10Config
+from tool_cache import call_paths
+from tools import PermissionLevel
+
+
+class ToolCall:
+    def __init__(self, index, name, args, error=None):
+        self.index = index
+        self.name = name
+        self.args = args
+        self.error = error # set when the call could not be parsed; returned as its output
+        tool = P10Config.TOOLS.get_tool(name) if name else None
+        self.is_write = tool is not None and tool.permission_level >= PermissionLevel.P8
+        self.paths = call_paths(args)
+
+    def conflicts_with(self, other):
+        if not (self.is_write or other.is_write):
+            return False
+        if self.paths & other.paths:
+            return True
+        return self.is_write and other.is_write and (not self.paths or not other.paths)
+
+
+class ToolScheduler:
+    """
+    Runs the tool calls of one turn on a thread pool.
+    `execute(name, _cancelled=..., **args)` runs a single tool (normally tools.execute_tool);
+    `_cancelled()` turns True once `cancel_event` is set or the scheduler is shut down.
+    """
+
+    def __init__(self, execute, max_workers=None, cancel_event=None):
+        self._execute = execute
+        self._cancel_event = cancel_event
+        self._shutdown = threading.Event()
+        self.calls = [] # (ToolCall, Future) in emitted order
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or P10Config.TOOL_WORKERS,
+            thread_name_prefix='tool'
+        )
+
+    def submit(self, name, args, error=None):
+        call = ToolCall(len(self.calls), name, args, error)
+        # Earlier calls were queued first, so they are already running or done when this one starts waiting
+        dependencies = [future for earlier, future in self.calls if earlier.conflicts_with(call)]
+        future = self._executor.submit(self._run, call, dependencies)
+        self.calls.append((call, future))
+        return call
+
+    def _run(self, call, dependencies):
+        if dependencies:
+            wait(dependencies)
+        if call.error:
+            return call.error
+        try:
+            return self._execute(call.name, _cancelled=self.cancelled, **call.args)
+        except Exception as e:
+            return f"Error executing tool {call.name}: {str(e)}"
+
+    def cancelled(self):
+        return self._shutdown.is_set() or (self._cancel_event is not None and self._cancel_event.is_set())
+
+    def results(self):
+        """Yields (call, result) in emitted order, each as soon as it is available."""
+        for call, future in self.calls:
+            yield call, future.result()
+
+    def shutdown(self):
+        """Drops calls that have not started; calls running in worker processes are stopped, others finish in the background."""
+        self._shutdown.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,330 @@
+"""
+Compiles tool functions into the JSON schemas sent to the LLM.
+
+Parameter types come from the annotations (Optional, Union, List[T], Dict,
+Literal and Enum included), or from the `name (type):` entries of the
+docstring when a parameter is not annotated. The Google-style `Args:` section
+gives each parameter its description and the text before the first section
+becomes the tool description; both are capped (TOOL_DESCRIPTION_MAX_CHARS,
+TOOL_PARAM_DESCRIPTION_MAX_CHARS). The compact rendering is minified with
+sorted keys, and schema_tokens() estimates what each tool adds to the prompt.
+
+A ToolPlan holds the compiled schema of one registered tool together with the
+pydantic TypeAdapters that coerce and validate the arguments of its calls.
+Both are built lazily on purpose and kept until the tool is registered again:
+the schema when it is first needed (it is usually cached, see tool_bytecode.py)
+and the adapters on the tool's first call, so that loading the registry neither
+runs the code of lazily loaded tools nor imports pydantic. Arguments of
+annotations pydantic cannot handle are passed through unvalidated, and
+arguments the tool does not take are dropped with a warning.
+"""
+import enum
+import inspect
+import json
+import re
+import sys
+import types
+import typing
+
+from configs.P10_config import P10Config
+from context_manager import estimate_tokens
+
+# Bump when compile_tool_schema() output changes, so cached schemas (tool_bytecode.py) are rebuilt
+SCHEMA_VERSION = 1
+
+# Google-style section headers; only Args and Returns are used
+SECTION_RE = re.compile(r'^(Args|Arguments|Parameters|Params|Returns|Return|Yields|Raises|Examples?|Notes?|Usage)\s*:\s*$', re.IGNORECASE)
+# "name (type): description" or "name: description"
+ARG_RE = re.compile(r'^\*{0,2}(\w+)\s*(?:\(([^)]*)\))?\s*:\s*(.*)$')
+
+JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", tuple: "array", set: "array", dict: "object"}
+# Type names as written in docstrings
+DOC_TYPES = {
+    'str': "string", 'string': "string", 'int': "integer", 'integer': "integer", 'float': "number", 'number': "number",
+    'bool': "boolean", 'boolean': "boolean", 'list': "array", 'array': "array", 'tuple': "array", 'dict': "object", 'object': "object"
+}
+
+def parse_docstring(doc):
+    """
+    Splits a Google-style docstring into (summary, {parameter: description}, {parameter: type}, returns),
+    whitespace collapsed. Parameter descriptions include their continuation lines.
+    """
+    lines = inspect.cleandoc(doc or '').splitlines()
+    summary, returns = [], []
+    params, param_types = {}, {}
+    section = None
+    current = None
+    item_indent = None
+    for line in lines:
+        stripped = line.strip()
+        header = SECTION_RE.match(stripped)
+        if header and len(line) == len(line.lstrip()):
+            section = header.group(1).lower()
+            current = item_indent = None
+            continue
+        if section is None:
+            summary.append(stripped)
+        elif section in ('args', 'arguments', 'parameters', 'params') and stripped:
+            indent = len(line) - len(line.lstrip())
+            match = ARG_RE.match(stripped)
+            if match and (item_indent is None or indent <= item_indent):
+                item_indent = indent
+                current = match.group(1)
+                params[current] = match.group(3).strip()
+                if match.group(2):
+                    param_types[current] = match.group(2).strip()
+            elif current is not None:
+                params[current] = f"{params[current]} {stripped}".strip()
+        elif section in ('returns', 'return'):
+            returns.append(stripped)
+    return _collapse(' '.join(summary)), params, param_types, _collapse(' '.join(returns))
+
+def _collapse(text):
+    return ' '.join(text.split())
+
+def _cap(text, max_chars):
+    """`text` cut at a word boundary to at most max_chars (0 disables the cap)."""
+    if not max_chars or len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,.;:') + '…'
+
+def annotation_schema(annotation):
+    """JSON schema for a parameter annotation; {} when it does not constrain the value."""
+    if annotation is inspect.Parameter.empty or annotation is typing.Any:
+        return {}
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        options = [annotation_schema(a) for a in args if a is not type(None)]
+        if len(options) == 1:
+            return options[0]
+        return {"anyOf": options} if all(options) else {}
+    if origin is typing.Literal:
+        schema = {"enum": list(args)}
+        value_types = {JSON_TYPES.get(type(a)) for a in args}
+        if len(value_types) == 1 and None not in value_types:
+            schema["type"] = value_types.pop()
+        return schema
+    if origin in (list, tuple, set, frozenset) or annotation in (list, tuple, set):
+        schema = {"type": "array"}
+        if args and args[0] is not Ellipsis:
+            items = annotation_schema(args[0])
+            if items:
+                schema["items"] = items
+        return schema
+    if origin is dict or annotation is dict:
+        return {"type": "object"}
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        values = [member.value for member in annotation]
+        schema = {"enum": values}
+        value_types = {JSON_TYPES.get(type(v)) for v in values}
+        if len(value_types) == 1 and None not in value_types:
+            schema["type"] = value_types.pop()
+        return schema
+    if annotation in JSON_TYPES:
+        return {"type": JSON_TYPES[annotation]}
+    return {}
+
+def doc_type_schema(doc_type):
+    """JSON schema for a docstring type such as "str", "int, optional" or "List[str]"."""
+    words = re.findall(r'[A-Za-z]+', (doc_type or '').lower())
+    words = [w for w in words if w not in ('optional', 'typing')]
+    if not words or words[0] not in DOC_TYPES:
+        return {}
+    schema = {"type": DOC_TYPES[words[0]]}
+    if schema["type"] == "array" and len(words) > 1 and words[1] in DOC_TYPES:
+        schema["items"] = {"type": DOC_TYPES[words[1]]}
+    return schema
+
+def _type_hints(func):
+    try:
+        return typing.get_type_hints(func)
+    except Exception:
+        # Unresolvable forward references: use the annotations that are already objects
+        return {name: a for name, a in getattr(func, '__annotations__', {}).items() if not isinstance(a, str)}
+
+def compile_tool_schema(name, description, func, max_description=None, max_param_description=None, signature=None, hints=None):
+    """The {"name", "description", "parameters"} definition of a tool."""
+    max_description = P10Config.TOOL_DESCRIPTION_MAX_CHARS if max_description is None else max_description
+    max_param_description = P10Config.TOOL_PARAM_DESCRIPTION_MAX_CHARS if max_param_description is None else max_param_description
+
+    summary, param_docs, param_types, returns = parse_docstring(description)
+    hints = _type_hints(func) if hints is None else hints
+    properties = {}
+    required = []
+    for param_name, param in (signature or inspect.signature(func)).parameters.items():
+        if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        schema = annotation_schema(hints.get(param_name, inspect.Parameter.empty)) or doc_type_schema(param_types.get(param_name))
+        schema = dict(schema) or {"type": "string"}
+        if param_docs.get(param_name):
+            schema["description"] = _cap(param_docs[param_name], max_param_description)
+        if param.default is inspect.Parameter.empty:
+            required.append(param_name)
+        elif isinstance(param.default, enum.Enum):
+            schema["default"] = param.default.value
+        elif isinstance(param.default, (str, int, float, bool)):
+            schema["default"] = param.default
+        properties[param_name] = schema
+
+    text = summary or _collapse(description or '')
+    if returns:
+        text = f"{text} Returns: {returns}"
+    return {
+        "name": name,
+        "description": _cap(text, max_description),
+        "parameters": {"type": "object", "properties": properties, "required": required}
+    }
+
+def compact_json(definitions):
+    """
+    The definitions as the LLM sees them: only the fields it uses, keys sorted, no whitespace.
+    Identical registries always give identical bytes, so the prompt prefix stays cacheable.
+    """
+    return json.dumps(
+        [{"name": d["name"], "description": d["description"], "parameters": d["parameters"]} for d in definitions],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False
+    )
+
+def schema_tokens(definition):
+    """Estimated prompt tokens the definition adds to the tools list."""
+    return estimate_tokens(compact_json([definition])) - 1
+
+def _heuristic_value(value):
+    """Guessed type of a string passed to an unannotated parameter: JSON list/object, integer or boolean."""
+    text = value.strip()
+    if (text.startswith('[') and text.endswith(']')) or (text.startswith('{') and text.endswith('}')):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    if text.lstrip('-').isdigit():
+        return int(text)
+    if text.lower() in ('true', 'false'):
+        return text.lower() == 'true'
+    return value
+
+def _preview(value, max_chars=200):
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    return text if len(text) <= max_chars else text[:max_chars] + '...'
+
+class ToolArgumentError(ValueError):
+    """Arguments of a tool call that do not match its signature; `errors` lists every problem found."""
+
+    def __init__(self, tool_name, errors, parameters):
+        self.tool_name = tool_name
+        self.errors = errors
+        self.parameters = parameters
+        super().__init__(f"Invalid arguments for tool {tool_name}")
+
+    def to_result(self):
+        """The tool result returned to the model: all problems at once, with the expected parameters."""
+        details = json.dumps({"errors": self.errors, "parameters": self.parameters}, ensure_ascii=False, separators=(',', ':'))
+        return (f"Error: Invalid arguments for tool '{self.tool_name}' ({len(self.errors)} problem(s)). "
+                f"Fix all of them and call the tool again.\n{details}")
+
+class ToolPlan:
+    """
+    The signature of a tool compiled once: its schema for the LLM and the
+    coercion of call arguments (strings from the model become ints, lists...).
+    """
+
+    def __init__(self, name, description, func):
+        self.name = name
+        self.func = func
+        try:
+            self._signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            self._signature = inspect.Signature()
+        self._hints = _type_hints(func)
+        self.schema = compile_tool_schema(name, description, func, signature=self._signature, hints=self._hints)
+        self._parameters = {
+            param_name: param for param_name, param in self._signature.parameters.items()
+            if param.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+        }
+        self._var_keyword = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in self._signature.parameters.values())
+        self._adapters = None # parameter name -> TypeAdapter, or None when not validated; built on the first call
+
+    def _build_adapters(self):
+        # Imported here: listing tools never needs pydantic
+        from pydantic import ConfigDict, TypeAdapter
+        adapters = {}
+        for param_name in self._parameters:
+            annotation = self._hints.get(param_name)
+            if annotation is None or annotation is typing.Any:
+                adapters[param_name] = None
+                continue
+            try:
+                # Lax mode: "5" -> 5, "true" -> True; numbers are accepted for str parameters
+                adapters[param_name] = TypeAdapter(annotation, config=ConfigDict(coerce_numbers_to_str=True))
+            except Exception:
+                try:
+                    adapters[param_name] = TypeAdapter(annotation)
+                except Exception:
+                    # Types pydantic cannot validate are passed through unchanged
+                    adapters[param_name] = None
+        self._adapters = adapters
+        return adapters
+
+    def coerce(self, args):
+        """
+        Returns the keyword arguments to call the tool with, converted to the annotated types.
+        Unknown arguments are dropped (unless the tool takes **kwargs).
+        Raises ToolArgumentError listing every missing or invalid argument.
+        """
+        from pydantic import ValidationError
+        adapters = self._adapters if self._adapters is not None else self._build_adapters()
+        kwargs = {}
+        errors = []
+        for param_name, value in args.items():
+            param = self._parameters.get(param_name)
+            if param is None:
+                if self._var_keyword:
+                    kwargs[param_name] = value
+                else:
+                    # Models add stray arguments now and then; the call still runs without them
+                    sys.stderr.write(f"Warning: Ignoring unknown argument '{param_name}' for tool {self.name}\n")
+                continue
+            adapter = adapters.get(param_name)
+            if adapter is None:
+                # Unannotated parameters keep the old guessing; other unvalidated types pass through
+                kwargs[param_name] = _heuristic_value(value) if isinstance(value, str) and param_name not in self._hints else value
+                continue
+            if value is None and param.default is None:
+                kwargs[param_name] = None
+                continue
+            try:
+                kwargs[param_name] = adapter.validate_python(value)
+            except ValidationError as e:
+                # Lists and objects often arrive as JSON text
+                if isinstance(value, str) and value.strip()[:1] in ('[', '{'):
+                    try:
+                        kwargs[param_name] = adapter.validate_json(value)
+                        continue
+                    except ValidationError as json_error:
+                        e = json_error
+                problems = []
+                for error in e.errors(include_url=False):
+                    where = '.'.join(str(part) for part in error.get('loc', ()))
+                    problems.append(f"{error['msg']} (at {where})" if where else error['msg'])
+                errors.append({
+                    "argument": param_name,
+                    "problem": "; ".join(problems[:5]),
+                    "expected": self._expected(param_name),
+                    "received": _preview(value)
+                })
+        for param_name in self.schema["parameters"]["required"]:
+            if param_name not in args:
+                errors.append({"argument": param_name, "problem": "missing required argument", "expected": self._expected(param_name)})
+        if errors:
+            raise ToolArgumentError(self.name, errors, self.schema["parameters"])
+        return kwargs
+
+    def _expected(self, param_name):
+        """The schema of a parameter without its description, e.g. {"type": "array", "items": {"type": "integer"}}."""
+        schema = self.schema["parameters"]["properties"].get(param_name, {})
+        return {key: value for key, value in schema.items() if key != "description"}
@@ -0,0 +1,198 @@
+"""
+Persistent tools in tools.db (SQLite, WAL mode) next to tools.json.
+
+Saving, deleting or hiding a tool used to read the whole of tools.json or
+tools_config.json, change one entry and rewrite the file, so every write cost
+O(total tools) and two backend processes writing at once lost one update.
+Each tool is now one row, its visibility a column of that row, and every
+write is a single upsert/update in its own transaction; SQLite's locking
+keeps writers from different processes apart while readers see a consistent
+snapshot. Visibility of tools that are not stored here (temporary tools) is
+kept in the visibility table.
+
+tools.json and tools_config.json are imported on first open, and again when
+either file changes (e.g. an update ships new or changed built-in tools).
+Built-in tools (is_gen false) are upserted by name and keep their stored
+visibility; generated tools are only added when missing. Tools deleted by the
+user are recorded in the deleted table and are not imported again; saving a
+tool of that name clears the record.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from configs.P10_config import P10Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tools (
+    name TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    func TEXT NOT NULL,
+    permission_level INTEGER NOT NULL,
+    is_visible INTEGER NOT NULL DEFAULT 1,
+    is_gen INTEGER NOT NULL DEFAULT 0,
+    tool_type TEXT NOT NULL DEFAULT 'general',
+    metadata TEXT NOT NULL DEFAULT '{}', -- JSON object
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS visibility (
+    name TEXT PRIMARY KEY,
+    is_visible INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deleted (
+    name TEXT PRIMARY KEY,
+    deleted REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+COLUMNS = ('name', 'description', 'func', 'permission_level', 'is_visible', 'is_gen', 'tool_type', 'metadata')
+
+def _file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def _record(row):
+    """A row of the tools table as a tools.json record."""
+    record = dict(zip(COLUMNS, row))
+    record['is_visible'] = bool(record['is_visible'])
+    record['is_gen'] = bool(record['is_gen'])
+    try:
+        record['metadata'] = json.loads(record['metadata'])
+    except ValueError:
+        record['metadata'] = {}
+    return record
+
+class ToolStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Shared by the worker threads of --serve mode; every use holds self._lock
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def records(self):
+        """Every stored tool as a tools.json record, in the order they were first saved."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM tools ORDER BY rowid").fetchall()
+        return [_record(row) for row in rows]
+
+    def visibility(self):
+        """Visibility of the tools that are not stored here: {name: is_visible}."""
+        with self._lock:
+            return {name: bool(visible) for name, visible in self._conn.execute("SELECT name, is_visible FROM visibility")}
+
+    def save(self, record):
+        """Inserts or replaces a tool; a replaced tool keeps its visibility. Returns whether it is visible."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                """INSERT INTO tools (name, description, func, permission_level, is_visible, is_gen, tool_type, metadata, updated)
+                   VALUES (?, ?, ?, ?, COALESCE((SELECT is_visible FROM visibility WHERE name = ?), ?), ?, ?, ?, ?)
+                   ON CONFLICT (name) DO UPDATE SET
+                       description = excluded.description, func = excluded.func,
+                       permission_level = excluded.permission_level, is_gen = excluded.is_gen,
+                       tool_type = excluded.tool_type, metadata = excluded.metadata, updated = excluded.updated""",
+                (record['name'], record['description'], record['func'], record['permission_level'], record['name'],
+                 int(record.get('is_visible', True)), int(record.get('is_gen', False)), record.get('tool_type', 'general'),
+                 json.dumps(record.get('metadata') or {}, ensure_ascii=False), time.time())
+            )
+            # The tool's own row holds its visibility from now on
+            self._conn.execute("DELETE FROM visibility WHERE name = ?", (record['name'],))
+            self._conn.execute("DELETE FROM deleted WHERE name = ?", (record['name'],))
+            row = self._conn.execute("SELECT is_visible FROM tools WHERE name = ?", (record['name'],)).fetchone()
+        return bool(row[0])
+
+    def delete(self, name):
+        """Deletes a tool; it is not imported from tools.json again. Returns whether it was stored."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("INSERT OR REPLACE INTO deleted (name, deleted) VALUES (?, ?)", (name, time.time()))
+            return self._conn.execute("DELETE FROM tools WHERE name = ?", (name,)).rowcount > 0
+
+    def set_visibility(self, name, is_visible):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            updated = self._conn.execute("UPDATE tools SET is_visible = ? WHERE name = ?", (int(is_visible), name)).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO visibility (name, is_visible) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET is_visible = excluded.is_visible",
+                    (name, int(is_visible))
+                )
+
+    def import_json(self, json_path, config_path=None):
+        """
+        Imports tools.json and the visibility in tools_config.json, unless the same files were
+        imported before. Built-in tools are inserted or updated (keeping their visibility),
+        generated tools only inserted; deleted tools are skipped. Returns the number of tools
+        added or updated.
+        """
+        json_hash = _file_hash(json_path)
+        config_hash = _file_hash(config_path) if config_path else None
+        with self._lock, self._conn:
+            # One process imports; the others wait for it and then find the hashes stored
+            self._conn.execute("BEGIN IMMEDIATE")
+            imported = dict(self._conn.execute("SELECT key, value FROM meta WHERE key IN ('tools_json', 'tools_config')"))
+            added = 0
+            if json_hash and imported.get('tools_json') != json_hash:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    tools_data = json.load(f)
+                deleted = {name for (name,) in self._conn.execute("SELECT name FROM deleted")}
+                now = time.time()
+                for record in tools_data.values():
+                    if record['name'] in deleted:
+                        continue
+                    is_gen = bool(record.get('is_gen', False))
+                    # A changed built-in replaces the stored one; stored generated tools are left as they are
+                    on_conflict = "NOTHING" if is_gen else """UPDATE SET
+                               description = excluded.description, func = excluded.func,
+                               permission_level = excluded.permission_level, is_gen = excluded.is_gen,
+                               tool_type = excluded.tool_type, metadata = excluded.metadata, updated = excluded.updated
+                           WHERE (tools.description, tools.func, tools.permission_level, tools.is_gen, tools.tool_type, tools.metadata)
+                               IS NOT (excluded.description, excluded.func, excluded.permission_level, excluded.is_gen, excluded.tool_type, excluded.metadata)"""
+                    added += self._conn.execute(
+                        f"""INSERT INTO tools (name, description, func, permission_level, is_visible, is_gen, tool_type, metadata, updated)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                           ON CONFLICT (name) DO {on_conflict}""",
+                        (record['name'], record.get('description') or '', record.get('func') or '', record.get('permission_level', 9),
+                         int(record.get('is_visible', True)), int(is_gen), record.get('tool_type', 'general'),
+                         json.dumps(record.get('metadata') or {}, ensure_ascii=False), now)
+                    ).rowcount
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tools_json', ?)", (json_hash,))
+            if config_hash and imported.get('tools_config') != config_hash:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                for name, visible in config.get('visibility', {}).items():
+                    if not self._conn.execute("UPDATE tools SET is_visible = ? WHERE name = ?", (int(visible), name)).rowcount:
+                        self._conn.execute("INSERT OR REPLACE INTO visibility (name, is_visible) VALUES (?, ?)", (name, int(visible)))
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tools_config', ?)", (config_hash,))
+        return added
+
+# One store per path
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_tool_store(path=None):
+    """The ToolStore at `path` (default TOOL_STORE_NAME next to tools.py), or None if it cannot be opened."""
+    path = os.path.abspath(path or os.path.join(os.path.dirname(__file__), P10Config.TOOL_STORE_NAME))
+    with _stores_lock:
+        if path not in _stores:
+            try:
+                _stores[path] = ToolStore(path)
+            except (OSError, sqlite3.Error) as e:
+                sys.stderr.write(f"Warning: Could not open tool store {path}: {e}\n")
+                return None
+        return _stores[path]
@@ -0,0 +1,269 @@
+"""
+Worker processes for generated tools.
+
+Generated and temporary tools used to run on a thread of the backend process
+that streams the LLM response. A CPU-bound tool held the GIL, one stuck on
+I/O could not be stopped, and stopping the chat meant killing the backend.
+They now run in a small pool of worker processes, forked from a forkserver
+that has already imported tools.py (spawned on Windows). Every call has:
+    - a wall-clock timeout (TOOL_TIMEOUT_SECONDS); the worker is killed when it expires
+    - a CPU time limit (TOOL_CPU_SECONDS, RLIMIT_CPU) and an address space limit
+      (TOOL_MEMORY_MB, RLIMIT_AS) where the resource module exists
+    - cancellation: the worker is killed when the chat is stopped or the turn is abandoned
+A killed worker is replaced on the next call; the backend and its warm state stay.
+Results of TOOL_SHARED_MEMORY_MIN_CHARS characters or more come back through
+shared memory; only its name goes through the pipe.
+"""
+import atexit
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+from configs.P10_config import P10Config
+
+try:
+    import resource
+except ImportError:
+    # Windows: only the wall-clock timeout applies
+    resource = None
+
+# How often a waiting call checks for cancellation, in seconds
+POLL_INTERVAL = 0.05
+
+def _set_cpu_limit(seconds):
+    """Lets the worker use `seconds` more CPU time; past that the kernel ends it with SIGXCPU."""
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + seconds)
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def _set_memory_limit(megabytes):
+    if resource is None or not megabytes or not hasattr(resource, 'RLIMIT_AS'):
+        return
+    hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+    soft = megabytes * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    except (ValueError, OSError) as e:
+        sys.stderr.write(f"[DEBUG] Tool worker memory limit not set: {e}\n")
+
+def _reply(result, shared_min_chars):
+    """The message sending a tool's result back; large text goes into a shared memory block."""
+    if isinstance(result, str) and shared_min_chars and len(result) >= shared_min_chars:
+        data = result.encode('utf-8', 'surrogatepass')
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[:len(data)] = data
+        block.close()
+        # The backend unlinks it after reading
+        return ('shared', block.name, len(data))
+    return ('result', result)
+
+def _worker_main(conn, memory_mb):
+    """Runs tool calls sent by ToolWorkerPool until the pipe is closed."""
+    # stdout carries the backend's protocol; tool output goes to stderr like the backend's debug lines
+    sys.stdout = sys.stderr
+    try:
+        os.dup2(sys.stderr.fileno(), 1)
+    except (OSError, ValueError):
+        pass
+    if hasattr(signal, 'SIGINT'):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _set_memory_limit(memory_mb)
+    import tools
+    functions = {} # (name, code) -> bound function
+
+    while True:
+        try:
+            name, code, kwargs, cwd, llm_config, limits = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            if cwd and os.getcwd() != cwd:
+                os.chdir(cwd)
+            tools.set_llm_config(llm_config)
+            func = functions.get((name, code))
+            if func is None:
+                func = functions[(name, code)] = tools._bind_tool_code(name, code)
+            _set_cpu_limit(limits['cpu_seconds'])
+            reply = _reply(func(**kwargs), limits['shared_min_chars'])
+        except Exception as e:
+            reply = ('error', str(e) or type(e).__name__)
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            return
+        except Exception:
+            # A result that cannot be pickled goes back as text, like any other tool output
+            conn.send(_reply(str(reply[1]), limits['shared_min_chars']))
+
+def _context():
+    """Forkserver where available: workers fork from a process that imported tools.py but started no threads."""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['tools'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+class ToolWorker:
+    def __init__(self, context, memory_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_mb), name='wand-tool-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+class ToolWorkerPool:
+    """Up to `size` worker processes; a call waits for an idle one when all are busy."""
+
+    def __init__(self, size=None):
+        self.size = size or P10Config.TOOL_PROCESS_WORKERS
+        self._context = None
+        self._idle = []
+        self._count = 0 # idle and busy workers
+        self._available = threading.Condition()
+        self._closed = False
+
+    def _start_worker(self):
+        if self._context is None:
+            self._context = _context()
+        # The address space limit is set once per worker, the others with every call
+        return ToolWorker(self._context, P10Config.TOOL_MEMORY_MB)
+
+    def prestart(self, count=1):
+        """Starts up to `count` idle workers ahead of the first call (the first also starts the forkserver)."""
+        for _ in range(count):
+            with self._available:
+                if self._closed or self._count >= self.size:
+                    return
+                self._count += 1
+            try:
+                worker = self._start_worker()
+            except Exception:
+                self._release(None)
+                raise
+            self._release(worker)
+
+    def _acquire(self, cancelled):
+        with self._available:
+            while not self._idle and self._count >= self.size:
+                if cancelled is not None and cancelled():
+                    return None
+                self._available.wait(POLL_INTERVAL)
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+        try:
+            return self._start_worker()
+        except Exception:
+            self._release(None)
+            raise
+
+    def _release(self, worker):
+        """Returns a worker to the pool; None drops a killed (or never started) one."""
+        with self._available:
+            if worker is None or self._closed:
+                self._count -= 1
+                if worker is not None:
+                    worker.kill()
+            else:
+                self._idle.append(worker)
+            self._available.notify()
+
+    def run(self, name, code, kwargs, cancelled=None, timeout=None, cwd=None, llm_config=None):
+        """
+        Runs the tool `name` defined by `code` in a worker and returns its result.
+        `cancelled` is a callable polled while waiting; the call is abandoned (and the worker
+        killed) once it returns True. The tool runs in `cwd` with tools.LLM_CONFIG set to
+        `llm_config`; callers pass the ones of their chat, the defaults are this process's.
+        Failures come back as "Error: ..." strings.
+        """
+        timeout = timeout or P10Config.TOOL_TIMEOUT_SECONDS
+        if llm_config is None:
+            from tools import LLM_CONFIG as llm_config
+        cwd = cwd or os.getcwd()
+        worker = self._acquire(cancelled)
+        if worker is None:
+            return f"Error: Tool {name} was cancelled."
+        try:
+            limits = {'cpu_seconds': P10Config.TOOL_CPU_SECONDS, 'shared_min_chars': P10Config.TOOL_SHARED_MEMORY_MIN_CHARS}
+            worker.conn.send((name, code, kwargs, cwd, llm_config, limits))
+        except (EOFError, OSError):
+            # The worker died while idle; the next call starts a new one
+            worker.kill()
+            self._release(None)
+            return self._exit_message(name, worker.process.exitcode)
+        except Exception as e:
+            # Arguments that cannot be pickled
+            self._release(worker)
+            return f"Error executing tool {name}: {str(e)}"
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while not worker.conn.poll(POLL_INTERVAL):
+            if cancelled is not None and cancelled():
+                worker.kill()
+                self._release(None)
+                return f"Error: Tool {name} was cancelled."
+            if deadline is not None and time.monotonic() > deadline:
+                worker.kill()
+                self._release(None)
+                return f"Error: Tool {name} did not finish within {timeout} seconds and was stopped."
+
+        try:
+            reply = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.kill()
+            self._release(None)
+            return self._exit_message(name, worker.process.exitcode)
+        self._release(worker)
+
+        if reply[0] == 'shared':
+            block = shared_memory.SharedMemory(name=reply[1])
+            try:
+                return bytes(block.buf[:reply[2]]).decode('utf-8', 'surrogatepass')
+            finally:
+                block.close()
+                block.unlink()
+        if reply[0] == 'error':
+            return f"Error executing tool {name}: {reply[1]}"
+        return reply[1]
+
+    def _exit_message(self, name, exitcode):
+        if hasattr(signal, 'SIGXCPU') and exitcode == -signal.SIGXCPU:
+            return f"Error: Tool {name} used more than {P10Config.TOOL_CPU_SECONDS} seconds of CPU time and was stopped."
+        if exitcode == -getattr(signal, 'SIGKILL', 9):
+            return f"Error: Tool {name} was killed (it may have run out of memory)."
+        return f"Error: Tool {name} crashed (worker exit code {exitcode})."
+
+    def shutdown(self):
+        with self._available:
+            self._closed = True
+            workers, self._idle = self._idle, []
+            self._count -= len(workers)
+        for worker in workers:
+            worker.kill()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_tool_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ToolWorkerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
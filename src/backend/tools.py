@@ -5,9 +5,22 @@ import inspect
 import hashlib
 import re
 import concurrent.futures
+import threading
 from datetime import datetime
-from api_client import chat_completion
 from configs.P10_config import P10Config
+from tool_cache import call_paths
+from tool_schema import SCHEMA_VERSION, ToolArgumentError, ToolPlan, schema_tokens
+from tool_bytecode import BytecodeCache, load_code
+from tool_store import open_tool_store
+
+# Tool code in tools.json runs in this module's globals and expects `chat_completion`
+# and `concurrent.futures` to be available. chat_completion imports the OpenAI SDK on
+# first use so that commands which never call a tool (get_tools, delete_tool, ...) skip it.
+
+def chat_completion(*args, **kwargs):
+    """Proxy for api_client.chat_completion that imports the OpenAI SDK on first call."""
+    from api_client import chat_completion as _chat_completion
+    return _chat_completion(*args, **kwargs)
 
 # --- Registry ---
 
@@ -29,16 +42,52 @@ class PermissionLevel:
     P10 = 10
 
 class Tool:
-    def __init__(self, name, description, func, permission_level=PermissionLevel.P5, code=None, **kwargs):
+    """
+    A registered tool. Tools registered from a cached descriptor (see load_tools_from_json) start
+    with func=None and only their schema (a dict or JSON text); `loader` compiles and binds the
+    function on first use.
+    """
+    def __init__(self, name, description, func, permission_level=PermissionLevel.P5, code=None, schema=None, loader=None, **kwargs):
         self.name = name
         self.description = description
-        self.func = func
+        self._func = func
+        self._schema = schema
+        self._loader = loader
+        self._load_lock = threading.Lock()
         self.permission_level = permission_level
         self.is_visible = True
         self.is_gen = kwargs.get('is_gen', False)
         self.tool_type = kwargs.get('tool_type', 'general')
         self.code = code
         self.metadata = kwargs
+        self._plan = None
+
+    @property
+    def func(self):
+        if self._func is None and self._loader is not None:
+            with self._load_lock:
+                if self._func is None:
+                    self._func = self._loader()
+        return self._func
+
+    @property
+    def is_loaded(self):
+        return self._func is not None
+
+    @property
+    def schema(self):
+        """The {"name", "description", "parameters"} definition, without loading the function when it was precomputed."""
+        if self._schema is None:
+            return self.plan.schema
+        # Precomputed schemas are kept as JSON text, much smaller than the parsed dicts
+        return json.loads(self._schema) if isinstance(self._schema, str) else self._schema
+
+    @property
+    def plan(self):
+        """Compiled schema and argument coercion (tool_schema.ToolPlan), built on first use."""
+        if self._plan is None:
+            self._plan = ToolPlan(self.name, self.description, self.func)
+        return self._plan
 
     def run(self, **kwargs):
         return self.func(**kwargs)
@@ -46,26 +95,38 @@ class Tool:
 class ToolRegistry:
     def __init__(self):
         self._registry = {}
+        # Incremented on every change that can alter the tool definitions sent to the LLM
+        self.version = 0
 
     def register(self, tool):
+        # A re-registered tool compiles its signature again
+        tool._plan = None
         self._registry[tool.name] = tool
+        self.version += 1
+
+    def unregister(self, name):
+        if self._registry.pop(name, None) is not None:
+            self.version += 1
 
     def get_all_tools(self):
         """Returns a dictionary of all tools with their metadata."""
         return {name: {"name": t.name, "description": t.description, "is_visible": t.is_visible, "permission_level": t.permission_level, "is_gen": t.is_gen, "tool_type": t.tool_type, "code": t.code, "metadata": t.metadata} 
-                for name, t in self._registry.items()}
+                for name, t in list(self._registry.items())}
 
     def get_visible_tools(self):
         """Returns a dictionary of visible tools mapping name to Tool object."""
-        return {name: tool for name, tool in self._registry.items() if tool.is_visible}
+        return {name: tool for name, tool in list(self._registry.items()) if tool.is_visible}
 
     def set_visibility(self, name, is_visible):
-        if name in self._registry:
-            self._registry[name].is_visible = is_visible
+        tool = self._registry.get(name)
+        if tool is not None and tool.is_visible != is_visible:
+            tool.is_visible = is_visible
+            self.version += 1
 
     def set_all_visible(self):
         for tool in self._registry.values():
             tool.is_visible = True
+        self.version += 1
 
     def get_tool(self, name):
         return self._registry.get(name)
@@ -78,48 +139,42 @@ P10Config.TOOLS = ToolRegistry()
 
 LLM_CONFIG = {}
 TOOLS_TMP_FILE = os.path.join(os.path.dirname(__file__), 'tools_tmp.py')
+TOOLS_JSON_FILE = os.path.join(os.path.dirname(__file__), 'tools.json')
 TOOLS_CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'tools_config.json')
 
+# Names of tools registered from tools_tmp.py or create_tool in this process.
+# A long-lived backend (cli.py --serve) must drop them when the chat is reset.
+TEMP_TOOL_NAMES = set()
+
 def load_tool_config():
-    """Loads tool configuration (visibility) from disk."""
-    if os.path.exists(TOOLS_CONFIG_FILE):
-        try:
-            with open(TOOLS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                for name, visible in config.get('visibility', {}).items():
-                    P10Config.TOOLS.set_visibility(name, visible)
-        except Exception as e:
-            sys.stderr.write(f"Warning: Error loading tool config: {e}\n")
+    """Applies the stored visibility of tools that are not in the tool store (e.g. temporary tools)."""
+    store = open_tool_store()
+    if store is None:
+        return
+    try:
+        for name, visible in store.visibility().items():
+            P10Config.TOOLS.set_visibility(name, visible)
+    except Exception as e:
+        sys.stderr.write(f"Warning: Error loading tool config: {e}\n")
 
 def update_tool_visibility_config(name, is_visible):
-    """Updates the visibility of a tool and saves to disk."""
+    """Updates the visibility of a tool and saves it to the tool store."""
     # Update in memory
     P10Config.TOOLS.set_visibility(name, is_visible)
-    
+
     # Update on disk
-    config = {}
-    if os.path.exists(TOOLS_CONFIG_FILE):
-        try:
-            with open(TOOLS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-        except:
-            pass
-    
-    if 'visibility' not in config:
-        config['visibility'] = {}
-    
-    config['visibility'][name] = is_visible
-    
+    store = open_tool_store()
+    if store is None:
+        return "Error saving config: tool store unavailable"
     try:
-        with open(TOOLS_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
+        store.set_visibility(name, is_visible)
         return "Success"
     except Exception as e:
         return f"Error saving config: {str(e)}"
 
 def save_tool(name: str, code: str, description: str, permission_level: int = 9, tool_type: str = "general", is_gen: bool = True, metadata: dict = None):
     """
-    Permanently saves a tool to tools.json.
+    Permanently saves a tool to the tool store (tool_store.py).
     
     Args:
         name: The name of the tool function.
@@ -130,8 +185,6 @@ def save_tool(name: str, code: str, description: str, permission_level: int = 9,
         is_gen: Whether the tool is generated (default True).
         metadata: Additional metadata (default None).
     """
-    json_path = os.path.join(os.path.dirname(__file__), 'tools.json')
-    
     if metadata is None:
         metadata = {}
     
@@ -151,58 +204,48 @@ def save_tool(name: str, code: str, description: str, permission_level: int = 9,
     clean_lines = [line for line in lines if not line.strip().startswith('@register_tool')]
     clean_code = '\n'.join(clean_lines).strip()
 
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            tools_data = json.load(f)
-    except Exception:
-        tools_data = {}
-        
-    # Preserve existing visibility if possible, else default to True
-    existing_visibility = True
-    if name in tools_data:
-        existing_visibility = tools_data[name].get("is_visible", True)
-
-    tools_data[name] = {
+    record = {
         "name": name,
         "description": description,
         "func": clean_code,
         "permission_level": permission_level,
-        "is_visible": existing_visibility,
+        "is_visible": True,
         "is_gen": is_gen,
         "tool_type": tool_type,
         "metadata": metadata
     }
-    
+
+    store = open_tool_store()
+    if store is None:
+        return "Error saving tool: tool store unavailable"
     try:
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(tools_data, f, indent=2, ensure_ascii=False)
-        return f"Tool '{name}' has been permanently saved to tools.json."
+        # An existing tool keeps its visibility
+        record["is_visible"] = store.save(record)
     except Exception as e:
         return f"Error saving tool: {str(e)}"
 
+    # Keep the in-memory registry in sync for long-lived backends
+    if _register_tool_from_record(record):
+        TEMP_TOOL_NAMES.discard(name)
+
+    return f"Tool '{name}' has been permanently saved."
+
 def delete_tool(name: str):
     """
-    Permanently deletes a tool from tools.json and the registry.
+    Permanently deletes a tool from the tool store and the registry.
     """
-    json_path = os.path.join(os.path.dirname(__file__), 'tools.json')
-    
-    # 1. Remove from tools.json
+    # 1. Remove from the tool store
+    store = open_tool_store()
+    if store is None:
+        return "Error deleting tool from disk: tool store unavailable"
     try:
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                tools_data = json.load(f)
-            
-            if name in tools_data:
-                del tools_data[name]
-                
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(tools_data, f, indent=2, ensure_ascii=False)
+        store.delete(name)
     except Exception as e:
         return f"Error deleting tool from disk: {str(e)}"
 
     # 2. Remove from registry
-    if name in P10Config.TOOLS._registry:
-        del P10Config.TOOLS._registry[name]
+    P10Config.TOOLS.unregister(name)
+    TEMP_TOOL_NAMES.discard(name)
         
     return f"Tool '{name}' has been deleted."
 
@@ -211,7 +254,11 @@ def set_llm_config(config):
     LLM_CONFIG = config
 
 def clear_temporary_tools():
-    """Clears the temporary tools file."""
+    """Clears the temporary tools file and unregisters temporary tools from memory."""
+    for name in list(TEMP_TOOL_NAMES):
+        P10Config.TOOLS.unregister(name)
+    TEMP_TOOL_NAMES.clear()
+
     try:
         with open(TOOLS_TMP_FILE, 'w', encoding='utf-8') as f:
             f.write("from tools import register_tool\n\n# Temporary tools file. Cleared on new chat.\n")
@@ -233,6 +280,8 @@ def register_tool(func=None, permission_level=PermissionLevel.P5, **kwargs):
             code = None
         tool = Tool(name, description, f, permission_level=permission_level, code=code, **kwargs)
         P10Config.TOOLS.register(tool)
+        if f.__module__ == 'tools_tmp':
+            TEMP_TOOL_NAMES.add(name)
         return f
 
     if func is None:
@@ -240,132 +289,63 @@ def register_tool(func=None, permission_level=PermissionLevel.P5, **kwargs):
     else:
         return _register(func)
 
+# (registry version, definitions) of the last get_tools_definitions() call
+_definitions_cache = (None, [])
+
 def get_tools_definitions():
-    """Returns a list of tool definitions for the LLM."""
+    """Returns a list of tool definitions for the LLM, sorted by name. Rebuilt only when the registry version changes."""
+    global _definitions_cache
+    # Read before building: a change made meanwhile leaves the cache stale and is rebuilt next call
+    version = P10Config.TOOLS.version
+    if _definitions_cache[0] != version:
+        _definitions_cache = (version, _build_tools_definitions())
+    return list(_definitions_cache[1])
+
+def _build_tools_definitions():
     definitions = []
-    for name, tool in P10Config.TOOLS.get_visible_tools().items():
-        doc = tool.description
-        # Use the underlying function for signature inspection
-        sig = inspect.signature(tool.func)
-        params = {}
-        required = []
-        for param_name, param in sig.parameters.items():
-            param_type = "string"
-            if param.annotation == int:
-                param_type = "integer"
-            elif param.annotation == bool:
-                param_type = "boolean"
-            elif param.annotation == list:
-                param_type = "array"
-            elif param.annotation == dict:
-                param_type = "object"
-            
-            params[param_name] = {
-                "type": param_type,
-                "description": f"Parameter {param_name}"
-            }
-            if param.default == inspect.Parameter.empty:
-                required.append(param_name)
-        
-        definitions.append({
-            "name": name,
-            "description": doc.strip(),
-            "parameters": {
-                "type": "object",
-                "properties": params,
-                "required": required
-            },
-            "is_visible": tool.is_visible, # Include visibility in definition for UI
-            "tool_type": tool.tool_type
-        })
+    for name, tool in sorted(P10Config.TOOLS.get_visible_tools().items()):
+        definition = dict(tool.schema)
+        definition["tokens"] = schema_tokens(definition) # what the tool adds to the prompt
+        definition["is_visible"] = tool.is_visible # Include visibility in definition for UI
+        definition["tool_type"] = tool.tool_type
+        definitions.append(definition)
     return definitions
 
-def _convert_tool_arguments(func, kwargs):
+def _runs_in_worker(tool):
+    """Generated and temporary tools run in tool_workers processes; built-in tools need this process's state."""
+    return P10Config.TOOL_PROCESS_POOL and bool(tool.code) and (tool.is_gen or tool.name in TEMP_TOOL_NAMES)
+
+def _run_tool(tool, kwargs, cancelled=None, cwd=None, llm_config=None):
+    if not _runs_in_worker(tool):
+        return tool.run(**kwargs)
+    from tool_workers import get_tool_pool
+    return get_tool_pool().run(tool.name, tool.code, kwargs, cancelled, cwd=cwd, llm_config=llm_config)
+
+def execute_tool(_tool_name, _cache=None, _cancelled=None, _cwd=None, _llm_config=None, **kwargs):
     """
-    Pre-processes arguments by converting types based on function signature or heuristics.
+    Executes a registered tool.
+    With a tool_cache.ToolResultCache, read-only (P5-P7) results are memoized for the
+    session and P8+ tools invalidate the entries for the paths they touch.
+    `_cancelled` (a callable) stops a tool running in a worker process once it returns True.
+    `_cwd` and `_llm_config` are the working directory and LLM_CONFIG of a tool running in a
+    worker process (by default those of this process when the call is sent).
     """
-    try:
-        sig = inspect.signature(func)
-    except ValueError:
-        return kwargs
-
-    new_kwargs = kwargs.copy()
-    
-    for param_name, value in new_kwargs.items():
-        if param_name in sig.parameters:
-            param = sig.parameters[param_name]
-            annotation = param.annotation
-            
-            # Only attempt conversion if the value is a string
-            if isinstance(value, str):
-                converted = False
-                
-                # 1. Try explicit type hints
-                if annotation != inspect.Parameter.empty:
-                    try:
-                        # Handle basic types and typing.List/Dict
-                        is_list_or_dict = (annotation == list or annotation == dict)
-                        # Check for generic types like List[int]
-                        if not is_list_or_dict and hasattr(annotation, '__origin__'):
-                            is_list_or_dict = annotation.__origin__ in (list, dict)
-                        
-                        if is_list_or_dict:
-                            new_kwargs[param_name] = json.loads(value)
-                            converted = True
-                        elif annotation == int:
-                            new_kwargs[param_name] = int(value)
-                            converted = True
-                        elif annotation == float:
-                            new_kwargs[param_name] = float(value)
-                            converted = True
-                        elif annotation == bool:
-                            if value.lower() == 'true': 
-                                new_kwargs[param_name] = True
-                                converted = True
-                            elif value.lower() == 'false': 
-                                new_kwargs[param_name] = False
-                                converted = True
-                    except:
-                        pass
-                
-                # 2. Heuristic fallback if no type hint or conversion didn't happen
-                if not converted and annotation == inspect.Parameter.empty:
-                    val_str = value.strip()
-                    # Try JSON (List/Dict)
-                    if (val_str.startswith('[') and val_str.endswith(']')) or \
-                       (val_str.startswith('{') and val_str.endswith('}')):
-                        try:
-                            new_kwargs[param_name] = json.loads(val_str)
-                            continue
-                        except:
-                            pass
-                    
-                    # Try Int
-                    if val_str.lstrip('-').isdigit():
-                        try:
-                            new_kwargs[param_name] = int(val_str)
-                            continue
-                        except:
-                            pass
-                            
-                    # Try Bool
-                    if val_str.lower() == 'true':
-                        new_kwargs[param_name] = True
-                        continue
-                    elif val_str.lower() == 'false':
-                        new_kwargs[param_name] = False
-                        continue
-                        
-    return new_kwargs
-
-def execute_tool(_tool_name, **kwargs):
-    """Executes a registered tool."""
     tool = P10Config.TOOLS.get_tool(_tool_name)
     if tool and tool.is_visible:
         try:
-            # Pre-process arguments
-            converted_kwargs = _convert_tool_arguments(tool.func, kwargs)
-            return tool.run(**converted_kwargs)
+            # Convert the model's arguments to the annotated types (plan compiled once per registration)
+            try:
+                converted_kwargs = tool.plan.coerce(kwargs)
+            except ToolArgumentError as e:
+                return e.to_result()
+            if _cache is None:
+                return _run_tool(tool, converted_kwargs, _cancelled, _cwd, _llm_config)
+            if tool.permission_level <= PermissionLevel.P7:
+                return _cache.run(_tool_name, converted_kwargs, lambda: _run_tool(tool, converted_kwargs, _cancelled, _cwd, _llm_config))
+            try:
+                return _run_tool(tool, converted_kwargs, _cancelled, _cwd, _llm_config)
+            finally:
+                _cache.invalidate(call_paths(converted_kwargs) or None)
         except Exception as e:
             return f"Error executing tool {_tool_name}: {str(e)}"
     return f"Tool {_tool_name} not found or disabled."
@@ -409,6 +389,7 @@ def _register_tool_memory(name: str, code: str, description: str):
     try:
         # 1. Execute in current globals to register it in memory (for immediate use)
         exec(code, globals())
+        TEMP_TOOL_NAMES.add(name)
         
         # 2. Append to tools_tmp.py (for persistence across turns in same session)
         try:
@@ -427,6 +408,8 @@ def _register_tool_memory(name: str, code: str, description: str):
         tool = P10Config.TOOLS.get_tool(name)
         sig = "(...)"
         if tool:
+            # Source of exec'd code is not retrievable; worker processes need it
+            tool.code = tool.code or code
             try:
                 sig = str(inspect.signature(tool.func))
             except:
@@ -448,9 +431,93 @@ def _register_tool_memory(name: str, code: str, description: str):
     
 # --- Built-in Tools ---
 
-def load_tools_from_json():
-    """Loads tools from tools.json and registers them."""
-    json_path = os.path.join(os.path.dirname(__file__), 'tools.json')
+def _bind_tool_code(tool_name, func_code, bytecode=None, code_data=None):
+    """
+    Executes a tool's source in this module's globals and returns its function. The code comes
+    from a BytecodeCache, from `code_data` (its marshalled code) or is compiled from the source.
+    """
+    code = bytecode.compile(tool_name, func_code) if bytecode is not None else load_code(tool_name, func_code, code_data)
+    # Execute in globals() so functions are available in module scope
+    exec(code, globals())
+    # In our generated JSON, the function name matches the key.
+    func_obj = globals().get(tool_name)
+    if not func_obj or not callable(func_obj):
+        raise NameError(f"Function {tool_name} not found after execution.")
+    return func_obj
+
+def _schema_key(tool_info):
+    """Everything the compiled schema of a tools.json record depends on."""
+    return (tool_info['name'], tool_info['func'], tool_info.get('description') or '', str(SCHEMA_VERSION),
+            str(P10Config.TOOL_DESCRIPTION_MAX_CHARS), str(P10Config.TOOL_PARAM_DESCRIPTION_MAX_CHARS))
+
+def _register_tool_from_record(tool_info, bytecode=None, lazy=False):
+    """
+    Executes a stored tool record (the tools.json format) and registers it.
+    With a tool_bytecode.BytecodeCache the compiled code is reused across starts, and with
+    `lazy` a tool whose schema is cached is registered without running its code until first use.
+    Returns True if the tool was registered.
+    """
+    tool_name = tool_info.get('name')
+
+    func_code = tool_info.get('func')
+    if not func_code or not func_code.strip():
+        sys.stderr.write(f"Warning: No code for tool {tool_name}\n")
+        return False
+
+    schema = None
+    func_obj = None
+    code_data = None
+    if lazy and bytecode is not None:
+        schema = bytecode.get_schema(*_schema_key(tool_info))
+        if schema is not None:
+            # Only this tool's marshalled code is kept for its first call, not the whole cache
+            code_data = bytecode.code_data(tool_name, func_code)
+
+    if schema is None:
+        # 1. Execute the function code
+        try:
+            func_obj = _bind_tool_code(tool_name, func_code, bytecode)
+        except Exception as e:
+            sys.stderr.write(f"Error executing code for tool {tool_name}: {e}\n")
+            return False
+
+    # 2. Register the tool
+    tool = Tool(
+        name=tool_info['name'],
+        description=tool_info['description'],
+        func=func_obj,
+        permission_level=tool_info['permission_level'],
+        is_gen=tool_info.get('is_gen', False),
+        tool_type=tool_info.get('tool_type', 'general'),
+        code=func_code,
+        schema=schema,
+        loader=(lambda: _bind_tool_code(tool_name, func_code, code_data=code_data)) if func_obj is None else None,
+        **tool_info.get('metadata', {})
+    )
+    tool.is_visible = tool_info.get('is_visible', True)
+
+    if bytecode is not None and schema is None:
+        # Later starts register this tool from the cached schema
+        bytecode.put_schema(tool.schema, *_schema_key(tool_info))
+
+    P10Config.TOOLS.register(tool)
+    return True
+
+def _register_records(records, cache_path):
+    """Registers tool records; `cache_path` names the tool_bytecode cache next to where they are stored."""
+    bytecode = BytecodeCache(cache_path) if P10Config.TOOL_BYTECODE_CACHE else None
+    for tool_info in records:
+        _register_tool_from_record(tool_info, bytecode, lazy=P10Config.TOOL_LAZY_LOADING)
+    if bytecode is not None:
+        bytecode.save()
+    return bytecode
+
+def load_tools_from_json(json_path=None):
+    """
+    Loads tools from tools.json (or `json_path`) and registers them. Tools seen by an earlier start
+    are registered from their cached schema and compiled when first called (TOOL_LAZY_LOADING).
+    """
+    json_path = json_path or TOOLS_JSON_FILE
     if not os.path.exists(json_path):
         sys.stderr.write(f"Warning: {json_path} not found.\n")
         return
@@ -458,51 +525,29 @@ def load_tools_from_json():
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
             tools_data = json.load(f)
-
-        for tool_name, tool_info in tools_data.items():
-            # 1. Execute the function code
-            func_code = tool_info.get('func')
-            if not func_code or not func_code.strip():
-                sys.stderr.write(f"Warning: No code for tool {tool_name}\n")
-                continue
-            
-            try:
-                # Execute in globals() so functions are available in module scope
-                exec(func_code, globals())
-            except Exception as e:
-                sys.stderr.write(f"Error executing code for tool {tool_name}: {e}\n")
-                continue
-            
-            # 2. Get the function object
-            # We assume the function name in code matches the tool name or is the only function defined
-            # But for simplicity, let's assume the function name is the same as tool_name
-            # or we can parse it from the code if needed.
-            # In our generated JSON, the function name matches the key.
-            
-            func_obj = globals().get(tool_name)
-            if not func_obj or not callable(func_obj):
-                sys.stderr.write(f"Error: Function {tool_name} not found after execution.\n")
-                continue
-
-            # 3. Register the tool
-            tool = Tool(
-                name=tool_info['name'],
-                description=tool_info['description'],
-                func=func_obj,
-                permission_level=tool_info['permission_level'],
-                is_gen=tool_info.get('is_gen', False),
-                tool_type=tool_info.get('tool_type', 'general'),
-                code=func_code,
-                **tool_info.get('metadata', {})
-            )
-            tool.is_visible = tool_info.get('is_visible', True)
-            
-            P10Config.TOOLS.register(tool)
-            
     except Exception as e:
         sys.stderr.write(f"Error loading tools from JSON: {e}\n")
+        return
+    return _register_records(tools_data.values(), json_path)
+
+def load_tools():
+    """
+    Loads the tools in the tool store, importing tools.json and tools_config.json first when they
+    changed. Without a usable store the tools are read from tools.json (saving them then fails).
+    """
+    store = open_tool_store()
+    if store is None:
+        return load_tools_from_json()
+    try:
+        if os.path.exists(TOOLS_JSON_FILE):
+            store.import_json(TOOLS_JSON_FILE, TOOLS_CONFIG_FILE if os.path.exists(TOOLS_CONFIG_FILE) else None)
+        records = store.records()
+    except Exception as e:
+        sys.stderr.write(f"Error loading tools from the tool store: {e}\n")
+        return load_tools_from_json()
+    return _register_records(records, store.path)
 
-# Load tools from JSON at startup
-load_tools_from_json()
+# Load the stored tools at startup
+load_tools()
 # Load visibility overrides
-load_tool_config()
\ No newline at end of file
+load_tool_config()
@@ -1,14 +1,32 @@
 import { ipcMain } from 'electron';
 import { spawn, ChildProcess } from 'child_process';
+import fs from 'fs';
 import path from 'path';
 
+interface PendingRequest {
+  onMessage?: (message: any) => void;
+  resolve: (message: any) => void;
+  reject: (error: Error) => void;
+  lastMessage: any;
+}
+
 // This simulates the AI service that would connect to OpenAI/Anthropic/Local LLMs
 export class AIService {
-  private currentProcess: ChildProcess | null = null;
+  // Long-lived Python backend (cli.py --serve); all requests share its stdin/stdout
+  private backendProcess: ChildProcess | null = null;
+  private backendBuffer = '';
+  private pendingRequests = new Map<number, PendingRequest>();
+  private nextRequestId = 1;
+  private currentChatId: number | null = null;
+  // Parsed tools_manifest.json (written by the backend, see tool_manifest.py); null when it must be re-read
+  private toolManifest: any = null;
+  private manifestWatcher: fs.FSWatcher | null = null;
 
   constructor() {
     this.setupHandlers();
+    this.watchToolManifest();
     // Clear temporary tools on startup to ensure a fresh state
+    // (this also starts the backend process so the first real request is warm)
     this.clearTempTools().catch(err => {
       console.error('Failed to clear temporary tools on startup:', err);
     });
@@ -31,15 +49,57 @@ export class AIService {
     return path.join(process.resourcesPath, 'python_env', 'python.exe');
   }
 
+  private getToolManifestPath() {
+    return path.join(path.dirname(this.getBackendScriptPath()), 'tools_manifest.json');
+  }
+
+  // The backend replaces the manifest by renaming a new file over it, so the directory is watched
+  private watchToolManifest() {
+    const manifestPath = this.getToolManifestPath();
+    try {
+      this.manifestWatcher = fs.watch(path.dirname(manifestPath), (eventType, filename) => {
+        if (!filename || filename === path.basename(manifestPath)) {
+          this.toolManifest = null;
+        }
+      });
+      this.manifestWatcher.on('error', () => {
+        this.manifestWatcher = null;
+        this.toolManifest = null;
+      });
+    } catch (err) {
+      // Without a watcher the manifest is re-read on every request
+      this.manifestWatcher = null;
+    }
+  }
+
+  // The tool manifest, or null if the backend has not written a readable one yet
+  private async readToolManifest(): Promise<any> {
+    if (this.toolManifest) {
+      return this.toolManifest;
+    }
+    try {
+      const manifest = JSON.parse(await fs.promises.readFile(this.getToolManifestPath(), 'utf8'));
+      if (manifest.format !== 1 || !Array.isArray(manifest.definitions) || !Array.isArray(manifest.tools)) {
+        return null;
+      }
+      if (this.manifestWatcher) {
+        this.toolManifest = manifest;
+      }
+      return manifest;
+    } catch (err) {
+      return null;
+    }
+  }
+
   private setupHandlers() {
-    ipcMain.on('ai:chat-stream', (event, { message, history, config }) => {
-      this.processMessageStream(event, message, history, config);
+    ipcMain.on('ai:chat-stream', (event, { message, config }) => {
+      this.processMessageStream(event, message, config);
     });
 
     ipcMain.on('ai:chat-stop', (event) => {
-      if (this.currentProcess) {
-        this.currentProcess.kill();
-        this.currentProcess = null;
+      if (this.currentChatId !== null) {
+        this.cancelRequest(this.currentChatId);
+        this.currentChatId = null;
         event.reply('ai:chat-done'); // Notify frontend that it's done (stopped)
       }
     });
@@ -73,293 +133,184 @@ export class AIService {
     });
   }
 
-  private updateToolVisibility(name: string, visible: boolean): Promise<any> {
-    return new Promise((resolve, reject) => {
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
+  // Start the backend if it is not running yet
+  private ensureBackend(): ChildProcess {
+    if (this.backendProcess) {
+      return this.backendProcess;
+    }
 
-      const inputData = JSON.stringify({ 
-        type: 'update_tool_visibility', 
-        name, 
-        visible 
-      });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
-
-      let outputData = '';
-      pythonProcess.stdout.on('data', (data) => { outputData += data.toString(); });
-      
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}`));
-        } else {
-          try {
-            resolve(JSON.parse(outputData));
-          } catch (e) {
-            reject(new Error(`Failed to parse output: ${outputData}`));
-          }
-        }
-      });
-    });
-  }
+    const pythonProcess = spawn(this.getPythonPath(), [this.getBackendScriptPath(), '--serve']);
+    this.backendProcess = pythonProcess;
+    this.backendBuffer = '';
 
-  private saveTool(name: string, code: string, description: string, permission_level?: number, tool_type?: string, is_gen?: boolean, metadata?: any): Promise<any> {
-    return new Promise((resolve, reject) => {
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
+    // setEncoding keeps multi-byte characters intact across data events
+    pythonProcess.stdout!.setEncoding('utf8');
+    pythonProcess.stdout!.on('data', (data: string) => this.handleBackendOutput(data));
 
-      const inputData = JSON.stringify({ 
-        type: 'save_tool', 
-        config: {}, 
-        tool_data: { name, code, description, permission_level, tool_type, is_gen, metadata } 
-      });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
-
-      let outputData = '';
-      pythonProcess.stdout.on('data', (data) => { outputData += data.toString(); });
-      
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}`));
-        } else {
-          try {
-            resolve(JSON.parse(outputData));
-          } catch (e) {
-            reject(new Error(`Failed to parse output: ${outputData}`));
-          }
-        }
-      });
+    pythonProcess.stderr!.on('data', (data) => {
+      console.error('Python stderr:', data.toString());
     });
-  }
 
-  private deleteTool(name: string): Promise<any> {
-    return new Promise((resolve, reject) => {
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
+    const onExit = (reason: string) => {
+      if (this.backendProcess === pythonProcess) {
+        this.backendProcess = null;
+      }
+      // The next request will start a fresh backend
+      const pending = Array.from(this.pendingRequests.values());
+      this.pendingRequests.clear();
+      for (const request of pending) {
+        request.reject(new Error(reason));
+      }
+    };
 
-      const inputData = JSON.stringify({ 
-        type: 'delete_tool', 
-        name 
-      });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
-
-      let outputData = '';
-      pythonProcess.stdout.on('data', (data) => { outputData += data.toString(); });
-      
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}`));
-        } else {
-          try {
-            resolve(JSON.parse(outputData));
-          } catch (e) {
-            reject(new Error(`Failed to parse output: ${outputData}`));
-          }
-        }
-      });
-    });
-  }
+    pythonProcess.on('close', (code) => onExit(`Python backend exited with code ${code}`));
+    pythonProcess.on('error', (err) => onExit(`Failed to start Python process: ${err.message}`));
 
-  private clearTempTools(): Promise<any> {
-    return new Promise((resolve, reject) => {
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
-
-      const inputData = JSON.stringify({ type: 'clear_temp_tools', config: {} });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
-
-      let outputData = '';
-      pythonProcess.stdout.on('data', (data) => { outputData += data.toString(); });
-      
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}`));
-        } else {
-          resolve(JSON.parse(outputData));
-        }
-      });
-    });
+    return pythonProcess;
   }
 
-  private getTools(config: any): Promise<any> {
-    return new Promise((resolve, reject) => {
-      console.log('Fetching tools via Python CLI');
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
-
-      const inputData = JSON.stringify({ type: 'get_tools', config });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
-
-      let outputData = '';
-      let errorData = '';
+  private handleBackendOutput(data: string) {
+    this.backendBuffer += data;
+    const lines = this.backendBuffer.split('\n');
+    this.backendBuffer = lines.pop() || '';
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch (e) {
+        console.error('Failed to parse Python output line:', line);
+        continue;
+      }
 
-      pythonProcess.stdout.on('data', (data) => {
-        outputData += data.toString();
-      });
+      const request = this.pendingRequests.get(message.id);
+      if (!request) continue;
 
-      pythonProcess.stderr.on('data', (data) => {
-        errorData += data.toString();
-      });
+      if (message.done) {
+        this.pendingRequests.delete(message.id);
+        request.resolve(request.lastMessage);
+        continue;
+      }
 
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}: ${errorData}`));
-          return;
-        }
-        try {
-          const result = JSON.parse(outputData);
-          if (result.error) {
-            reject(new Error(result.error));
-          } else {
-            resolve(result.tools);
-          }
-        } catch (e) {
-          reject(new Error(`Failed to parse Python output: ${outputData}`));
-        }
-      });
-    });
+      request.lastMessage = message;
+      request.onMessage?.(message);
+    }
   }
 
-  private getAllTools(config: any): Promise<any> {
+  // Send one request to the backend; resolves with the last message before 'done'
+  private sendRequest(payload: any, onMessage?: (message: any) => void, requestId = this.nextRequestId++): Promise<any> {
     return new Promise((resolve, reject) => {
-      console.log('Fetching all tools via Python CLI');
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
-
-      const inputData = JSON.stringify({ type: 'get_all_tools', config });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
-
-      let outputData = '';
-      let errorData = '';
+      const pythonProcess = this.ensureBackend();
+      this.pendingRequests.set(requestId, { onMessage, resolve, reject, lastMessage: null });
+      pythonProcess.stdin!.write(JSON.stringify({ ...payload, id: requestId }) + '\n');
+    });
+  }
 
-      pythonProcess.stdout.on('data', (data) => {
-        outputData += data.toString();
-      });
+  private cancelRequest(requestId: number) {
+    if (this.backendProcess && this.pendingRequests.has(requestId)) {
+      this.backendProcess.stdin!.write(JSON.stringify({ type: 'cancel', target: requestId, id: this.nextRequestId++ }) + '\n');
+    }
+  }
 
-      pythonProcess.stderr.on('data', (data) => {
-        errorData += data.toString();
-      });
+  private async sendCommand(payload: any, resultKey: string): Promise<any> {
+    const result = await this.sendRequest(payload);
+    if (!result) {
+      throw new Error('Python backend returned no output');
+    }
+    if (result.error) {
+      throw new Error(result.error);
+    }
+    return result[resultKey];
+  }
 
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}: ${errorData}`));
-          return;
-        }
-        try {
-          const result = JSON.parse(outputData);
-          if (result.error) {
-            reject(new Error(result.error));
-          } else {
-            resolve(result.tools);
-          }
-        } catch (e) {
-          reject(new Error(`Failed to parse Python output: ${outputData}`));
-        }
-      });
+  // Commands that change the registry; the backend rewrites the manifest before answering,
+  // and the cached copy is dropped here too in case the watcher has not fired yet
+  private sendToolCommand(payload: any): Promise<any> {
+    return this.sendRequest(payload).finally(() => {
+      this.toolManifest = null;
     });
   }
 
-  private fetchModels(config: any): Promise<any> {
-    return new Promise((resolve, reject) => {
-      console.log('Fetching models via Python CLI');
-      const scriptPath = this.getBackendScriptPath();
-      const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
-
-      const inputData = JSON.stringify({ type: 'fetch_models', config });
-      pythonProcess.stdin.write(inputData);
-      pythonProcess.stdin.end();
+  private updateToolVisibility(name: string, visible: boolean): Promise<any> {
+    return this.sendToolCommand({ type: 'update_tool_visibility', name, visible });
+  }
 
-      let outputData = '';
-      let errorData = '';
+  private saveTool(name: string, code: string, description: string, permission_level?: number, tool_type?: string, is_gen?: boolean, metadata?: any): Promise<any> {
+    return this.sendToolCommand({
+      type: 'save_tool',
+      config: {},
+      tool_data: { name, code, description, permission_level, tool_type, is_gen, metadata }
+    });
+  }
 
-      pythonProcess.stdout.on('data', (data) => {
-        outputData += data.toString();
-      });
+  private deleteTool(name: string): Promise<any> {
+    return this.sendToolCommand({ type: 'delete_tool', name });
+  }
 
-      pythonProcess.stderr.on('data', (data) => {
-        errorData += data.toString();
-      });
+  private clearTempTools(): Promise<any> {
+    return this.sendToolCommand({ type: 'clear_temp_tools', config: {} });
+  }
 
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Python script exited with code ${code}: ${errorData}`));
-          return;
-        }
-        try {
-          const result = JSON.parse(outputData);
-          if (result.error) {
-            reject(new Error(result.error));
-          } else {
-            resolve(result.models);
-          }
-        } catch (e) {
-          reject(new Error(`Failed to parse Python output: ${outputData}`));
-        }
-      });
-    });
+  // Served from the tool manifest; the backend is only asked when there is none
+  private async getTools(config: any): Promise<any> {
+    const manifest = await this.readToolManifest();
+    if (manifest) {
+      return manifest.definitions;
+    }
+    console.log('Fetching tools via Python backend');
+    return this.sendCommand({ type: 'get_tools', config }, 'tools');
   }
 
-  private processMessageStream(event: Electron.IpcMainEvent, message: string, history: any[], config: any) {
-    console.log('Processing AI request via Python CLI (Stream):', message);
-    
-    // Kill any existing process
-    if (this.currentProcess) {
-      this.currentProcess.kill();
-      this.currentProcess = null;
+  private async getAllTools(config: any): Promise<any> {
+    const manifest = await this.readToolManifest();
+    if (manifest) {
+      return manifest.tools;
     }
+    console.log('Fetching all tools via Python backend');
+    return this.sendCommand({ type: 'get_all_tools', config }, 'tools');
+  }
 
-    const scriptPath = this.getBackendScriptPath();
-    const pythonProcess = spawn(this.getPythonPath(), [scriptPath]);
-    this.currentProcess = pythonProcess;
-
-    // Send data to Python script via stdin
-    const inputData = JSON.stringify({ message, history, config });
-    pythonProcess.stdin.write(inputData);
-    pythonProcess.stdin.end();
-
-    // Collect output from stdout
-    pythonProcess.stdout.on('data', (data) => {
-      const lines = data.toString().split('\n');
-      for (const line of lines) {
-        if (!line.trim()) continue;
-        try {
-          const result = JSON.parse(line);
-          if (result.error) {
-            event.reply('ai:chat-error', result.error);
-          } else if (result.chunk) {
-            event.reply('ai:chat-chunk', result.chunk);
-          }
-        } catch (e) {
-          console.error('Failed to parse Python output chunk:', line);
-        }
-      }
-    });
+  private fetchModels(config: any): Promise<any> {
+    console.log('Fetching models via Python backend');
+    return this.sendCommand({ type: 'fetch_models', config }, 'models');
+  }
 
-    // Collect error from stderr
-    let stderrOutput = '';
-    pythonProcess.stderr.on('data', (data) => {
-      const errorStr = data.toString();
-      console.error('Python stderr:', errorStr);
-      stderrOutput += errorStr;
-    });
+  // config.sessionId names the conversation; the backend loads its earlier messages from .wand/sessions.db
+  private processMessageStream(event: Electron.IpcMainEvent, message: string, config: any) {
+    console.log('Processing AI request via Python backend (Stream):', message);
 
-    pythonProcess.on('close', (code) => {
-      if (this.currentProcess === pythonProcess) {
-        this.currentProcess = null;
-      }
-      if (code !== 0 && code !== null) { // code is null if killed
-        event.reply('ai:chat-error', `Python script exited with code ${code}. Error: ${stderrOutput}`);
-      }
-      event.reply('ai:chat-done');
-    });
+    // Stop any existing chat
+    if (this.currentChatId !== null) {
+      this.cancelRequest(this.currentChatId);
+      this.currentChatId = null;
+    }
 
-    pythonProcess.on('error', (err) => {
-      event.reply('ai:chat-error', `Failed to start Python process: ${err.message}`);
-    });
+    const requestId = this.nextRequestId++;
+    this.currentChatId = requestId;
+
+    this.sendRequest({ type: 'chat', message, config }, (result) => {
+      // Ignore output from a chat that was stopped or replaced
+      if (this.currentChatId !== requestId) return;
+      if (result.error) {
+        event.reply('ai:chat-error', result.error);
+      } else if (result.events) {
+        // The backend coalesces events into frames; forward each frame as one IPC message
+        event.reply('ai:chat-events', result.events);
+      }
+    }, requestId)
+      .catch((err: Error) => {
+        if (this.currentChatId === requestId) {
+          event.reply('ai:chat-error', err.message);
+        }
+      })
+      .finally(() => {
+        // create_tool may have registered a tool during the chat
+        this.toolManifest = null;
+        if (this.currentChatId === requestId) {
+          this.currentChatId = null;
+          event.reply('ai:chat-done');
+        }
+      });
   }
 }
@@ -6,7 +6,7 @@ declare global {
     api: {
       chat: (message: string, config?: any) => Promise<string>
       fetchModels: (config: any) => Promise<any>
-      chatStream: (message: string, history: any[], config: any, onChunk: (chunk: string) => void, onDone: () => void, onError: (error: string) => void) => () => void
+      chatStream: (message: string, config: any, onEvents: (events: any[]) => void, onDone: () => void, onError: (error: string) => void) => () => void
       chatStop: () => void
       openDirectory: () => Promise<string | null>
       openFile: () => Promise<string | null>
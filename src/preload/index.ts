@@ -5,10 +5,12 @@ import { electronAPI } from '@electron-toolkit/preload'
 const api = {
   chat: (message: string, config?: any) => ipcRenderer.invoke('ai:chat', message, config),
   fetchModels: (config: any) => ipcRenderer.invoke('ai:fetch-models', config),
-  chatStream: (message: string, history: any[], config: any, onChunk: (chunk: string) => void, onDone: () => void, onError: (error: string) => void) => {
-    ipcRenderer.send('ai:chat-stream', { message, history, config });
+  // The backend keeps the conversation of config.sessionId, so only the new message is sent
+  chatStream: (message: string, config: any, onEvents: (events: any[]) => void, onDone: () => void, onError: (error: string) => void) => {
+    ipcRenderer.send('ai:chat-stream', { message, config });
     
-    const chunkHandler = (_: any, chunk: string) => onChunk(chunk);
+    // Batches of typed backend events: text_delta, thinking_delta, subtitle, tool_call_start, tool_call_args_delta, tool_result, turn_end, usage
+    const eventHandler = (_: any, events: any[]) => onEvents(events);
     const doneHandler = () => {
       cleanup();
       onDone();
@@ -19,12 +21,12 @@ const api = {
     };
 
     const cleanup = () => {
-      ipcRenderer.removeListener('ai:chat-chunk', chunkHandler);
+      ipcRenderer.removeListener('ai:chat-events', eventHandler);
       ipcRenderer.removeListener('ai:chat-done', doneHandler);
       ipcRenderer.removeListener('ai:chat-error', errorHandler);
     };
 
-    ipcRenderer.on('ai:chat-chunk', chunkHandler);
+    ipcRenderer.on('ai:chat-events', eventHandler);
     ipcRenderer.on('ai:chat-done', doneHandler);
     ipcRenderer.on('ai:chat-error', errorHandler);
 
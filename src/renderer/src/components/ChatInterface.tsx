@@ -1,4 +1,4 @@
-import React, { useState, useRef, useEffect } from 'react';
+import React, { useState, useRef, useEffect, useMemo, useCallback, memo } from 'react';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
 import rehypeRaw from 'rehype-raw';
@@ -10,8 +10,124 @@ interface Message {
   content: string;
   timestamp: number;
   attachedFiles?: AttachedFile[];
+  segments?: Segment[]; // Streamed assistant output, built incrementally from backend events
+  usage?: ChatEvent;
+  context?: ChatEvent; // prompt size of the latest turn after history compaction
 }
 
+// A rendered block of an assistant message
+interface Segment {
+  type: 'text' | 'thinking' | 'tool_call' | 'tool_result';
+  content: string; // text, thinking text, raw tool arguments JSON or tool output
+  subtitle?: string;
+  name?: string | null;
+  closed?: boolean; // set at turn_end so the next turn starts a new segment
+  partial?: boolean; // a tool result that is still arriving in pieces
+}
+
+// Typed event emitted by the Python backend (see llm_processor.TurnEventBuilder)
+interface ChatEvent {
+  event: 'text_delta' | 'thinking_delta' | 'subtitle' | 'tool_call_start' | 'tool_call_args_delta' | 'tool_result' | 'turn_end' | 'usage' | 'context';
+  text?: string;
+  name?: string | null;
+  content?: string;
+  turn?: number;
+  prompt_tokens?: number;
+  completion_tokens?: number;
+  total_tokens?: number;
+  cached_tokens?: number | null; // usage: prompt tokens served from the provider's prefix cache
+  partial?: boolean; // more pieces of this tool_result follow
+  tokens?: number; // context: estimated prompt tokens sent this turn
+  tokens_saved?: number; // context: tokens removed by compaction this turn
+  budget?: number; // context: prompt token budget of the model
+}
+
+// Apply one backend event to the segment list. Earlier segments are reused as-is,
+// so only the segment being streamed into re-renders.
+const applyChatEvent = (segments: Segment[], event: ChatEvent): Segment[] => {
+  const next = segments.slice();
+  const last = next[next.length - 1];
+  const isOpen = (type: Segment['type']) => last && last.type === type && !last.closed;
+
+  switch (event.event) {
+    case 'text_delta':
+      if (isOpen('text')) {
+        next[next.length - 1] = { ...last, content: last.content + (event.text || '') };
+      } else {
+        next.push({ type: 'text', content: event.text || '' });
+      }
+      break;
+    case 'thinking_delta':
+      if (isOpen('thinking') && last.subtitle === undefined) {
+        next[next.length - 1] = { ...last, content: last.content + (event.text || '') };
+      } else {
+        next.push({ type: 'thinking', content: event.text || '' });
+      }
+      break;
+    case 'subtitle': {
+      // The subtitle follows </thinking>, possibly after some whitespace
+      let i = next.length - 1;
+      while (i >= 0 && next[i].type === 'text' && !next[i].content.trim()) i--;
+      if (i >= 0 && next[i].type === 'thinking') {
+        next[i] = { ...next[i], subtitle: event.text };
+      }
+      break;
+    }
+    case 'tool_call_start':
+      next.push({ type: 'tool_call', name: event.name, content: '' });
+      break;
+    case 'tool_call_args_delta':
+      if (isOpen('tool_call')) {
+        next[next.length - 1] = { ...last, content: last.content + (event.text || '') };
+      }
+      break;
+    case 'tool_result':
+      // Large results arrive split into several events; all but the last are partial
+      if (isOpen('tool_result') && last.partial) {
+        next[next.length - 1] = { ...last, content: last.content + (event.content || ''), partial: event.partial };
+      } else {
+        next.push({ type: 'tool_result', content: event.content || '', partial: event.partial });
+      }
+      break;
+    case 'turn_end':
+      if (last) {
+        next[next.length - 1] = { ...last, closed: true };
+      }
+      break;
+    default:
+      return segments;
+  }
+  return next;
+};
+
+const applyChatEventToMessage = (msg: Message, event: ChatEvent): Message => {
+  if (event.event === 'usage') {
+    return { ...msg, usage: event };
+  }
+  if (event.event === 'context') {
+    return { ...msg, context: event };
+  }
+  return { ...msg, segments: applyChatEvent(msg.segments || [], event) };
+};
+
+// Serialize segments back into the tagged text protocol (used for history, copy and debug)
+const segmentsToContent = (segments: Segment[]): string => segments.map(segment => {
+  switch (segment.type) {
+    case 'thinking':
+      return `<thinking>${segment.content}</thinking>` + (segment.subtitle !== undefined ? `<subtitle>${segment.subtitle}</subtitle>` : '');
+    case 'tool_call':
+      return `<tool>\n✿FUNCTION✿: ${segment.name}\n✿ARGS✿: ${segment.content.trim()}\n</tool>`;
+    case 'tool_result':
+      return `\n<tool_result>\n${segment.content}\n</tool_result>\n`;
+    default:
+      return segment.content;
+  }
+}).join('');
+
+const getMessageContent = (msg: Message): string => msg.segments ? segmentsToContent(msg.segments) : msg.content;
+
+const newSessionId = (): string => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+
 interface ProviderConfig {
   apiKey: string;
   highSpeedTextModel: string;
@@ -136,12 +252,12 @@ interface AttachedFile {
   size?: number;
 }
 
-const CopyButton = ({ content, className = "" }: { content: string, className?: string }) => {
+const CopyButton = ({ content, className = "" }: { content: string | (() => string), className?: string }) => {
   const [copied, setCopied] = useState(false);
 
   const handleCopy = async () => {
     try {
-      await navigator.clipboard.writeText(content);
+      await navigator.clipboard.writeText(typeof content === 'function' ? content() : content);
       setCopied(true);
       setTimeout(() => setCopied(false), 2000);
     } catch (err) {
@@ -160,20 +276,19 @@ const CopyButton = ({ content, className = "" }: { content: string, className?:
   );
 };
 
-const ToolCallBlock = ({ content }: { content: string }) => {
+const ToolCallBlock = ({ name, args }: { name?: string | null, args: string }) => {
   const [isOpen, setIsOpen] = useState(false);
-  const funcMatch = /✿FUNCTION✿:\s*(.+)/.exec(content);
-  const argsMatch = /✿ARGS✿:\s*(.+)/s.exec(content);
-  
-  const funcName = funcMatch ? funcMatch[1].trim() : 'Unknown Tool';
-  let args = {};
-  try {
-    if (argsMatch) {
-      args = JSON.parse(argsMatch[1].trim());
+  const funcName = name || 'Unknown Tool';
+
+  // Arguments stream in as raw JSON text; only parse them when the block is expanded
+  const parsedArgs = useMemo(() => {
+    if (!isOpen) return null;
+    try {
+      return args.trim() ? JSON.parse(args.trim()) : {};
+    } catch (e) {
+      return { error: 'Invalid JSON args' };
     }
-  } catch (e) {
-    args = { error: 'Invalid JSON args' };
-  }
+  }, [isOpen, args]);
 
   return (
     <div className="my-2 border border-blue-500/30 bg-blue-500/10 rounded-md overflow-hidden">
@@ -187,7 +302,7 @@ const ToolCallBlock = ({ content }: { content: string }) => {
       </button>
       {isOpen && (
         <div className="p-3 text-xs font-mono text-gray-300 overflow-x-auto">
-          <pre>{JSON.stringify(args, null, 2)}</pre>
+          <pre>{JSON.stringify(parsedArgs, null, 2)}</pre>
         </div>
       )}
     </div>
@@ -199,15 +314,17 @@ const ToolResultBlock = ({ content, onSaveTool }: { content: string, onSaveTool?
   const [isSaved, setIsSaved] = useState(false);
   
   // Check if content is a temporary tool creation result
-  let toolData = null;
-  try {
-    const parsed = JSON.parse(content);
-    if (parsed.status === "temporary_tool_created") {
-      toolData = parsed;
+  const toolData = useMemo(() => {
+    try {
+      const parsed = JSON.parse(content);
+      if (parsed.status === "temporary_tool_created") {
+        return parsed;
+      }
+    } catch (e) {
+      // Not JSON or not our specific JSON
     }
-  } catch (e) {
-    // Not JSON or not our specific JSON
-  }
+    return null;
+  }, [content]);
 
   if (toolData) {
     return (
@@ -326,7 +443,70 @@ const ThinkingBlock = ({ content, subtitle, isFinished }: { content: string, sub
   );
 };
 
-const MessageContent = ({ content, onSaveTool }: { content: string, onSaveTool?: (name: string, code: string, description: string) => void }) => {
+type SaveToolHandler = (name: string, code: string, description: string) => void;
+
+const MarkdownText = memo(({ content }: { content: string }) => (
+    <ReactMarkdown 
+      remarkPlugins={[remarkGfm]} 
+      rehypePlugins={[rehypeRaw]}
+      components={{
+        pre: ({node, children, ...props}) => (
+          <div className="overflow-x-auto w-full my-2 rounded bg-[#2b2b2b] max-w-full">
+            <pre className="p-2 min-w-full w-fit" {...props}>
+              {children}
+            </pre>
+          </div>
+        ),
+        code({node, inline, className, children, ...props}: any) {
+          const match = /language-(\w+)/.exec(className || '')
+          return !inline && match ? (
+            <code className={className} {...props}>
+              {children}
+            </code>
+          ) : (
+            <code className={`${className} bg-white/10 rounded px-1 py-0.5`} {...props}>
+              {children}
+            </code>
+          )
+        }
+      }}
+    >
+      {content}
+    </ReactMarkdown>
+));
+
+// Renders one streamed segment; memoized so finished segments are not re-rendered on every event
+const SegmentView = memo(({ segment, isFinished, onSaveTool }: { segment: Segment, isFinished: boolean, onSaveTool?: SaveToolHandler }) => {
+  switch (segment.type) {
+    case 'thinking':
+      return <ThinkingBlock content={segment.content.trim()} subtitle={segment.subtitle?.trim() || undefined} isFinished={isFinished} />;
+    case 'tool_call':
+      return <ToolCallBlock name={segment.name} args={segment.content} />;
+    case 'tool_result':
+      return <ToolResultBlock content={segment.content} onSaveTool={onSaveTool} />;
+    default:
+      if (!segment.content.trim()) return null;
+      return <MarkdownText content={segment.content} />;
+  }
+});
+
+const MessageContent = ({ content, segments, isStreaming, onSaveTool }: { content: string, segments?: Segment[], isStreaming?: boolean, onSaveTool?: SaveToolHandler }) => {
+  if (segments) {
+    return (
+      <div className="space-y-2">
+        {segments.map((segment, index) => (
+          <SegmentView
+            key={index}
+            segment={segment}
+            isFinished={segment.subtitle !== undefined || !!segment.closed || index < segments.length - 1 || !isStreaming}
+            onSaveTool={onSaveTool}
+          />
+        ))}
+      </div>
+    );
+  }
+
+  // Messages without segments (e.g. the greeting) are parsed from their tagged text once per render.
   // Split content by tags. We use a more permissive regex for the subtitle to ensure we capture it even if there are newlines or spaces.
   const parts = content.split(/(<thinking>[\s\S]*?<\/thinking>(?:[\s\S]*?<subtitle>[\s\S]*?<\/subtitle>)?|<tool>[\s\S]*?<\/tool>|<tool_result>[\s\S]*?<\/tool_result>)/g);
 
@@ -351,7 +531,9 @@ const MessageContent = ({ content, onSaveTool }: { content: string, onSaveTool?:
         }
         if (part.startsWith('<tool>')) {
           const inner = part.replace(/<\/?tool>/g, '');
-          return <ToolCallBlock key={index} content={inner} />;
+          const funcMatch = /✿FUNCTION✿:\s*(.+)/.exec(inner);
+          const argsMatch = /✿ARGS✿:\s*(.+)/s.exec(inner);
+          return <ToolCallBlock key={index} name={funcMatch ? funcMatch[1].trim() : null} args={argsMatch ? argsMatch[1] : ''} />;
         }
         if (part.startsWith('<tool_result>')) {
           const inner = part.replace(/<\/?tool_result>/g, '');
@@ -359,36 +541,7 @@ const MessageContent = ({ content, onSaveTool }: { content: string, onSaveTool?:
         }
         if (!part.trim()) return null;
         
-        return (
-          <ReactMarkdown 
-            key={index}
-            remarkPlugins={[remarkGfm]} 
-            rehypePlugins={[rehypeRaw]}
-            components={{
-              pre: ({node, children, ...props}) => (
-                <div className="overflow-x-auto w-full my-2 rounded bg-[#2b2b2b] max-w-full">
-                  <pre className="p-2 min-w-full w-fit" {...props}>
-                    {children}
-                  </pre>
-                </div>
-              ),
-              code({node, inline, className, children, ...props}: any) {
-                const match = /language-(\w+)/.exec(className || '')
-                return !inline && match ? (
-                  <code className={className} {...props}>
-                    {children}
-                  </code>
-                ) : (
-                  <code className={`${className} bg-white/10 rounded px-1 py-0.5`} {...props}>
-                    {children}
-                  </code>
-                )
-              }
-            }}
-          >
-            {part}
-          </ReactMarkdown>
-        );
+        return <MarkdownText key={index} content={part} />;
       })}
     </div>
   );
@@ -406,6 +559,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
       timestamp: Date.now()
     }
   ]);
+  // Conversation id; the backend stores the history of each session
+  const [sessionId, setSessionId] = useState(() => newSessionId());
   const [showSettings, setShowSettings] = useState(false);
   const [showDebug, setShowDebug] = useState(false);
   const [settings, setSettings] = useState<AISettings>(() => {
@@ -607,6 +762,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
         timestamp: Date.now()
       }
     ]);
+    setSessionId(newSessionId());
     setInput('');
     setAttachedFiles([]);
     setIsLoading(false);
@@ -614,6 +770,14 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
     window.api.clearTempTools().catch((err: any) => console.error("Failed to clear temp tools:", err));
   };
 
+  const handleSaveTool = useCallback(async (name: string, code: string, desc: string) => {
+    try {
+      await window.api.saveTool(name, code, desc);
+    } catch (error) {
+      console.error("Failed to save tool:", error);
+    }
+  }, []);
+
   const handleSend = async () => {
     if (!input.trim() && attachedFiles.length === 0) return;
 
@@ -636,6 +800,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
       id: aiResponseId,
       role: 'assistant',
       content: '',
+      segments: [],
       timestamp: Date.now()
     };
     setMessages(prev => [...prev, aiResponse]);
@@ -646,22 +811,18 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
       const config = { 
         ...settings, 
         workspacePath,
+        sessionId, // Earlier messages are loaded by the backend, so the payload does not grow with the conversation
         files: currentAttachedFiles.map(f => f.path) // Pass attached files
       };
       
-      // Prepare history: exclude the current new message (it's sent as 'message') and the placeholder
-      // Actually, let's send the full history including the new message, but handle it in backend.
-      // Or better: send previous messages as history, and current input as message.
-      const history = messages.map(m => ({ role: m.role, content: m.content }));
-      
       window.api.chatStream(
         input, 
-        history,
         config,
-        (chunk: string) => {
+        (events: ChatEvent[]) => {
+          // One state update per frame of events
           setMessages(prev => prev.map(msg => 
             msg.id === aiResponseId 
-              ? { ...msg, content: msg.content + chunk }
+              ? events.reduce(applyChatEventToMessage, msg)
               : msg
           ));
         },
@@ -674,7 +835,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
           setIsLoading(false);
           setMessages(prev => prev.map(msg => 
             msg.id === aiResponseId 
-              ? { ...msg, content: msg.content + `\n[Error: ${error}]` }
+              ? applyChatEventToMessage(msg, { event: 'text_delta', text: `\n[Error: ${error}]` })
               : msg
           ));
         }
@@ -986,13 +1147,9 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
                 {msg.role === 'assistant' ? (
                   <MessageContent 
                     content={msg.content} 
-                    onSaveTool={async (name, code, desc) => {
-                      try {
-                        await window.api.saveTool(name, code, desc);
-                      } catch (error) {
-                        console.error("Failed to save tool:", error);
-                      }
-                    }}
+                    segments={msg.segments}
+                    isStreaming={isLoading && index === messages.length - 1}
+                    onSaveTool={handleSaveTool}
                   />
                 ) : (
                   msg.content
@@ -1001,7 +1158,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ workspacePath }) => {
               
               <div className="flex items-center gap-2 mt-1 px-1 h-6">
                 <CopyButton 
-                  content={msg.content} 
+                  content={() => getMessageContent(msg)} 
                   className="opacity-0 group-hover:opacity-100 text-gray-500 hover:text-white" 
                 />
                 {msg.role === 'user' && (